@@ -0,0 +1 @@
+"""producthunt scraper benchmarks."""
@@ -0,0 +1,63 @@
+"""Benchmark goodput of retries and concurrency control under rate limiting.
+
+Crawl trending products from a replay server which rate limits requests in
+flight above ``--max-concurrency`` (i.e ``429`` with ``Retry-After``) and
+fails some with ``503``, using:
+    * ``static``: static concurrency, retries sent at once
+    * ``backoff``: static concurrency, retries delayed with jittered backoff
+    * ``adaptive``: adaptive concurrency, retries delayed with backoff
+
+Report goodput (i.e successful pages/sec), rate limited responses and pages
+lost once retries are exhausted.
+
+Usage:
+
+>>> python -m benchmarks.bench_adaptive [--max-concurrency 8] [--concurrency 32]
+"""
+
+import argparse
+
+from benchmarks.bench_crawl import crawl_spider, start_replay
+from benchmarks.replay import add_arguments
+from benchmarks.utils import report
+
+CONTROLS = {
+    "static": {"RETRY_BACKOFF_BASE": "0", "ADAPTIVE_CONCURRENCY_ENABLED": "false"},
+    "backoff": {"RETRY_BACKOFF_BASE": "0.5", "ADAPTIVE_CONCURRENCY_ENABLED": "false"},
+    "adaptive": {"RETRY_BACKOFF_BASE": "0.5", "ADAPTIVE_CONCURRENCY_ENABLED": "true"},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    add_arguments(parser).set_defaults(
+        latency=0.05, jitter=0.02, error_rate=0.01, max_concurrency=8
+    )
+    args = parser.parse_args()
+
+    options = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"concurrency", "json_path"}
+    }
+    replay, base_url = start_replay(**options)
+    try:
+        settings = {
+            "CONCURRENT_REQUESTS": args.concurrency,
+            "CONCURRENT_REQUESTS_PER_DOMAIN": args.concurrency,
+        }
+        results = {
+            name: crawl_spider("trending-products", base_url, settings, env)
+            for name, env in CONTROLS.items()
+        }
+    finally:
+        replay.terminate()
+        replay.wait()
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark eager and lazy apollo state decoding.
+
+Compare peak memory and time per page of parsing product and post pages
+when apollo state is decoded eagerly or lazily (i.e on entity access).
+
+Usage:
+
+>>> python -m benchmarks.bench_apollo_state [page.html ...] [--repeat 200]
+"""
+
+import tracemalloc
+
+from producthunt_scraper.spiders.featured_product_launches import (
+    FeaturedProductLaunchesSpider,
+)
+from producthunt_scraper.spiders.trending_products import TrendingProductsSpider
+
+from benchmarks.fixtures import load_pages, make_response
+from benchmarks.utils import measure, parse_args, report
+
+
+def parse_page(spider=None, url=None, body=None):
+    """Parse a page into a list of items."""
+    return list(spider.parse(response=make_response(url, body)))
+
+
+def decode_page(spider=None, url=None, body=None, key=None):
+    """Decode page script data and its entities matching a key."""
+    data = spider.parse_script_data(response=make_response(url, body))
+    return list(spider.find_script_data(key=key, source=data))
+
+
+def measure_peak_memory(func=None):
+    """Call a function and return its peak traced memory in bytes."""
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    args = parse_args(description=__doc__)
+    spiders = {
+        "eager": (TrendingProductsSpider(), FeaturedProductLaunchesSpider()),
+        "lazy": (TrendingProductsSpider(), FeaturedProductLaunchesSpider()),
+    }
+    for spider in spiders["lazy"]:
+        spider.lazy_script_data = True
+
+    results = {}
+    for name, (url, body) in load_pages(args.pages).items():
+        is_post = "/posts/" in url
+        results[name] = {"page_bytes": len(body)}
+        items = {}
+        for mode, (product_spider, launch_spider) in spiders.items():
+            spider = launch_spider if is_post else product_spider
+            parse = lambda spider=spider, url=url, body=body: parse_page(  # noqa: E731
+                spider, url, body
+            )
+            key = "Post" if is_post else "Product"
+            decode = lambda spider=spider, url=url, body=body, key=key: (  # noqa: E731
+                decode_page(spider, url, body, key)
+            )
+            items[mode] = parse()
+            results[name][f"""{mode}_decode_peak_kb"""] = (
+                measure_peak_memory(decode) / 1024
+            )
+            results[name][f"""{mode}_decode_ms"""] = measure(decode, args.repeat) * 1000
+            results[name][f"""{mode}_parse_peak_kb"""] = (
+                measure_peak_memory(parse) / 1024
+            )
+            results[name][f"""{mode}_parse_ms"""] = measure(parse, args.repeat) * 1000
+
+        # ensure both modes yield same items
+        assert items["eager"] == items["lazy"], f"""{name}: items mismatch"""
+        results[name]["items"] = len(items["eager"])
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark historical backfills of featured product launches.
+
+Backfill a range of days of daily leaderboards from a replay server with
+latency, within windows of 1 to N concurrent days (see ``BACKFILL_*``
+settings). Then interrupt a backfill after some pages and resume it, to
+check finished days are not fetched again. Report days/hour and requests
+per day of each backfill.
+
+Usage:
+
+>>> python -m benchmarks.bench_backfill [--days 30] [--windows 1,4,8] \
+...     [--latency 0.1]
+"""
+
+import argparse
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+from benchmarks.bench_crawl import crawl_spider, start_replay
+from benchmarks.replay import add_arguments
+from benchmarks.utils import report
+
+SPIDER = "featured-product-launches"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--windows", default="1,4,8")
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    add_arguments(parser).set_defaults(latency=0.1, posts=10)
+    args = parser.parse_args()
+
+    started_on = date(2024, 1, 1)
+    spider_args = {
+        "backfill_start": started_on,
+        "backfill_end": started_on + timedelta(days=args.days - 1),
+    }
+    options = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"days", "windows", "json_path"}
+    }
+    replay, base_url = start_replay(**options)
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for window in [int(window) for window in args.windows.split(",")]:
+                settings = {
+                    "BACKFILL_CONCURRENT_DAYS": window,
+                    "BACKFILL_CHECKPOINT_PATH": Path(temp_dir) / f"""{window}.db""",
+                }
+                results[f"""window={window}"""] = crawl_spider(
+                    SPIDER, base_url, settings, spider_args=spider_args
+                )
+
+            # interrupt a backfill after some pages, then resume it
+            settings = {
+                "BACKFILL_CONCURRENT_DAYS": 4,
+                "BACKFILL_CHECKPOINT_PATH": Path(temp_dir) / "resume.db",
+            }
+            results["interrupted"] = crawl_spider(
+                SPIDER,
+                base_url,
+                {**settings, "CLOSESPIDER_PAGECOUNT": args.days * args.posts // 2},
+                spider_args=spider_args,
+            )
+            results["resumed"] = crawl_spider(
+                SPIDER, base_url, settings, spider_args=spider_args
+            )
+    finally:
+        replay.terminate()
+        replay.wait()
+
+    report(
+        {
+            name: {
+                key: result[key]
+                for key in (
+                    "items",
+                    "requests",
+                    "elapsed",
+                    "backfill_days",
+                    "backfill_days_per_hour",
+                    "backfill_requests_per_day",
+                )
+            }
+            for name, result in results.items()
+        },
+        json_path=args.json_path,
+    )
+
+
+if __name__ == "__main__":
+    main()
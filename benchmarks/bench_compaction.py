@@ -0,0 +1,136 @@
+"""Benchmark metrics queries over compacted partitions against raw part files.
+
+Write synthetic day partitions of product items, in part files of
+``FEED_EXPORT_BATCH_ITEM_COUNT`` items with some duplicates (i.e re-crawled
+products), then read votes and followers history of a few products by
+scanning raw part files, then by reading a metrics store built by
+compaction (see ``producthunt_scraper.compaction``). Report query time of
+each, with compaction time of all partitions and of a single new partition.
+
+Usage:
+
+>>> python -m benchmarks.bench_compaction [--days 90] [--products 1000]
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+from producthunt_scraper.compaction import compact, read_metrics
+
+from benchmarks.utils import report
+
+COLUMNS = ["product_id", "product_followers_count", "product_total_votes_count"]
+
+
+def make_partition(path=None, day=0, products=1000, batch=100, duplicates=0.05):
+    """Write part files of a day partition of product items."""
+    random.seed(day)
+    indexes = list(range(products))
+    indexes += random.sample(indexes, int(products * duplicates))
+    random.shuffle(indexes)
+
+    path.mkdir(parents=True, exist_ok=True)
+    for batch_id, start in enumerate(range(0, len(indexes), batch), start=1):
+        with open(path / f"""part-{batch_id}.jsonl""", "w") as file:
+            for index in indexes[start : start + batch]:
+                item = {
+                    "product_id": f"""{index}""",
+                    "product_name": f"""Product {index}""",
+                    "product_tagline": f"""Tagline of product {index}""",
+                    "product_rating": 4.5,
+                    "product_followers_count": index + day * 10,
+                    "product_total_votes_count": index + day * 20,
+                    "product_topics": ["Artificial Intelligence", "Productivity"],
+                }
+                file.write(json.dumps(item) + "\n")
+
+
+def scan_parts(path=None, ids=None):
+    """Read metrics of products by scanning all part files of all partitions."""
+    frames = []
+    for file in sorted(path.glob("date=*/*.jsonl")):
+        frame = pd.read_json(file, lines=True, dtype={"product_id": "object"})
+        frame = frame[frame["product_id"].isin(ids)]
+        frames.append(frame[COLUMNS].assign(date=file.parent.name[len("date=") :]))
+    data = pd.concat(frames, ignore_index=True)
+    data = data.drop_duplicates(["product_id", "date"], keep="last")
+    return data.sort_values(["product_id", "date"], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--duplicates", type=float, default=0.05)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    args = parser.parse_args()
+
+    started_on = date(2023, 10, 24)
+    ids = [f"""{index}""" for index in range(0, args.products, 97)][: args.queries]
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "trending-products"
+        store_path = Path(temp_dir) / "metrics" / "trending-products"
+        for day in range(args.days):
+            partition_path = path / f"""date={started_on + timedelta(days=day)}"""
+            make_partition(
+                partition_path, day, args.products, args.batch, args.duplicates
+            )
+        files = len(list(path.glob("date=*/*.jsonl")))
+
+        started_at = time.perf_counter()
+        expected = scan_parts(path, ids=ids)
+        results["raw_scan"] = {
+            "files": files,
+            "query_time": time.perf_counter() - started_at,
+        }
+
+        started_at = time.perf_counter()
+        compacted = compact(path, store_path)
+        results["compact"] = {
+            "partitions": len(compacted),
+            "elapsed": time.perf_counter() - started_at,
+            "duplicates": sum(stats["duplicates"] for stats in compacted.values()),
+        }
+
+        started_at = time.perf_counter()
+        metrics = read_metrics(store_path, ids=ids)
+        query_time = time.perf_counter() - started_at
+        metrics = metrics.assign(date=metrics["date"].dt.strftime("%Y-%m-%d"))
+        columns = [*COLUMNS, "date"]
+        matches = (
+            metrics[columns].astype(str).to_numpy().tolist()
+            == expected[columns].astype(str).to_numpy().tolist()
+        )
+        results["metrics_store"] = {
+            "files": len(list(Path(store_path).glob("metrics/*.parquet"))),
+            "query_time": query_time,
+            "rows": len(metrics.index),
+            "matches_raw_scan": matches,
+            "speedup": results["raw_scan"]["query_time"] / query_time,
+        }
+
+        partition_path = path / f"""date={started_on + timedelta(days=args.days)}"""
+        make_partition(
+            partition_path, args.days, args.products, args.batch, args.duplicates
+        )
+        started_at = time.perf_counter()
+        compacted = compact(path, store_path)
+        results["compact_incremental"] = {
+            "partitions": len(compacted),
+            "elapsed": time.perf_counter() - started_at,
+        }
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
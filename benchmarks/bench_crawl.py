@@ -0,0 +1,275 @@
+"""Benchmark crawls of spiders against a local replay server.
+
+Start a replay server (see ``benchmarks.replay``) in a subprocess, point
+spiders at it using ``PRODUCTHUNT_BASE_URL`` setting and crawl it, each
+spider in its own subprocess. Report pages/sec, items/sec, p50/p99 callback
+and download latency, CPU time, peak RSS, peak scheduler queue length and
+time to first item of each crawl.
+
+Usage:
+
+>>> python -m benchmarks.bench_crawl [--latency 0.05] [--jitter 0.02] \
+...     [--error-rate 0.01] [--set PRODUCTHUNT_LAZY_SCRIPT_DATA=true] \
+...     [--json report.json]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from scrapy import signals
+
+from benchmarks.replay import add_arguments
+from benchmarks.utils import percentile, report
+
+SPIDERS = ["trending-products", "featured-product-launches"]
+
+__all__ = ["CallbackTimingMiddleware", "QueueSampler", "crawl_spider", "start_replay"]
+
+
+class CallbackTimingMiddleware:
+    """Collect time spent within spider callbacks, per response.
+
+    Enable it last (i.e closest to spiders), so other spider middlewares
+    are not timed.
+    """
+
+    def __init__(self, stats=None):
+        self.stats = stats
+        self.latencies = []
+        self.download_latencies = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        o = cls(stats=crawler.stats)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def process_spider_output(self, response, result, spider):
+        self.download_latencies.append(response.meta.get("download_latency", 0.0))
+        latency = 0.0
+        result = iter(result)
+        while True:
+            started_at = time.perf_counter()
+            try:
+                value = next(result)
+            except StopIteration:
+                break
+            finally:
+                latency = latency + time.perf_counter() - started_at
+            yield value
+        self.latencies.append(latency)
+
+    def spider_closed(self, spider):
+        self.stats.set_value("callback/count", len(self.latencies))
+        self.stats.set_value("callback/p50", percentile(self.latencies, 50))
+        self.stats.set_value("callback/p99", percentile(self.latencies, 99))
+        self.stats.set_value("download/p50", percentile(self.download_latencies, 50))
+        self.stats.set_value("download/p99", percentile(self.download_latencies, 99))
+
+
+class QueueSampler:
+    """Sample length of scheduler queue, and record time to first item.
+
+    Parameters
+    ----------
+    crawler (Crawler):
+        Valid scrapy crawler.
+
+    interval (float):
+        Valid seconds between samples of scheduler queue length.
+    """
+
+    def __init__(self, crawler=None, interval=0.05):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.interval = interval
+        self.opened_at = None
+        self.task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        o = cls(crawler=crawler)
+        crawler.signals.connect(o.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(o.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def spider_opened(self, spider):
+        from twisted.internet import task
+
+        self.opened_at = time.perf_counter()
+        self.task = task.LoopingCall(self.sample)
+        self.task.start(self.interval, now=True)
+
+    def sample(self):
+        slot = self.crawler.engine.slot
+        scheduler = getattr(slot, "scheduler", None)
+        if scheduler is not None and hasattr(scheduler, "__len__"):
+            self.stats.max_value("queue/peak", len(scheduler))
+
+    def item_scraped(self, item, spider):
+        if self.stats.get_value("first_item/seconds") is None:
+            elapsed = time.perf_counter() - self.opened_at
+            self.stats.set_value("first_item/seconds", elapsed)
+
+    def spider_closed(self, spider):
+        if self.task is not None and self.task.running:
+            self.task.stop()
+
+
+def parse_settings(values=None):
+    """Parse ``KEY=VALUE`` settings overrides."""
+    return dict(value.split("=", 1) for value in values or [])
+
+
+def run_spider(name=None, base_url=None, settings=None, spider_args=None):
+    """Crawl a spider in current process and return its results."""
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    project_settings = get_project_settings()
+    project_settings.update(
+        {
+            "PRODUCTHUNT_BASE_URL": base_url,
+            "FEEDS": {},
+            "LOG_LEVEL": "WARNING",
+            "SPIDER_MIDDLEWARES": {
+                "benchmarks.bench_crawl.CallbackTimingMiddleware": 1000,
+            },
+            "EXTENSIONS": {
+                **project_settings.getdict("EXTENSIONS"),
+                "benchmarks.bench_crawl.QueueSampler": 0,
+            },
+            **(settings or {}),
+        },
+        priority="cmdline",
+    )
+    process = CrawlerProcess(project_settings)
+    crawler = process.create_crawler(name)
+    process.crawl(crawler, **(spider_args or {}))
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    started_at = time.perf_counter()
+    process.start()
+    elapsed = time.perf_counter() - started_at
+    cpu = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (cpu.ru_utime - usage.ru_utime) + (cpu.ru_stime - usage.ru_stime)
+
+    stats = crawler.stats.get_stats()
+    pages = stats.get("downloader/response_status_count/200", 0)
+    items = stats.get("item_scraped_count", 0)
+    return {
+        "elapsed": elapsed,
+        "pages": pages,
+        "items": items,
+        "requests": stats.get("downloader/request_count", 0),
+        "response_bytes": stats.get("downloader/response_bytes", 0),
+        "errors": stats.get("downloader/response_status_count/503", 0),
+        "rate_limited": stats.get("downloader/response_status_count/429", 0),
+        "retries_exhausted": stats.get("retry/max_reached", 0),
+        "cache_hits": stats.get("httpcache/hit", 0),
+        "backfill_days": stats.get("backfill/days/finished", 0),
+        "backfill_days_per_hour": stats.get("backfill/days_per_hour", 0.0),
+        "backfill_requests_per_day": stats.get("backfill/requests_per_day", 0.0),
+        "pages_per_sec": pages / elapsed,
+        "items_per_sec": items / elapsed,
+        "callback_p50_ms": stats.get("callback/p50", 0.0) * 1000,
+        "callback_p99_ms": stats.get("callback/p99", 0.0) * 1000,
+        "download_p50_ms": stats.get("download/p50", 0.0) * 1000,
+        "download_p99_ms": stats.get("download/p99", 0.0) * 1000,
+        "cpu_time": cpu,
+        "cpu_utilization": cpu / elapsed,
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "peak_queue_length": stats.get("queue/peak", 0),
+        "time_to_first_item": stats.get("first_item/seconds"),
+    }
+
+
+def get_commit():
+    """Get current git commit, to compare reports across commits."""
+    try:
+        command = ["git", "rev-parse", "--short", "HEAD"]
+        return subprocess.check_output(command, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_replay(**options):
+    """Start replay server in a subprocess, and return it and its base url."""
+    replay_args = [
+        (
+            f"""--{key.replace("_", "-")}"""
+            if value is True
+            else f"""--{key.replace("_", "-")}={value}"""
+        )
+        for key, value in options.items()
+        if value is not None and value is not False
+    ]
+    replay = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.replay", *replay_args],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return replay, replay.stdout.readline().strip()
+
+
+def crawl_spider(name=None, base_url=None, settings=None, env=None, spider_args=None):
+    """Crawl a spider in a subprocess, and return its results."""
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.bench_crawl",
+            f"""--spider={name}""",
+            f"""--base-url={base_url}""",
+            *(f"""--set={key}={value}""" for key, value in (settings or {}).items()),
+            *(f"""--arg={key}={value}""" for key, value in (spider_args or {}).items()),
+        ],
+        env={**os.environ, **(env or {})},
+    )
+    return {"commit": get_commit(), **json.loads(output)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spider", action="append", choices=SPIDERS)
+    parser.add_argument("--set", dest="settings", action="append", default=[])
+    parser.add_argument("--arg", dest="spider_args", action="append", default=[])
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = add_arguments(parser).parse_args()
+    settings = parse_settings(args.settings)
+    spider_args = parse_settings(args.spider_args)
+
+    # crawl a single spider, within a subprocess
+    if args.base_url:
+        results = run_spider(args.spider[0], args.base_url, settings, spider_args)
+        print(json.dumps(results))
+        return
+
+    # start replay server, within a subprocess
+    options = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"spider", "settings", "spider_args", "json_path", "base_url"}
+    }
+    replay, base_url = start_replay(**options)
+    try:
+        results = {
+            name: crawl_spider(name, base_url, settings, spider_args=spider_args)
+            for name in args.spider or SPIDERS
+        }
+    finally:
+        replay.terminate()
+        replay.wait()
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark item id stores used to drop duplicate items.
+
+Compare insert and lookup rates, and memory used by memory, bloom and sqlite
+item id stores. Each store runs in a fresh subprocess, so its peak RSS is not
+shared with other stores.
+
+Usage:
+
+>>> python -m benchmarks.bench_dedupe [--size 1000000]
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.utils import report
+
+STORES = {
+    "memory": "producthunt_scraper.dedupe.MemoryItemIdStore",
+    "bloom": "producthunt_scraper.dedupe.BloomItemIdStore",
+    "sqlite": "producthunt_scraper.dedupe.SqliteItemIdStore",
+}
+
+
+def peak_rss():
+    """Get peak resident set size of current process in bytes."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_store(name=None, size=1000000, path=None):
+    """Insert then lookup item ids into a store and return its results."""
+    from producthunt_scraper.dedupe import (
+        BloomItemIdStore,
+        MemoryItemIdStore,
+        SqliteItemIdStore,
+    )
+
+    stores = {
+        "memory": lambda: MemoryItemIdStore(),
+        "bloom": lambda: BloomItemIdStore(capacity=size, error_rate=0.001),
+        "sqlite": lambda: SqliteItemIdStore(path=path),
+    }
+    item_ids = (f"""ProductItem/{index}""" for index in range(size))
+    baseline_rss = peak_rss()
+    store = stores[name]()
+
+    started_at = time.perf_counter()
+    inserted = sum(store.add(item_id) for item_id in item_ids)
+    insert_time = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    missed = sum(f"""ProductItem/{index}""" in store for index in range(size, size * 2))
+    lookup_time = time.perf_counter() - started_at
+    rss = peak_rss()
+    store.close()
+
+    return {
+        "items": size,
+        "inserts_per_sec": size / insert_time,
+        "lookups_per_sec": size / lookup_time,
+        "false_negatives": size - inserted,
+        "false_positive_rate": missed / size,
+        "peak_rss_bytes": rss,
+        "rss_bytes_per_item": (rss - baseline_rss) / size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--store", choices=list(STORES), help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    args = parser.parse_args()
+
+    # run a single store, within a subprocess
+    if args.store:
+        results = run_store(name=args.store, size=args.size, path=args.path)
+        print(json.dumps(results))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name in STORES:
+            path = Path(temp_dir) / f"""{name}.sqlite3"""
+            output = subprocess.check_output(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.bench_dedupe",
+                    f"""--size={args.size}""",
+                    f"""--store={name}""",
+                    f"""--path={path}""",
+                ]
+            )
+            results[name] = json.loads(output)
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
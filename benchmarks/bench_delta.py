@@ -0,0 +1,172 @@
+"""Benchmark storage and snapshot reconstruction of delta snapshots.
+
+Export a month of synthetic daily crawls of product items, where a few
+products are new each day, most products votes and followers change, and
+few products descriptions change, as full jsonlines and as delta jsonlines
+(see ``producthunt_scraper.delta``). Report bytes of each, with time to read
+a day of full jsonlines and to reconstruct a day snapshot from deltas, and
+whether reconstructed snapshots match full ones.
+
+Usage:
+
+>>> python -m benchmarks.bench_delta [--days 30] [--products 5000]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from producthunt_scraper import jsonlib
+from producthunt_scraper.delta import DeltaIndex, read_snapshot
+from producthunt_scraper.exporters import DeltaJsonLinesItemExporter
+from producthunt_scraper.items import ProductItem
+from scrapy.exporters import JsonLinesItemExporter
+
+from benchmarks.bench_items_memory import PLATFORMS, TOPICS
+from benchmarks.utils import report
+
+
+def make_items(day=0, products=5000, new=50, changes=0.8, edits=0.02):
+    """Make product items of a day crawl, changing a share of them."""
+    random.seed(day)
+    items = []
+    for index in range(products + day * new):
+        # day of last edit of the product text fields
+        edited = max([0, *(edit for edit in range(day + 1) if random.random() < edits)])
+        grown = sum(random.random() < changes for _ in range(day))
+        items.append(
+            ProductItem(
+                product_id=f"""{index}""",
+                product_slug=f"""product-{index}""",
+                product_name=f"""Product {index}""",
+                product_tagline=f"""Tagline of product {index}, edited {edited}""",
+                product_description=" ".join(
+                    [f"""Description of product {index}, edited {edited}."""] * 8
+                ),
+                product_url=f"""https://www.producthunt.com/products/product-{index}""",
+                product_website_url=f"""https://product-{index}.example.com""",
+                product_rating=4.5,
+                product_followers_count=index + grown * 3,
+                product_total_votes_count=index + grown * 5,
+                product_reviewers_count=index % 20,
+                product_reviews_count=index % 30,
+                product_platforms=tuple(PLATFORMS[: index % 3 + 1]),
+                product_categories=tuple(TOPICS[index % 7 : index % 7 + 2]),
+                product_topics=tuple(TOPICS[index % 11 : index % 11 + 3]),
+            )
+        )
+    return items
+
+
+def export_items(path=None, items=None, make_exporter=None, batch=100):
+    """Export items in batches of part files, as feed exports do."""
+    path.mkdir(parents=True, exist_ok=True)
+    for batch_id, start in enumerate(range(0, len(items), batch), start=1):
+        extension = "jsonl" if make_exporter is JsonLinesItemExporter else "delta.jsonl"
+        with open(path / f"""part-{batch_id}.{extension}""", "wb") as file:
+            exporter = make_exporter(file)
+            exporter.start_exporting()
+            for item in items[start : start + batch]:
+                exporter.export_item(item)
+            exporter.finish_exporting()
+
+
+def read_full(path=None):
+    """Read full records of a day partition, sorted by product id."""
+    records = [
+        jsonlib.loads(line)
+        for file in sorted(path.glob("*.jsonl"))
+        for line in open(file, "rb")
+    ]
+    return sorted(records, key=lambda record: record["product_id"])
+
+
+def normalize(records=None):
+    """Sort list values of records, as delta snapshots ignore their order."""
+    return [
+        {
+            name: sorted(value) if isinstance(value, list) else value
+            for name, value in record.items()
+        }
+        for record in records
+    ]
+
+
+def get_size(path=None):
+    return sum(file.stat().st_size for file in Path(path).rglob("*.jsonl"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--keyframe-days", type=int, default=7)
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    args = parser.parse_args()
+
+    started_on = date(2023, 10, 1)
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        full_path = Path(temp_dir) / "full" / "trending-products"
+        delta_path = Path(temp_dir) / "delta" / "trending-products"
+        index = DeltaIndex(path=Path(temp_dir) / "delta.sqlite3")
+
+        export_time = {"full": 0.0, "delta": 0.0}
+        for day in range(args.days):
+            snapshot_date = started_on + timedelta(days=day)
+            items = make_items(day=day, products=args.products)
+
+            started_at = time.perf_counter()
+            export_items(
+                full_path / f"""date={snapshot_date}""", items, JsonLinesItemExporter
+            )
+            export_time["full"] += time.perf_counter() - started_at
+
+            started_at = time.perf_counter()
+            export_items(
+                delta_path / f"""date={snapshot_date}""",
+                items,
+                lambda file, snapshot_date=snapshot_date: DeltaJsonLinesItemExporter(
+                    file,
+                    index=index,
+                    name="trending-products",
+                    snapshot_date=snapshot_date,
+                    keyframe_days=args.keyframe_days,
+                ),
+            )
+            export_time["delta"] += time.perf_counter() - started_at
+        index.close()
+
+        read_time = {"full": [], "delta": []}
+        matches = True
+        for day in range(args.days):
+            snapshot_date = started_on + timedelta(days=day)
+            started_at = time.perf_counter()
+            full = read_full(full_path / f"""date={snapshot_date}""")
+            read_time["full"].append(time.perf_counter() - started_at)
+
+            started_at = time.perf_counter()
+            snapshot = read_snapshot(delta_path, snapshot_date)
+            read_time["delta"].append(time.perf_counter() - started_at)
+            matches = matches and normalize(full) == normalize(snapshot)
+
+        for name, path in (("full", full_path), ("delta", delta_path)):
+            results[name] = {
+                "bytes": get_size(path),
+                "export_time": export_time[name],
+                "read_time_mean": sum(read_time[name]) / args.days,
+                "read_time_max": max(read_time[name]),
+            }
+        results["delta"]["reduction"] = 1 - (
+            results["delta"]["bytes"] / results["full"]["bytes"]
+        )
+        results["delta"]["matches_full"] = matches
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
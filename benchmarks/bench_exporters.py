@@ -0,0 +1,95 @@
+"""Benchmark feed exporters file size and downstream load time.
+
+Export synthetic product items in batches (i.e ``FEED_EXPORT_BATCH_ITEM_COUNT``)
+of part files as jsonlines and parquet, then load all part files of a day
+partition using pandas.
+
+Usage:
+
+>>> python -m benchmarks.bench_exporters [--size 100000] [--batch 100]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+from producthunt_scraper.exporters import ParquetItemExporter
+from producthunt_scraper.itemloaders import load_product_item
+from producthunt_scraper.items import ProductItem
+from scrapy.exporters import JsonLinesItemExporter
+
+from benchmarks.bench_items_memory import make_data
+from benchmarks.utils import report
+
+EXPORTERS = {
+    "jsonlines": ("jsonl", JsonLinesItemExporter),
+    "parquet": ("parquet", ParquetItemExporter),
+}
+
+
+def load_jsonlines(path=None):
+    """Load all jsonlines part files of a partition."""
+    frames = [pd.read_json(part, lines=True) for part in sorted(path.glob("*.jsonl"))]
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_parquet(path=None):
+    """Load all parquet part files of a partition."""
+    return pd.read_parquet(path)
+
+
+LOADERS = {"jsonlines": load_jsonlines, "parquet": load_parquet}
+
+
+def export_items(items=None, path=None, extension=None, exporter_class=None, batch=100):
+    """Export items in batches of part files, as feed exports do."""
+    path.mkdir(parents=True, exist_ok=True)
+    for batch_id, start in enumerate(range(0, len(items), batch), start=1):
+        with open(path / f"""part-{batch_id}.{extension}""", "wb") as file:
+            exporter = exporter_class(file)
+            exporter.start_exporting()
+            for item in items[start : start + batch]:
+                exporter.export_item(item)
+            exporter.finish_exporting()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--batch", type=int, action="append")
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    args = parser.parse_args()
+
+    items = [
+        load_product_item(make_data(index, ProductItem)) for index in range(args.size)
+    ]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for batch in args.batch or [100, 10000]:
+            for name, (extension, exporter_class) in EXPORTERS.items():
+                path = Path(temp_dir) / f"""{name}-{batch}""" / "date=2023-10-24"
+
+                started_at = time.perf_counter()
+                export_items(items, path, extension, exporter_class, batch)
+                export_time = time.perf_counter() - started_at
+
+                started_at = time.perf_counter()
+                data = LOADERS[name](path)
+                load_time = time.perf_counter() - started_at
+
+                results[f"""{name}/batch={batch}"""] = {
+                    "items": len(data),
+                    "files": len(list(path.iterdir())),
+                    "bytes": sum(part.stat().st_size for part in path.iterdir()),
+                    "export_time": export_time,
+                    "load_time": load_time,
+                }
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark reactor lag and throughput of jsonlines feed exporters.
+
+Export synthetic product items in bursts (i.e as spider callbacks do) on a
+running reactor, while a ticker measure how late the reactor serve it.
+Compare stock jsonlines exporter, optionally gzip compressed on reactor
+thread, against threaded jsonlines exporter.
+
+Usage:
+
+>>> python -m benchmarks.bench_feed_lag [--size 200000] [--burst 500]
+"""
+
+import argparse
+import gzip
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.utils import percentile, report
+
+TICK_INTERVAL = 0.005
+
+
+def make_cases():
+    """Make exporters to compare, as name to ``(factory, compression)``."""
+    from producthunt_scraper.exporters import ThreadedJsonLinesItemExporter
+    from scrapy.exporters import JsonLinesItemExporter
+
+    def stock(file, compression=None):
+        if compression == "gzip":
+            file = gzip.GzipFile(fileobj=file, mode="wb", compresslevel=6)
+        return JsonLinesItemExporter(file), file
+
+    def threaded(file, compression=None):
+        return ThreadedJsonLinesItemExporter(file, compression=compression), file
+
+    return {
+        "stock": (stock, None),
+        "stock-gzip": (stock, "gzip"),
+        "threaded": (threaded, None),
+        "threaded-gzip": (threaded, "gzip"),
+        "threaded-zstd": (threaded, "zstd"),
+    }
+
+
+async def run_case(reactor=None, items=None, path=None, make_exporter=None, **kwargs):
+    """Export items in bursts while measuring reactor lag."""
+    from twisted.internet.task import LoopingCall, deferLater
+
+    lags = []
+    expected_at = [time.perf_counter() + TICK_INTERVAL]
+
+    def tick():
+        now = time.perf_counter()
+        lags.append(max(0.0, now - expected_at[0]))
+        expected_at[0] = now + TICK_INTERVAL
+
+    ticker = LoopingCall(tick)
+    ticker.clock = reactor
+    ticker.start(TICK_INTERVAL, now=False)
+
+    with open(path, "wb") as file:
+        exporter, stream = make_exporter(file, kwargs.get("compression"))
+        started_at = time.perf_counter()
+        exporter.start_exporting()
+        for start in range(0, len(items), kwargs.get("burst", 500)):
+            for item in items[start : start + kwargs.get("burst", 500)]:
+                exporter.export_item(item)
+            await deferLater(reactor, 0, lambda: None)
+        exporter.finish_exporting()
+        if stream is not file:
+            stream.close()
+        elapsed = time.perf_counter() - started_at
+
+    ticker.stop()
+    return {
+        "items": len(items),
+        "items_per_sec": len(items) / elapsed,
+        "bytes": Path(path).stat().st_size,
+        "lag_p50_ms": percentile(lags, 50) * 1000,
+        "lag_p99_ms": percentile(lags, 99) * 1000,
+        "lag_max_ms": max(lags or [0.0]) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--burst", type=int, default=500)
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    args = parser.parse_args()
+
+    from scrapy.utils.reactor import install_reactor
+
+    install_reactor("twisted.internet.asyncioreactor.AsyncioSelectorReactor")
+
+    from producthunt_scraper.itemloaders import load_product_item
+    from producthunt_scraper.items import ProductItem
+    from twisted.internet import defer, task
+
+    from benchmarks.bench_items_memory import make_data
+
+    items = [
+        load_product_item(make_data(index, ProductItem)) for index in range(args.size)
+    ]
+    results = {}
+
+    async def run(reactor):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name, (make_exporter, compression) in make_cases().items():
+                results[name] = await run_case(
+                    reactor=reactor,
+                    items=items,
+                    path=Path(temp_dir) / f"""{name}.jsonl""",
+                    make_exporter=make_exporter,
+                    compression=compression,
+                    burst=args.burst,
+                )
+        report(results, json_path=args.json_path)
+
+    task.react(lambda reactor: defer.ensureDeferred(run(reactor)))
+
+
+if __name__ == "__main__":
+    main()
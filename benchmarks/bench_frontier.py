@@ -0,0 +1,95 @@
+"""Benchmark crawls of 1 to N workers sharing a frontier, on one machine.
+
+Start a replay server, then crawl trending products with N workers at once
+(each in its own process, as nodes would) sharing a sqlite frontier (see
+``producthunt_scraper.frontier``). Report crawl time, throughput and
+speedup of each number of workers, with pages crawled more than once.
+
+Usage:
+
+>>> python -m benchmarks.bench_frontier [--workers 4] [--latency 0.1]
+"""
+
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.bench_crawl import crawl_spider, start_replay
+from benchmarks.replay import add_arguments
+from benchmarks.utils import report
+
+
+def crawl_workers(base_url=None, workers=1, settings=None):
+    """Crawl trending products with workers sharing a frontier, at once."""
+    with tempfile.TemporaryDirectory() as frontier_dir:
+        settings = {
+            "SCHEDULER": "producthunt_scraper.frontier.FrontierScheduler",
+            "FRONTIER_BACKEND": "producthunt_scraper.frontier.SqliteFrontier",
+            "FRONTIER_SQLITE_PATH": str(Path(frontier_dir) / "frontier.sqlite3"),
+            "WORKER_COUNT": workers,
+            **(settings or {}),
+        }
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    lambda worker_id: crawl_spider(
+                        "trending-products",
+                        base_url,
+                        {**settings, "WORKER_ID": worker_id},
+                    ),
+                    range(workers),
+                )
+            )
+        elapsed = time.perf_counter() - started_at
+
+    return {
+        "elapsed": elapsed,
+        "pages": sum(result["pages"] for result in results),
+        "items": sum(result["items"] for result in results),
+        "pages_per_worker": "/".join(str(result["pages"]) for result in results),
+        "pages_per_sec": sum(result["pages"] for result in results) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    add_arguments(parser).set_defaults(latency=0.1, products=300)
+    args = parser.parse_args()
+
+    options = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"workers", "concurrency", "json_path"}
+    }
+    # limit concurrency of each worker, as of a node
+    settings = {
+        "CONCURRENT_REQUESTS": args.concurrency,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": args.concurrency,
+    }
+    replay, base_url = start_replay(**options)
+    try:
+        results = {}
+        for workers in range(1, max(1, args.workers) + 1):
+            results[f"""workers={workers}"""] = crawl_workers(
+                base_url, workers=workers, settings=settings
+            )
+    finally:
+        replay.terminate()
+        replay.wait()
+
+    single = results["workers=1"]
+    for result in results.values():
+        result["speedup"] = single["elapsed"] / result["elapsed"]
+        result["duplicate_pages"] = result["pages"] - single["pages"]
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark crawls fetching html pages against crawls querying graphql.
+
+Crawl trending products and featured product launches from a replay server,
+fetching html pages, then querying its graphql endpoint in batches of ids
+(see ``PRODUCTHUNT_FETCH_MODE`` and ``PRODUCTHUNT_GRAPHQL_*`` settings).
+Report bytes downloaded per item and requests per item of each crawl.
+
+Usage:
+
+>>> python -m benchmarks.bench_graphql [--products 100] [--products-per-topic 50]
+"""
+
+import argparse
+
+from benchmarks.bench_crawl import SPIDERS, crawl_spider, start_replay
+from benchmarks.replay import add_arguments
+from benchmarks.utils import report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    add_arguments(parser).set_defaults(products_per_topic=50)
+    args = parser.parse_args()
+
+    options = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"batch_size", "page_size", "json_path"}
+    }
+    replay, base_url = start_replay(**options)
+    results = {}
+    try:
+        for name in SPIDERS:
+            for mode in ("html", "graphql"):
+                settings = {
+                    "PRODUCTHUNT_FETCH_MODE": mode,
+                    "PRODUCTHUNT_GRAPHQL_BATCH_SIZE": args.batch_size,
+                    "PRODUCTHUNT_GRAPHQL_PAGE_SIZE": args.page_size,
+                    # follow all pages of topics products
+                    "PRODUCTHUNT_GRAPHQL_MAX_PAGES": 0,
+                }
+                results[f"""{name}/{mode}"""] = crawl_spider(name, base_url, settings)
+    finally:
+        replay.terminate()
+        replay.wait()
+
+    for result in results.values():
+        items = max(1, result["items"])
+        result["bytes_per_item"] = result["response_bytes"] / items
+        result["requests_per_item"] = result["requests"] / items
+
+    report(
+        {
+            name: {
+                key: result[key]
+                for key in (
+                    "items",
+                    "requests",
+                    "response_bytes",
+                    "bytes_per_item",
+                    "requests_per_item",
+                    "elapsed",
+                )
+            }
+            for name, result in results.items()
+        },
+        json_path=args.json_path,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark HTTP/1.1 and HTTP/2 download handlers against a replay server.
+
+Crawl trending products from a https replay server, with default HTTP/1.1
+download handler and pooled HTTP/2 download handler, at different
+concurrency levels. Report throughput and download latency of each crawl.
+
+Usage:
+
+>>> python -m benchmarks.bench_http2 [--latency 0.05] [--concurrency 8 ...]
+"""
+
+import argparse
+
+from benchmarks.bench_crawl import crawl_spider, start_replay
+from benchmarks.replay import add_arguments
+from benchmarks.utils import report
+
+HANDLERS = {
+    "http11": {"HTTP2_ENABLED": "false"},
+    "http2": {"HTTP2_ENABLED": "true"},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, action="append")
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    args = add_arguments(parser).parse_args()
+
+    options = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"concurrency", "pool_size", "json_path"}
+    }
+    replay, base_url = start_replay(**{**options, "tls": True})
+    try:
+        results = {}
+        for concurrency in args.concurrency or [4, 16, 64]:
+            settings = {
+                "CONCURRENT_REQUESTS": concurrency,
+                "CONCURRENT_REQUESTS_PER_DOMAIN": concurrency,
+            }
+            for name, env in HANDLERS.items():
+                env = {**env, "HTTP2_POOL_SIZE": str(args.pool_size)}
+                results[f"""{name}/concurrency={concurrency}"""] = crawl_spider(
+                    "trending-products", base_url, settings, env
+                )
+    finally:
+        replay.terminate()
+        replay.wait()
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark HTTP cache storages size and cached crawl time.
+
+Crawl trending products from a replay server twice per cache storage, first
+to fill the cache (cold) then from the cache (warm), using scrapy filesystem
+cache storage (plain and gzip) and sqlite cache storage (full pages and
+``__NEXT_DATA__`` only pages). Report cache size on disk and crawl times.
+
+Usage:
+
+>>> python -m benchmarks.bench_httpcache [--latency 0.05] [--products 100]
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.bench_crawl import crawl_spider, start_replay
+from benchmarks.replay import add_arguments
+from benchmarks.utils import report
+
+STORAGES = {
+    "filesystem": {
+        "HTTPCACHE_STORAGE": "scrapy.extensions.httpcache.FilesystemCacheStorage",
+    },
+    "filesystem/gzip": {
+        "HTTPCACHE_STORAGE": "scrapy.extensions.httpcache.FilesystemCacheStorage",
+        "HTTPCACHE_GZIP": "true",
+    },
+    "sqlite": {
+        "HTTPCACHE_STORAGE": "producthunt_scraper.httpcache.SqliteCacheStorage",
+    },
+    "sqlite/script_data": {
+        "HTTPCACHE_STORAGE": "producthunt_scraper.httpcache.SqliteCacheStorage",
+        "HTTPCACHE_SQLITE_SCRIPT_DATA_PATHS": "/products/,/posts/",
+    },
+}
+
+
+def get_size(path=None):
+    """Get size in bytes of files within a directory."""
+    return sum(file.stat().st_size for file in Path(path).rglob("*") if file.is_file())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    args = add_arguments(parser).parse_args()
+
+    options = {key: value for key, value in vars(args).items() if key != "json_path"}
+    replay, base_url = start_replay(**options)
+    try:
+        results = {}
+        for name, storage_settings in STORAGES.items():
+            with tempfile.TemporaryDirectory() as cache_dir:
+                settings = {
+                    "HTTPCACHE_ENABLED": "true",
+                    "HTTPCACHE_DIR": cache_dir,
+                    **storage_settings,
+                }
+                cold = crawl_spider("trending-products", base_url, settings)
+                warm = crawl_spider("trending-products", base_url, settings)
+                results[name] = {
+                    "pages": warm["pages"],
+                    "items": warm["items"],
+                    "cache_hits": warm["cache_hits"],
+                    "cache_bytes": get_size(cache_dir),
+                    "cold_elapsed": cold["elapsed"],
+                    "warm_elapsed": warm["elapsed"],
+                }
+    finally:
+        replay.terminate()
+        replay.wait()
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
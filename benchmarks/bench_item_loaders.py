@@ -0,0 +1,122 @@
+"""Benchmark item loaders against compiled item loaders.
+
+Ensure compiled item loaders produce byte-identical exported items, then
+compare items per second of both.
+
+Usage:
+
+>>> python -m benchmarks.bench_item_loaders [--repeat 5]
+"""
+
+import io
+import random
+
+from producthunt_scraper.itemloaders import (
+    ProductItemLoader,
+    ProductLaunchItemLoader,
+    load_product_item,
+    load_product_launch_item,
+)
+from producthunt_scraper.spiders.featured_product_launches import (
+    FEATURED_LAUNCH_DATA_MAPPINGS,
+)
+from producthunt_scraper.spiders.trending_products import PRODUCT_DATA_MAPPINGS
+from scrapy.exporters import JsonLinesItemExporter
+
+from benchmarks.utils import measure, parse_args, report
+
+LIST_FIELDS = {
+    "product_platforms",
+    "product_categories",
+    "product_topics",
+    "launch_topics",
+}
+
+
+def make_value(field=None, rng=None):
+    """Make a raw value, including edge cases, for an item field."""
+    if field in LIST_FIELDS:
+        return rng.choice([None, [], [" Web ", "iOS"], ["AI", "", " Dev Tools"]])
+    if field.endswith(("_count", "_rank")):
+        return rng.choice([None, 0, 12, "7", 1024])
+    if field.endswith("_rating"):
+        return rng.choice([None, 0, 4.5, "3.25"])
+    return rng.choice([None, "", "  ", " value ", "value", ["first", "second"]])
+
+
+def make_data(fields=None, size=1000, seed=0):
+    """Make raw items data for given fields."""
+    rng = random.Random(seed)
+    return [{field: make_value(field, rng) for field in fields} for _ in range(size)]
+
+
+def load_items_with_loader(loader_class=None, data=None):
+    """Load items using item loader."""
+    items = []
+    for value in data:
+        item_loader = loader_class()
+        item_loader.add_value(None, value)
+        items.append(item_loader.load_item())
+    return items
+
+
+def load_items_compiled(load_item=None, data=None):
+    """Load items using compiled item loader."""
+    return [load_item(value) for value in data]
+
+
+def export_items(items=None):
+    """Export items as json lines bytes."""
+    output = io.BytesIO()
+    exporter = JsonLinesItemExporter(output)
+    exporter.start_exporting()
+    for item in items:
+        exporter.export_item(item)
+    exporter.finish_exporting()
+    return output.getvalue()
+
+
+def main():
+    args = parse_args(description=__doc__, repeat=5)
+
+    product_fields = list(PRODUCT_DATA_MAPPINGS.values())
+    product_fields += ["product_categories", "product_topics"]
+    launch_fields = list(FEATURED_LAUNCH_DATA_MAPPINGS.values())
+    launch_fields += ["launch_topics", "product_id", "product_name", "product_url"]
+    cases = {
+        "product": (ProductItemLoader, load_product_item, product_fields),
+        "launch": (ProductLaunchItemLoader, load_product_launch_item, launch_fields),
+    }
+
+    results = {}
+    for name, (loader_class, load_item, fields) in cases.items():
+        data = make_data(fields=fields)
+
+        # ensure compiled items are equal and byte-identical when exported
+        expected = load_items_with_loader(loader_class, data)
+        actual = load_items_compiled(load_item, data)
+        assert expected == actual, f"""{name}: items mismatch"""
+        assert export_items(expected) == export_items(actual)
+
+        loader_secs = measure(
+            lambda loader_class=loader_class, data=data: load_items_with_loader(
+                loader_class, data
+            ),
+            args.repeat,
+        )
+        compiled_secs = measure(
+            lambda load_item=load_item, data=data: load_items_compiled(load_item, data),
+            args.repeat,
+        )
+        results[name] = {
+            "items": len(data),
+            "loader_items_per_sec": len(data) / loader_secs,
+            "compiled_items_per_sec": len(data) / compiled_secs,
+            "speedup": loader_secs / compiled_secs,
+        }
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark memory used by scraped items.
+
+Compare bytes per item of 100k items using plain dataclasses with lists
+(i.e previous items) against slotted dataclasses with interned tuples.
+
+Usage:
+
+>>> python -m benchmarks.bench_items_memory [--size 100000]
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from dataclasses import dataclass, field, fields, make_dataclass
+from typing import List, Optional
+
+from producthunt_scraper.itemloaders import load_product_item, load_product_launch_item
+from producthunt_scraper.items import ProductItem, ProductLaunchItem
+
+from benchmarks.utils import report
+
+PLATFORMS = ["Web", "iOS", "Android", "Mac", "Windows"]
+TOPICS = [f"""Topic {index}""" for index in range(50)]
+
+
+def make_plain_item_class(item_class=None):
+    """Make plain dataclass with list fields, equivalent to an item class."""
+    plain_fields = [
+        (
+            item_field.name,
+            Optional[List[str]] if "Tuple" in str(item_field.type) else item_field.type,
+            field(default=None),
+        )
+        for item_field in fields(item_class)
+    ]
+    return dataclass(make_dataclass(f"""Plain{item_class.__name__}""", plain_fields))
+
+
+def make_data(index=0, item_class=None):
+    """Make decoded (i.e from page JSON) raw data of an item."""
+    is_product = item_class is ProductItem
+    topics = [TOPICS[(index + offset) % 7] for offset in range(3)]
+    data = {
+        "id": f"""{index}""",
+        "slug": f"""item-{index}""",
+        "name": f"""Item {index}""",
+        "tagline": f"""Tagline of item {index}""",
+        "url": f"""https://www.producthunt.com/products/item-{index}""",
+        "votes_count": index,
+        "topics": topics,
+    }
+    if is_product:
+        return {
+            "product_id": data["id"],
+            "product_slug": data["slug"],
+            "product_name": data["name"],
+            "product_tagline": data["tagline"],
+            "product_url": data["url"],
+            "product_rating": 4.5,
+            "product_followers_count": data["votes_count"],
+            "product_total_votes_count": data["votes_count"],
+            "product_platforms": PLATFORMS[: index % 3 + 1],
+            "product_categories": topics[:2],
+            "product_topics": topics,
+        }
+    return {
+        "launch_id": data["id"],
+        "launch_slug": data["slug"],
+        "launch_name": data["name"],
+        "launch_tagline": data["tagline"],
+        "launch_url": data["url"],
+        "launch_votes_count": data["votes_count"],
+        "launch_topics": topics,
+    }
+
+
+def decode(data=None):
+    """Decode data from JSON, as spiders get fresh objects per page."""
+    return json.loads(json.dumps(data))
+
+
+def measure_items_memory(make_item=None, size=100000):
+    """Create items and return bytes per item."""
+    gc.collect()
+    tracemalloc.start()
+    items = [make_item(index) for index in range(size)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return current / size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    args = parser.parse_args()
+
+    cases = {
+        "product": (ProductItem, load_product_item),
+        "launch": (ProductLaunchItem, load_product_launch_item),
+    }
+
+    results = {}
+    for name, (item_class, load_item) in cases.items():
+        plain_item_class = make_plain_item_class(item_class)
+        raw_data = [make_data(index, item_class) for index in range(100)]
+
+        def make_plain_item(index, raw_data=raw_data, cls=plain_item_class):
+            return cls(**decode(raw_data[index % 100]))
+
+        def make_slotted_item(index, raw_data=raw_data, load_item=load_item):
+            return load_item(decode(raw_data[index % 100]))
+
+        plain_bytes = measure_items_memory(make_plain_item, args.size)
+        slotted_bytes = measure_items_memory(make_slotted_item, args.size)
+        results[name] = {
+            "items": args.size,
+            "plain_bytes_per_item": plain_bytes,
+            "slotted_bytes_per_item": slotted_bytes,
+            "reduction": 1 - slotted_bytes / plain_bytes,
+        }
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark parsing of item pages within the reactor and within a parse pool.
+
+Crawl trending products from a replay server, parsing product pages within
+the reactor thread, then within a pool of 1 to N threads and processes (see
+``PARSE_POOL_*`` settings). Report throughput and CPU time of each crawl.
+
+Usage:
+
+>>> python -m benchmarks.bench_parse_pool [--workers 4] [--entities 2000]
+"""
+
+import argparse
+import os
+
+from benchmarks.bench_crawl import crawl_spider, start_replay
+from benchmarks.replay import add_arguments
+from benchmarks.utils import report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--kind", action="append", choices=["process", "thread"])
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    add_arguments(parser).set_defaults(entities=2000, products=300)
+    args = parser.parse_args()
+
+    options = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"workers", "kind", "json_path"}
+    }
+    replay, base_url = start_replay(**options)
+    try:
+        results = {"reactor": crawl_spider("trending-products", base_url, {})}
+        for kind in args.kind or ["process", "thread"]:
+            for workers in range(1, max(1, args.workers) + 1):
+                settings = {
+                    "PARSE_POOL_ENABLED": "true",
+                    "PARSE_POOL_KIND": kind,
+                    "PARSE_POOL_SIZE": workers,
+                }
+                results[f"""{kind}/workers={workers}"""] = crawl_spider(
+                    "trending-products", base_url, settings
+                )
+    finally:
+        replay.terminate()
+        replay.wait()
+
+    report(
+        {
+            name: {
+                key: result[key]
+                for key in ("pages", "items", "elapsed", "pages_per_sec", "cpu_time")
+            }
+            for name, result in results.items()
+        },
+        json_path=args.json_path,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark item pipelines throughput.
+
+Compare normalize, validate and dedupe item pipelines enabled alone against
+fused item pipeline, processing synthetic items through scrapy item
+pipeline manager.
+
+Usage:
+
+>>> python -m benchmarks.bench_pipelines [--repeat 5]
+"""
+
+from producthunt_scraper.items import ProductItem, ProductLaunchItem
+from scrapy.pipelines import ItemPipelineManager
+
+from benchmarks.utils import get_project_crawler, measure, parse_args, report
+
+SEPARATE_ITEM_PIPELINES = {
+    "producthunt_scraper.pipelines.NormalizeItemPipeline": 200,
+    "producthunt_scraper.pipelines.ValidItemFilterPipeline": 300,
+    "producthunt_scraper.pipelines.DuplicateItemFilterPipeline": 400,
+}
+FUSED_ITEM_PIPELINES = {
+    "producthunt_scraper.pipelines.FusedItemPipeline": 200,
+}
+
+
+def make_items(size=10000):
+    """Make synthetic items, including invalid and duplicate items."""
+    items = []
+    for index in range(size):
+        url = f"""https://www.producthunt.com/products/p-{index}"""
+        url = None if index % 10 == 0 else url
+        items.append(
+            ProductItem(
+                product_id=f"""{index % 9000}""",
+                product_url=url,
+                product_topics=("AI",) if index % 2 else (),
+                product_categories=(),
+            )
+            if index % 3
+            else ProductLaunchItem(
+                launch_id=f"""{index % 9000}""",
+                product_url=url,
+                launch_topics=(),
+            )
+        )
+    return items
+
+
+def process_items(item_pipelines=None, items=None):
+    """Process items through item pipeline manager and count dropped items."""
+    crawler = get_project_crawler(settings={"ITEM_PIPELINES": item_pipelines})
+    crawler.spider = crawler._create_spider("benchmark")
+    manager = ItemPipelineManager.from_crawler(crawler)
+    dropped = []
+    for item in items:
+        dfd = manager.process_item(item, crawler.spider)
+        dfd.addErrback(lambda failure: dropped.append(failure))
+    manager.close_spider(crawler.spider)
+    return len(dropped), crawler.stats.get_stats()
+
+
+def main():
+    args = parse_args(description=__doc__, repeat=5)
+    items = make_items()
+
+    results = {}
+    for name, item_pipelines in (
+        ("separate", SEPARATE_ITEM_PIPELINES),
+        ("fused", FUSED_ITEM_PIPELINES),
+    ):
+        dropped, stats = process_items(item_pipelines, items)
+        secs = measure(
+            lambda item_pipelines=item_pipelines: process_items(item_pipelines, items),
+            args.repeat,
+        )
+        results[name] = {
+            "items": len(items),
+            "dropped": dropped,
+            "items_per_sec": len(items) / secs,
+            **{key: value for key, value in stats.items() if "pipeline/" in key},
+        }
+
+    # ensure both pipelines drop same items
+    assert results["separate"]["dropped"] == results["fused"]["dropped"]
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Benchmark overhead of crawl profiling.
+
+Crawl trending products from a replay server with profiling disabled and
+enabled (see ``PROFILING_*`` settings), a few times each, and report median
+crawl and CPU time of each, with profiling overhead.
+
+Usage:
+
+>>> python -m benchmarks.bench_profiling [--repeat 3] [--products 300]
+"""
+
+import argparse
+import statistics
+
+from benchmarks.bench_crawl import crawl_spider, start_replay
+from benchmarks.replay import add_arguments
+from benchmarks.utils import report
+
+PROFILING = {
+    "disabled": {"PROFILING_ENABLED": "false"},
+    "enabled": {"PROFILING_ENABLED": "true", "PROFILING_INTERVAL": 1},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    add_arguments(parser).set_defaults(products=300)
+    args = parser.parse_args()
+
+    options = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"repeat", "json_path"}
+    }
+    replay, base_url = start_replay(**options)
+    try:
+        results = {}
+        for name, settings in PROFILING.items():
+            crawls = [
+                crawl_spider("trending-products", base_url, settings)
+                for _ in range(args.repeat)
+            ]
+            results[name] = {
+                "pages": crawls[0]["pages"],
+                "elapsed": statistics.median(crawl["elapsed"] for crawl in crawls),
+                "cpu_time": statistics.median(crawl["cpu_time"] for crawl in crawls),
+            }
+    finally:
+        replay.terminate()
+        replay.wait()
+
+    disabled = results["disabled"]
+    for result in results.values():
+        result["cpu_overhead"] = result["cpu_time"] / disabled["cpu_time"] - 1
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark references parsing with and without references index.
+
+Parse ``topics``, ``categories``, ``product`` and ``user`` references of
+every entity of apollo states with hundreds of entities, of varying number
+of fields (i.e width), once or repeatedly (i.e rounds).
+
+Usage:
+
+>>> python -m benchmarks.bench_ref_index [--repeat 20]
+"""
+
+from producthunt_scraper.spiders.mixins import PageScriptDataMixin
+
+from benchmarks.utils import measure, parse_args, report
+
+REF_FIELDS = ("topics", "categories", "product", "user")
+
+
+def make_apollo_state(entities=100, width=10):
+    """Make apollo state of posts entities with ``width`` scalar fields."""
+    apollo_state = {}
+    for index in range(entities):
+        post = {"__typename": "Post", "id": f"""{index}"""}
+        post.update({f"""field{field}""": field for field in range(width)})
+        post["product"] = {"__ref": f"""Product{index}"""}
+        post['topics({"first":3})'] = {
+            "edges": [
+                {"node": {"__ref": f"""Topic{index % 10 + t}"""}} for t in range(3)
+            ]
+        }
+        apollo_state[f"""Post{index}"""] = post
+        apollo_state[f"""Product{index}"""] = {"__typename": "Product"}
+        apollo_state[f"""Topic{index}"""] = {"__typename": "Topic"}
+    return apollo_state
+
+
+def resolve_refs(mixin=None, source=None, use_index=False, rounds=1):
+    """Resolve references of all entities of a source, ``rounds`` times."""
+    index = mixin.parse_ref_index(source=source) if use_index else None
+    resolved = []
+    for _ in range(rounds):
+        for entity in source.values():
+            for field in REF_FIELDS:
+                keys = mixin.parse_ref_keys(key=field, source=entity, index=index)
+                values = mixin.parse_ref_values(*keys, source=source, index=index)
+                resolved.append(len(values))
+    return resolved
+
+
+def main():
+    args = parse_args(description=__doc__, repeat=20)
+    mixin = PageScriptDataMixin()
+
+    results = {}
+    for entities in (100, 500):
+        for width in (10, 80):
+            source = make_apollo_state(entities=entities, width=width)
+
+            # ensure both paths resolve same references
+            expected = resolve_refs(mixin, source, use_index=False)
+            assert expected == resolve_refs(mixin, source, use_index=True)
+
+            for rounds in (1, 5):
+                scan_secs = measure(
+                    lambda source=source, rounds=rounds: resolve_refs(
+                        mixin, source, False, rounds
+                    ),
+                    args.repeat,
+                )
+                index_secs = measure(
+                    lambda source=source, rounds=rounds: resolve_refs(
+                        mixin, source, True, rounds
+                    ),
+                    args.repeat,
+                )
+                name = f"""entities={len(source)},width={width},rounds={rounds}"""
+                results[name] = {
+                    "lookups": len(expected) * rounds,
+                    "scan_ms": scan_secs * 1000,
+                    "index_ms": index_secs * 1000,
+                    "speedup": scan_secs / index_secs,
+                }
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark re-parse throughput of cached pages, from 1 to N workers.
+
+Parse synthetic product pages (as streamed from HTTP cache) into items with
+a pool of 1 to N worker processes. Report pages and items per second, and a
+hash of items, which is the same for any number of workers.
+
+Usage:
+
+>>> python -m benchmarks.bench_reparse [--workers 4] [--pages 500]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from itemadapter import ItemAdapter
+from producthunt_scraper.reparse import reparse_pages
+from scrapy.utils.project import get_project_settings
+
+from benchmarks.fixtures import make_product_page
+from benchmarks.utils import report
+
+
+def make_pages(size=500, base_url=None, entities=300):
+    """Make cached product pages, as ``(url, status, headers, body)``."""
+    headers = b"Content-Type: text/html; charset=utf-8"
+    return [
+        (
+            f"""{base_url}/products/product-{index}""",
+            200,
+            headers,
+            make_product_page(index=index, entities=entities),
+        )
+        for index in range(size)
+    ]
+
+
+def hash_items(items=None):
+    """Hash items in order, with sorted lists so set ordering is ignored."""
+    digest = hashlib.sha256()
+    for item in items:
+        values = {
+            key: sorted(value) if isinstance(value, list) else value
+            for key, value in ItemAdapter(item).items()
+        }
+        digest.update(json.dumps(values, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--entities", type=int, default=300)
+    parser.add_argument("--chunk-size", type=int, default=16)
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    args = parser.parse_args()
+
+    settings = get_project_settings()
+    base_url = settings.get("PRODUCTHUNT_BASE_URL") or "https://www.producthunt.com"
+    pages = make_pages(size=args.pages, base_url=base_url, entities=args.entities)
+
+    results = {}
+    for workers in range(1, max(1, args.workers) + 1):
+        started_at = time.perf_counter()
+        items = list(
+            reparse_pages(
+                pages=pages,
+                name="trending-products",
+                settings=settings,
+                workers=workers,
+                chunk_size=args.chunk_size,
+            )
+        )
+        elapsed = time.perf_counter() - started_at
+        results[f"""workers/{workers}"""] = {
+            "pages_per_sec": len(pages) / elapsed,
+            "items_per_sec": len(items) / elapsed,
+            "items": len(items),
+            "elapsed": elapsed,
+            "items_hash": hash_items(items),
+        }
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark the priority scheduler against the default scheduler.
+
+Crawl trending products from a replay server with many topics and products
+per topic (i.e a deep crawl), using the default scheduler, then the
+priority scheduler (see ``PRIORITY_SCHEDULER_*`` settings) with decreasing
+memory sizes. Report peak scheduler queue length, peak RSS and time to
+first item of each crawl.
+
+Usage:
+
+>>> python -m benchmarks.bench_scheduler [--memory-sizes 1000,100] \
+...     [--max-discovery 2] [--topics 20] [--products 2000]
+"""
+
+import argparse
+
+from benchmarks.bench_crawl import crawl_spider, start_replay
+from benchmarks.replay import add_arguments
+from benchmarks.utils import report
+
+SCHEDULERS = {
+    "default": "scrapy.core.scheduler.Scheduler",
+    "priority": "producthunt_scraper.scheduler.PriorityScheduler",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--memory-sizes", default="1000,100")
+    parser.add_argument("--max-discovery", type=int, default=2)
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    add_arguments(parser).set_defaults(
+        topics=20, products=2000, products_per_topic=200, entities=50, latency=0.05
+    )
+    args = parser.parse_args()
+
+    options = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"memory_sizes", "max_discovery", "json_path"}
+    }
+    replay, base_url = start_replay(**options)
+    try:
+        results = {
+            "default": crawl_spider(
+                "trending-products", base_url, {"SCHEDULER": SCHEDULERS["default"]}
+            )
+        }
+        for memory_size in [int(size) for size in args.memory_sizes.split(",")]:
+            settings = {
+                "SCHEDULER": SCHEDULERS["priority"],
+                "PRIORITY_SCHEDULER_MEMORY_SIZE": memory_size,
+                "PRIORITY_SCHEDULER_MAX_DISCOVERY": args.max_discovery,
+            }
+            results[f"""priority/memory_size={memory_size}"""] = crawl_spider(
+                "trending-products", base_url, settings
+            )
+    finally:
+        replay.terminate()
+        replay.wait()
+
+    report(
+        {
+            name: {
+                key: result[key]
+                for key in (
+                    "items",
+                    "elapsed",
+                    "peak_queue_length",
+                    "peak_rss_bytes",
+                    "time_to_first_item",
+                    "items_per_sec",
+                )
+            }
+            for name, result in results.items()
+        },
+        json_path=args.json_path,
+    )
+
+
+if __name__ == "__main__":
+    main()
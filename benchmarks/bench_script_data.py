@@ -0,0 +1,64 @@
+"""Benchmark page script data parsing.
+
+Compare scanning ``__NEXT_DATA__`` from raw response body against parsing
+it with a css selector, on saved or synthetic product and post pages.
+
+Usage:
+
+>>> python -m benchmarks.bench_script_data [page.html ...] [--repeat 200]
+"""
+
+import json
+
+from producthunt_scraper.jsonlib import JSON_BACKEND
+from producthunt_scraper.spiders.mixins import (
+    DEFAULT_PAGE_SCRIPT_DATA_SELECTOR,
+    PageScriptDataMixin,
+)
+
+from benchmarks.fixtures import load_pages, make_response
+from benchmarks.utils import measure, parse_args, report
+
+
+def parse_script_data_with_selector(response=None):
+    """Parse page script data using css selector and standard library json."""
+    data = response.css(DEFAULT_PAGE_SCRIPT_DATA_SELECTOR).get() or "{}"
+    return json.loads(data).get("props", {}).get("apolloState", {})
+
+
+def main():
+    args = parse_args(description=__doc__)
+    mixin = PageScriptDataMixin()
+
+    results = {}
+    for name, (url, body) in load_pages(args.pages).items():
+        # ensure both paths yield same data
+        expected = parse_script_data_with_selector(make_response(url, body))
+        actual = mixin.parse_script_data(response=make_response(url, body))
+        assert expected == actual, f"""{name}: script data mismatch"""
+
+        selector_secs = measure(
+            lambda url=url, body=body: parse_script_data_with_selector(
+                make_response(url, body)
+            ),
+            repeat=args.repeat,
+        )
+        scan_secs = measure(
+            lambda url=url, body=body: mixin.parse_script_data(
+                response=make_response(url, body)
+            ),
+            repeat=args.repeat,
+        )
+        results[name] = {
+            "page_bytes": len(body),
+            "json_backend": JSON_BACKEND,
+            "selector_ms": selector_secs * 1000,
+            "scan_ms": scan_secs * 1000,
+            "speedup": selector_secs / scan_secs,
+        }
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark user agent middlewares startup time and per-request overhead.
+
+Compare a ``FakeUserAgent`` per middleware (as user agent middlewares used
+to do) against user agent pool shared within a process, with and without
+user agents pinned per host.
+
+Usage:
+
+>>> python -m benchmarks.bench_user_agents [--repeat 5]
+"""
+
+from fake_useragent import FakeUserAgent
+from producthunt_scraper.middlewares import (
+    RandomUserAgentMiddleware,
+    RetryRandomUserAgentMiddleware,
+)
+from producthunt_scraper.useragents import _get_user_agent_pool, load_user_agents
+from scrapy import Request
+
+from benchmarks.utils import get_project_crawler, measure, parse_args, report
+
+
+class FakeUserAgentMiddleware:
+    """Set random ``User-Agent`` header using a ``FakeUserAgent``."""
+
+    def __init__(self, user_agent=None):
+        self.user_agent_provider = FakeUserAgent(fallback=user_agent)
+
+    def process_request(self, request, spider):
+        request.headers.setdefault("User-Agent", self.user_agent_provider.random)
+
+
+def start_fake_user_agent(crawler=None):
+    """Start user agent middlewares, each with its own ``FakeUserAgent``."""
+    user_agent = crawler.settings.get("USER_AGENT")
+    return FakeUserAgentMiddleware(user_agent), FakeUserAgent(fallback=user_agent)
+
+
+def start_pool(crawler=None):
+    """Start user agent middlewares, sharing a user agent pool."""
+    return (
+        RandomUserAgentMiddleware.from_crawler(crawler),
+        RetryRandomUserAgentMiddleware.from_crawler(crawler),
+    )
+
+
+def cold_start(start=None, crawler=None):
+    """Start user agent middlewares, without user agents loaded before."""
+    load_user_agents.cache_clear()
+    _get_user_agent_pool.cache_clear()
+    return start(crawler)
+
+
+def make_requests(size=10000, hosts=4):
+    """Make requests, spread across hosts."""
+    return [
+        Request(f"""https://h{index % hosts}.producthunt.com/products/p-{index}""")
+        for index in range(size)
+    ]
+
+
+def process_requests(middleware=None, requests=None):
+    """Set user agent header of requests."""
+    for request in requests:
+        request.headers.pop(b"User-Agent", None)
+        middleware.process_request(request, None)
+
+
+def main():
+    args = parse_args(description=__doc__, repeat=5)
+    requests = make_requests()
+
+    results = {}
+    for name, start, settings in (
+        ("fake_user_agent", start_fake_user_agent, {}),
+        ("pool", start_pool, {}),
+        ("pool/pinned", start_pool, {"USER_AGENT_POOL_PINNED": True}),
+        ("pool/disabled", start_pool, {"USER_AGENT_POOL_ENABLED": False}),
+    ):
+        crawler = get_project_crawler(settings=settings)
+
+        # cold start, as in a new process
+        startup_time = measure(lambda s=start, c=crawler: cold_start(s, c), args.repeat)
+        middleware, _ = cold_start(start, crawler)
+        secs = measure(lambda m=middleware: process_requests(m, requests), args.repeat)
+        results[name] = {
+            "startup_ms": startup_time * 1000,
+            "requests_per_sec": len(requests) / secs,
+            "us_per_request": secs / len(requests) * 1e6,
+            "user_agents": len(
+                {request.headers[b"User-Agent"] for request in requests}
+            ),
+        }
+
+    report(results, json_path=args.json_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""Synthetic producthunt pages used by benchmarks.
+
+Pages mimic the structure of producthunt.com Next.js pages i.e markup
+followed by a ``__NEXT_DATA__`` script with a normalized ``apolloState``
+cache. Saved pages may be used instead, see ``load_pages``. GraphQL
+responses hold the same entities, denormalized, see ``make_graphql_body``.
+"""
+
+import json
+from pathlib import Path
+
+from scrapy.http import HtmlResponse
+
+BASE_URL = "https://www.producthunt.com"
+
+__all__ = [
+    "load_pages",
+    "make_graphql_body",
+    "make_graphql_post",
+    "make_graphql_product",
+    "make_home_page",
+    "make_leaderboard_page",
+    "make_post_page",
+    "make_product_page",
+    "make_response",
+    "make_topic_page",
+    "make_topics_page",
+]
+
+
+def _make_topic(index=0):
+    """Make a topic apollo entity."""
+    return {
+        "__typename": "Topic",
+        "id": f"""{index}""",
+        "name": f"""Topic {index}""",
+        "slug": f"""topic-{index}""",
+        "followersCount": index * 11,
+    }
+
+
+def _make_category(index=0):
+    """Make a product category apollo entity."""
+    return {
+        "__typename": "ProductCategory",
+        "id": f"""{index}""",
+        "name": f"""Category {index}""",
+        "slug": f"""category-{index}""",
+    }
+
+
+def _make_user(index=0):
+    """Make a user apollo entity."""
+    return {
+        "__typename": "User",
+        "id": f"""{index}""",
+        "name": f"""User {index}""",
+        "username": f"""user{index}""",
+        "headline": "Maker of things " * 4,
+        "avatarUrl": f"""https://ph-avatars.imgix.net/{index}/original""",
+    }
+
+
+def _make_comment(index=0, user_index=0):
+    """Make a comment apollo entity."""
+    return {
+        "__typename": "Comment",
+        "id": f"""{index}""",
+        "body": "Congrats on the launch! Looks great, keep it up. " * 6,
+        "votesCount": index % 17,
+        "user": {"__ref": f"""User{user_index}"""},
+        "createdAt": "2023-10-24T00:01:00-07:00",
+    }
+
+
+def _make_product(index=0, topics=(), categories=()):
+    """Make a product apollo entity."""
+    slug = f"""product-{index}"""
+    return {
+        "__typename": "Product",
+        "id": f"""{index}""",
+        "slug": slug,
+        "name": f"""  Product {index}  """,
+        "tagline": f"""The best tool number {index}""",
+        "description": "A product description. " * 20,
+        "url": f"""{BASE_URL}/products/{slug}""",
+        "websiteUrl": f"""https://product-{index}.example.com""",
+        "reviewsRating": 4.5,
+        "followersCount": index * 7,
+        "totalVotesCount": index * 13,
+        "reviewersCount": index % 31,
+        "reviewsCount": index % 37,
+        "postsCount": index % 5,
+        "stacksCount": index % 41,
+        "alternativesCount": index % 11,
+        "tipsCount": 0,
+        "addonsCount": 0,
+        "platforms": ["Web", "iOS", "Android"],
+        "structuredData": {"@type": "SoftwareApplication", "name": slug},
+        'topics({"first":3})': {
+            "__typename": "TopicConnection",
+            "edges": [
+                {"__typename": "TopicEdge", "node": {"__ref": f"""Topic{topic}"""}}
+                for topic in topics
+            ],
+        },
+        "categories": [{"__ref": f"""ProductCategory{c}"""} for c in categories],
+    }
+
+
+def _make_post(index=0, product_index=0, topics=(), featured=False, featured_at=None):
+    """Make a post (i.e product launch) apollo entity."""
+    featured_at = featured_at or "2023-10-24T00:01:00-07:00"
+    slug = f"""post-{index}"""
+    post = {
+        "__typename": "Post",
+        "id": f"""{index}""",
+        "slug": slug,
+        "name": f"""Post {index}""",
+        "tagline": f"""Launch number {index}""",
+        "description": "A launch description. " * 20,
+        "url": f"""{BASE_URL}/posts/{slug}""",
+        "votesCount": index * 3,
+        "commentsCount": index % 23,
+        "dailyRank": index % 10 + 1,
+        "weeklyRank": index % 50 + 1,
+        "createdAt": featured_at,
+        "featuredAt": featured_at,
+        "updatedAt": "2023-10-24T10:01:00-07:00",
+        "product": {"__ref": f"""Product{product_index}"""},
+        'topics({"first":3})': {
+            "__typename": "TopicConnection",
+            "edges": [
+                {"__typename": "TopicEdge", "node": {"__ref": f"""Topic{topic}"""}}
+                for topic in topics
+            ],
+        },
+    }
+    if featured:
+        post["structuredData"] = {"@type": "Article", "name": slug}
+    return post
+
+
+def _make_apollo_state(main=None, entities=300):
+    """Make an apollo state with main entities and filler entities."""
+    apollo_state = {"ROOT_QUERY": {"__typename": "Query"}}
+    for index in range(entities):
+        apollo_state[f"""Topic{index}"""] = _make_topic(index)
+        apollo_state[f"""ProductCategory{index}"""] = _make_category(index)
+        apollo_state[f"""User{index}"""] = _make_user(index)
+        apollo_state[f"""Comment{index}"""] = _make_comment(index, index)
+    apollo_state.update(main or {})
+    return apollo_state
+
+
+def _make_page(apollo_state=None, markup_size=2000):
+    """Make a Next.js page with markup and ``__NEXT_DATA__`` script."""
+    next_data = {
+        "props": {"pageProps": {}, "apolloState": apollo_state or {}},
+        "page": "/",
+        "query": {},
+        "buildId": "benchmark",
+    }
+    markup = "".join(
+        f"""<div class="styles_item__{i}"><a href="/products/product-{i}">"""
+        f"""<span class="color-darker-grey">Product {i}</span></a></div>"""
+        for i in range(markup_size)
+    )
+    return (
+        """<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"/>"""
+        """<title>Product Hunt</title></head><body><div id="__next">"""
+        f"""<main class="layoutMain">{markup}</main></div>"""
+        """<script id="__NEXT_DATA__" type="application/json">"""
+        f"""{json.dumps(next_data)}</script></body></html>"""
+    ).encode("utf-8")
+
+
+def make_product_page(index=1, entities=300, markup_size=2000):
+    """Make a product page i.e ``/products/<slug>``."""
+    product = _make_product(index, topics=range(3), categories=range(2))
+    posts = {
+        f"""Post{index * 100 + i}""": _make_post(index * 100 + i, index, range(3))
+        for i in range(5)
+    }
+    main = {f"""Product{index}""": product, **posts}
+    apollo_state = _make_apollo_state(main=main, entities=entities)
+    return _make_page(apollo_state=apollo_state, markup_size=markup_size)
+
+
+def make_post_page(index=1, entities=300, markup_size=2000, featured_at=None):
+    """Make a post (i.e product launch) page i.e ``/posts/<slug>``."""
+    post = _make_post(
+        index, index, topics=range(3), featured=True, featured_at=featured_at
+    )
+    product = _make_product(index, topics=range(3), categories=range(2))
+    product.pop("structuredData")
+    main = {f"""Post{index}""": post, f"""Product{index}""": product}
+    apollo_state = _make_apollo_state(main=main, entities=entities)
+    return _make_page(apollo_state=apollo_state, markup_size=markup_size)
+
+
+def _make_links_page(links=None, main=None):
+    """Make a listing page whose links match spiders selectors."""
+    links = "".join(links or [])
+    return (
+        """<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"/>"""
+        """<title>Product Hunt</title></head><body><div id="__next">"""
+        f"""<main class="layoutMain">{main or ""}{links}</main></div>"""
+        """</body></html>"""
+    ).encode("utf-8")
+
+
+def make_home_page(posts=()):
+    """Make a home page i.e ``/``, with featured posts links."""
+    links = "".join(
+        f"""<div data-test="post-item-{index}"><a href="/posts/post-{index}">"""
+        f"""Post {index}</a></div>"""
+        for index in posts
+    )
+    return _make_links_page(
+        main=f"""<div data-test="homepage-section-0">{links}</div>"""
+    )
+
+
+def make_leaderboard_page(posts=()):
+    """Make a daily leaderboard page i.e ``/leaderboard/daily/<y>/<m>/<d>``."""
+    links = "".join(
+        f"""<div data-test="post-item-{index}"><a href="/posts/post-{index}">"""
+        f"""Post {index}</a></div>"""
+        for index in posts
+    )
+    return _make_links_page(main=f"""<div>{links}</div>""")
+
+
+def make_topics_page(topics=()):
+    """Make a topics page i.e ``/topics``, with trending topics links."""
+    links = "".join(
+        f"""<a href="/topics/topic-{index}">Topic {index}</a>""" for index in topics
+    )
+    return _make_links_page(
+        main=f"""<div data-test="trending-topics-card">{links}</div>"""
+    )
+
+
+def make_topic_page(products=()):
+    """Make a topic page i.e ``/topics/<slug>``, with products links."""
+    links = "".join(
+        f"""<div><div><a href="/products/product-{index}">Product {index}</a>"""
+        f"""</div></div>"""
+        for index in products
+    )
+    return _make_links_page(main=f"""<ul>{links}</ul>""")
+
+
+def _make_graphql_topics(topics=()):
+    """Make a denormalized topics connection, as selected by graphql queries."""
+    return {
+        "__typename": "TopicConnection",
+        "edges": [
+            {
+                "__typename": "TopicEdge",
+                "node": {
+                    key: _make_topic(topic)[key] for key in ("__typename", "id", "name")
+                },
+            }
+            for topic in topics
+        ],
+    }
+
+
+def make_graphql_product(index=1):
+    """Make a denormalized product, as selected by ``Products`` query."""
+    product = _make_product(index, topics=range(3), categories=range(2))
+    product.pop('topics({"first":3})')
+    product["topics"] = _make_graphql_topics(topics=range(3))
+    product["categories"] = [
+        {key: _make_category(c)[key] for key in ("__typename", "id", "name")}
+        for c in range(2)
+    ]
+    return product
+
+
+def make_graphql_post(index=1):
+    """Make a denormalized post, as selected by ``Posts`` query."""
+    post = _make_post(index, index, topics=range(3), featured=True)
+    product = _make_product(index)
+    post.pop('topics({"first":3})')
+    post["topics"] = _make_graphql_topics(topics=range(3))
+    post["product"] = {key: product[key] for key in ("__typename", "id", "name", "url")}
+    return post
+
+
+def make_graphql_body(data=None, errors=None):
+    """Make a graphql response body, as compact JSON."""
+    payload = {"data": data} if errors is None else {"data": data, "errors": errors}
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def make_response(url=None, body=None):
+    """Make a scrapy html response."""
+    return HtmlResponse(url=url, body=body, encoding="utf-8")
+
+
+def load_pages(paths=None):
+    """Load saved or synthetic product and post pages.
+
+    Parameters
+    ----------
+    paths (list):
+        Valid paths to saved pages. Pages which have ``post`` in their
+        name are considered post pages.
+
+    Returns
+    -------
+    pages (dict):
+        Valid page name to ``(url, body)`` mappings.
+    """
+    if not paths:
+        return {
+            "product": (f"""{BASE_URL}/products/product-1""", make_product_page()),
+            "post": (f"""{BASE_URL}/posts/post-1""", make_post_page()),
+        }
+
+    pages = {}
+    for path in paths:
+        path = Path(path)
+        kind = "posts" if "post" in path.name else "products"
+        pages[path.stem] = (f"""{BASE_URL}/{kind}/{path.stem}""", path.read_bytes())
+    return pages
@@ -0,0 +1,504 @@
+"""Local HTTP stand-in for producthunt.com, used to benchmark crawls.
+
+Serve recorded or synthetic home, topics, topic, product and post pages,
+with configurable latency, jitter, error injection and rate limiting (i.e
+``429`` above a maximum number of requests in flight). Pages respond with
+an ``ETag`` header and ``304`` to matching conditional requests. With
+``--tls``, pages are served over https (self-signed) using HTTP/2 or HTTP/1.1
+as negotiated by clients.
+
+Daily leaderboard pages (i.e ``/leaderboard/daily/2023/10/24``) list
+``--posts`` posts per day, featured on that day.
+
+Recorded pages are looked up in a directory by url path i.e ``/`` as
+``index.html``, ``/topics`` as ``topics.html`` and ``/products/notion`` as
+``products/notion.html``. Missing pages are synthesized.
+
+Persisted graphql queries (see ``producthunt_scraper.graphql``) are served
+at ``/frontend/graphql`` as compact JSON, paginating topics products and
+featured posts by offset cursors, over the same synthetic entities. Query
+hashes are unknown (i.e ``PersistedQueryNotFound``) until sent along their
+query text, and responses hold only fields selected by queries (i.e without
+``__typename`` unless selected), as a graphql server would.
+
+Usage:
+
+>>> python -m benchmarks.replay [--port 8080] [--latency 0.05] [--jitter 0.02]
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import random
+import re
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+from twisted.internet import protocol
+from twisted.web import resource, server
+
+from benchmarks.fixtures import (
+    make_graphql_body,
+    make_graphql_post,
+    make_graphql_product,
+    make_home_page,
+    make_leaderboard_page,
+    make_post_page,
+    make_product_page,
+    make_topic_page,
+    make_topics_page,
+)
+
+REPLAY_PAGES_OPTIONS = (
+    "recordings_dir",
+    "topics",
+    "products",
+    "products_per_topic",
+    "posts",
+    "entities",
+)
+
+# url path of graphql endpoint
+GRAPHQL_PATH = "/frontend/graphql"
+
+# graphql field arguments, and tokens of selection sets (i.e braces and fields)
+GRAPHQL_ARGUMENTS_PATTERN = re.compile(r"\([^)]*\)")
+GRAPHQL_TOKEN_PATTERN = re.compile(r"[{}]|[A-Za-z_][A-Za-z0-9_]*")
+
+# first day of leaderboards, and index of its first post
+LEADERBOARD_EPOCH = datetime.date(2013, 11, 24)
+LEADERBOARD_POST_OFFSET = 1000000
+
+__all__ = ["ReplayPages", "ReplayResource", "select_fields", "start_server"]
+
+
+def parse_selections(query=None):
+    """Parse selection sets of a graphql query, as nested fields.
+
+    Examples
+    --------
+    >>> from benchmarks.replay import parse_selections
+    >>> parse_selections("query A($id: ID!) { a(id: $id) { id b { name } } }")
+    {'a': {'id': None, 'b': {'name': None}}}
+    """
+    body = GRAPHQL_ARGUMENTS_PATTERN.sub("", query.partition("{")[2])
+    tokens = iter(GRAPHQL_TOKEN_PATTERN.findall(body))
+
+    def parse():
+        selections, field = {}, None
+        for token in tokens:
+            if token == "{":
+                selections[field] = parse()
+            elif token == "}":
+                break
+            else:
+                field = token
+                selections[field] = None
+        return selections
+
+    return parse()
+
+
+def select_fields(value=None, selections=None):
+    """Select fields of a value, as selected by a graphql query.
+
+    Examples
+    --------
+    >>> from benchmarks.replay import select_fields
+    >>> select_fields({"a": [{"__typename": "A", "id": "1"}]}, {"a": {"id": None}})
+    {'a': [{'id': '1'}]}
+    """
+    if selections is None:
+        return value
+    if isinstance(value, list):
+        return [select_fields(nested_value, selections) for nested_value in value]
+    if not isinstance(value, dict):
+        return value
+    return {
+        field: select_fields(value.get(field), nested_selections)
+        for field, nested_selections in selections.items()
+    }
+
+
+class ReplayPages:
+    """Recorded or synthetic pages of a producthunt.com stand-in.
+
+    Parameters
+    ----------
+    recordings_dir (str):
+        Valid directory of recorded pages.
+
+    topics (int):
+        Valid number of trending topics.
+
+    products (int):
+        Valid number of distinct products.
+
+    products_per_topic (int):
+        Valid number of products listed per topic. Topics list overlapping
+        products, so same products are found under many topics.
+
+    posts (int):
+        Valid number of featured posts.
+
+    entities (int):
+        Valid number of filler apollo entities per product or post page.
+    """
+
+    def __init__(
+        self,
+        recordings_dir=None,
+        topics=10,
+        products=100,
+        products_per_topic=20,
+        posts=20,
+        entities=300,
+    ):
+        self.recordings_dir = Path(recordings_dir) if recordings_dir else None
+        self.topics = topics
+        self.products = products
+        self.products_per_topic = products_per_topic
+        self.posts = posts
+        self.entities = entities
+        self.get = lru_cache(maxsize=4096)(self._get)
+        self.get_graphql_data = lru_cache(maxsize=4096)(self._get_graphql_data)
+        self.persisted_queries = {}
+
+    def _read_recording(self, path=None):
+        """Read recorded page of a url path, if any."""
+        if self.recordings_dir is None:
+            return None
+        name = path.strip("/") or "index"
+        recording = self.recordings_dir / f"""{name}.html"""
+        return recording.read_bytes() if recording.is_file() else None
+
+    def _get(self, path=None):
+        """Get body of a page by its url path, or ``None`` if not found."""
+        path = path.rstrip("/") or "/"
+        recording = self._read_recording(path)
+        if recording is not None:
+            return recording
+
+        if path == "/":
+            return make_home_page(posts=range(self.posts))
+        if path == "/topics":
+            return make_topics_page(topics=range(self.topics))
+        if path.startswith("/leaderboard/daily/"):
+            return self._get_leaderboard(path)
+
+        kind, _, slug = path.strip("/").partition("/")
+        index = slug.rpartition("-")[2]
+        if not index.isdigit():
+            return None
+
+        index = int(index)
+        if kind == "topics" and index < self.topics:
+            return make_topic_page(products=self._get_topic_products(index))
+        if kind == "products" and index < self.products:
+            return make_product_page(index=index, entities=self.entities)
+        if kind == "posts" and index < self.posts:
+            return make_post_page(index=index, entities=self.entities)
+        if kind == "posts" and index >= LEADERBOARD_POST_OFFSET:
+            days = (index - LEADERBOARD_POST_OFFSET) // max(1, self.posts)
+            featured_at = f"""{LEADERBOARD_EPOCH + datetime.timedelta(days)}"""
+            return make_post_page(
+                index=index,
+                entities=self.entities,
+                featured_at=f"""{featured_at}T00:01:00-08:00""",
+            )
+        return None
+
+    def _get_leaderboard(self, path=None):
+        """Get daily leaderboard page, listing posts featured on its day."""
+        try:
+            year, month, day = path.split("/")[3:6]
+            day = datetime.date(int(year), int(month), int(day))
+        except ValueError:
+            return None
+        if day < LEADERBOARD_EPOCH:
+            return None
+
+        first = LEADERBOARD_POST_OFFSET + (day - LEADERBOARD_EPOCH).days * self.posts
+        return make_leaderboard_page(posts=range(first, first + self.posts))
+
+    def _get_topic_products(self, index=0):
+        """Get indexes of products listed by a topic."""
+        stride = max(1, self.products_per_topic // 2)
+        return [
+            (index * stride + offset) % self.products
+            for offset in range(self.products_per_topic)
+        ]
+
+    def _get_connection(self, ids=None, variables=None):
+        """Get a page of a connection of entities ids, by offset cursor."""
+        offset = int(variables.get("after") or 0)
+        first = max(0, int(variables.get("first") or 20))
+        page = ids[offset : offset + first]
+        return {
+            "__typename": "Connection",
+            "edges": [{"node": {"__typename": "Node", "id": f"""{i}"""}} for i in page],
+            "pageInfo": {
+                "endCursor": f"""{offset + len(page)}""",
+                "hasNextPage": offset + len(page) < len(ids),
+            },
+        }
+
+    def get_graphql(self, query=None):
+        """Get body of a persisted graphql query, registering its query text."""
+        query = dict(parse_qsl(query or ""))
+        extensions = json.loads(query.get("extensions") or "{}")
+        query_hash = (extensions.get("persistedQuery") or {}).get("sha256Hash")
+        query_text = query.get("query")
+        if query_text is not None:
+            if hashlib.sha256(query_text.encode("utf-8")).hexdigest() != query_hash:
+                errors = [{"message": "provided sha does not match query"}]
+                return make_graphql_body(data=None, errors=errors)
+            self.persisted_queries[query_hash] = query_text
+        if query_hash not in self.persisted_queries:
+            errors = [{"message": "PersistedQueryNotFound"}]
+            return make_graphql_body(data=None, errors=errors)
+
+        return self.get_graphql_data(
+            query_hash, query.get("operationName"), query.get("variables") or "{}"
+        )
+
+    def _get_graphql_data(self, query_hash=None, operation=None, variables=None):
+        """Get body of a graphql operation, with fields selected by its query."""
+        variables = json.loads(variables)
+        ids = [int(i) for i in variables.get("ids") or [] if str(i).isdigit()]
+        if operation == "TrendingTopics":
+            topics = range(min(self.topics, int(variables.get("first") or 20)))
+            edges = [
+                {
+                    "node": {
+                        "__typename": "Topic",
+                        "id": f"""{i}""",
+                        "slug": f"""topic-{i}""",
+                        "name": f"""Topic {i}""",
+                    }
+                }
+                for i in topics
+            ]
+            data = {"trendingTopics": {"edges": edges}}
+        elif operation == "TopicProducts":
+            index = str(variables.get("slug") or "").rpartition("-")[2]
+            if not index.isdigit() or int(index) >= self.topics:
+                data = {"topic": None}
+            else:
+                products = self._get_topic_products(int(index))
+                connection = self._get_connection(ids=products, variables=variables)
+                data = {
+                    "topic": {
+                        "__typename": "Topic",
+                        "id": index,
+                        "products": connection,
+                    }
+                }
+        elif operation == "Products":
+            data = {
+                "products": [make_graphql_product(i) for i in ids if i < self.products]
+            }
+        elif operation == "FeaturedPosts":
+            posts = list(range(self.posts))
+            data = {
+                "featuredPosts": self._get_connection(ids=posts, variables=variables)
+            }
+        else:
+            data = {"posts": [make_graphql_post(i) for i in ids if i < self.posts]}
+        selections = parse_selections(self.persisted_queries[query_hash])
+        return make_graphql_body(data=select_fields(data, selections))
+
+
+class ReplayResource(resource.Resource):
+    """Serve replay pages with latency, jitter and error injection.
+
+    Parameters
+    ----------
+    pages (ReplayPages):
+        Valid pages to serve.
+
+    latency (float):
+        Valid mean response latency in seconds.
+
+    jitter (float):
+        Valid maximum deviation of response latency in seconds.
+
+    error_rate (float):
+        Valid ratio of responses failed with ``503``.
+
+    seed (int):
+        Valid random seed, so runs are reproducible.
+
+    max_concurrency (int):
+        Valid maximum number of requests in flight. Requests above it are
+        rate limited with ``429`` and ``Retry-After`` header.
+
+    retry_after (int):
+        Valid seconds of ``Retry-After`` header of rate limited responses.
+    """
+
+    isLeaf = True
+
+    def __init__(
+        self,
+        pages=None,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        seed=0,
+        max_concurrency=0,
+        retry_after=1,
+    ):
+        super(ReplayResource, self).__init__()
+        self.pages = pages or ReplayPages()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.max_concurrency = max_concurrency
+        self.retry_after = retry_after
+        self.in_flight = 0
+
+    def render_GET(self, request):
+        from twisted.internet import reactor
+        from twisted.internet.task import deferLater
+
+        if self.max_concurrency and self.in_flight >= self.max_concurrency:
+            request.setResponseCode(429)
+            request.setHeader(b"Retry-After", str(self.retry_after).encode("latin-1"))
+            return b"Too Many Requests"
+
+        self.in_flight = self.in_flight + 1
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        failed = self.random.random() < self.error_rate
+        deferred = deferLater(reactor, max(0.0, delay), self.respond, request, failed)
+        deferred.addErrback(lambda _: None)
+        deferred.addBoth(self._done)
+        request.notifyFinish().addErrback(lambda _: deferred.cancel())
+        return server.NOT_DONE_YET
+
+    def _done(self, _=None):
+        """Release in flight request."""
+        self.in_flight = self.in_flight - 1
+
+    def respond(self, request=None, failed=False):
+        """Write response of a request."""
+        path = request.path.decode("utf-8")
+        is_graphql = path == GRAPHQL_PATH
+        if failed:
+            body = None
+        elif is_graphql:
+            query = request.uri.decode("utf-8").partition("?")[2]
+            body = self.pages.get_graphql(query)
+        else:
+            body = self.pages.get(path)
+        if failed:
+            request.setResponseCode(503)
+            body = b"Service Unavailable"
+        elif body is None:
+            request.setResponseCode(404)
+            body = b"Not Found"
+        else:
+            etag = f'''"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'''
+            request.setHeader(b"ETag", etag.encode("latin-1"))
+            if request.getHeader(b"If-None-Match") == etag:
+                request.setResponseCode(304)
+                body = b""
+            elif is_graphql:
+                request.setHeader(b"Content-Type", b"application/json")
+            else:
+                request.setHeader(b"Content-Type", b"text/html; charset=utf-8")
+
+        request.write(body)
+        request.finish()
+
+
+def make_tls_options(host="127.0.0.1"):
+    """Make self-signed tls options, negotiating HTTP/2 or HTTP/1.1."""
+    import ipaddress
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+    from OpenSSL import crypto
+    from twisted.internet import ssl
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, host)])
+    now = datetime.datetime.utcnow()
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address(host))]),
+            critical=False,
+        )
+        .sign(key, hashes.SHA256())
+    )
+    return ssl.CertificateOptions(
+        privateKey=crypto.PKey.from_cryptography_key(key),
+        certificate=crypto.X509.from_cryptography(certificate),
+        acceptableProtocols=[b"h2", b"http/1.1"],
+    )
+
+
+def start_server(port=0, interface="127.0.0.1", tls=False, **kwargs):
+    """Listen for requests, and return listening port."""
+    from twisted.internet import reactor
+
+    pages = ReplayPages(
+        **{key: kwargs.pop(key) for key in REPLAY_PAGES_OPTIONS if key in kwargs}
+    )
+    site = server.Site(ReplayResource(pages=pages, **kwargs))
+    site.noisy = False
+    if tls:
+        # negotiate protocols using tls options only, as negotiating them per
+        # connection mutate a shared tls context (unsupported by pyOpenSSL)
+        factory = protocol.Factory()
+        factory.buildProtocol = site.buildProtocol
+        options = make_tls_options(host=interface)
+        return reactor.listenSSL(port, factory, options, interface=interface)
+    return reactor.listenTCP(port, site, interface=interface)
+
+
+def add_arguments(parser=None):
+    """Add replay server command line arguments."""
+    parser.add_argument("--recordings-dir", help="Directory of recorded pages.")
+    parser.add_argument("--topics", type=int, default=10)
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--products-per-topic", type=int, default=20)
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--entities", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--tls", action="store_true", help="Serve over https.")
+    return parser
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=0)
+    args = add_arguments(parser).parse_args()
+    options = vars(args)
+    from twisted.internet import reactor
+
+    port = start_server(**options)
+    scheme = "https" if args.tls else "http"
+    print(f"""{scheme}://127.0.0.1:{port.getHost().port}""", flush=True)
+    reactor.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark helpers."""
+
+import argparse
+import json
+import time
+
+__all__ = ["get_project_crawler", "measure", "parse_args", "percentile", "report"]
+
+
+def get_project_crawler(spider_class=None, settings=None):
+    """Create a crawler using project settings, with optional overrides."""
+    from scrapy.utils.project import get_project_settings
+    from scrapy.utils.reactor import install_reactor
+    from scrapy.utils.test import get_crawler
+
+    project_settings = get_project_settings()
+    install_reactor(project_settings.get("TWISTED_REACTOR"))
+    project_settings.update(settings or {})
+    return get_crawler(
+        spidercls=spider_class,
+        settings_dict=project_settings.copy_to_dict(),
+    )
+
+
+def parse_args(description=None, **defaults):
+    """Parse common benchmark command line arguments."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("pages", nargs="*", help="Paths to saved pages.")
+    parser.add_argument("--repeat", type=int, default=defaults.get("repeat", 200))
+    parser.add_argument("--json", dest="json_path", help="Write JSON report to.")
+    return parser.parse_args()
+
+
+def measure(func=None, repeat=1):
+    """Call a function ``repeat`` times and return seconds per call."""
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started_at) / repeat
+
+
+def percentile(values=None, q=50):
+    """Compute nearest-rank ``q`` percentile of values."""
+    values = sorted(values or [])
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, round(q / 100 * len(values)) - 1))
+    return values[rank]
+
+
+def report(results=None, json_path=None):
+    """Print benchmark results and optionally save them as JSON."""
+    for name, values in results.items():
+        values = ", ".join(
+            (
+                f"""{key}={value:.6g}"""
+                if isinstance(value, float)
+                else f"""{key}={value}"""
+            )
+            for key, value in values.items()
+        )
+        print(f"""{name}: {values}""")
+
+    if json_path:
+        with open(json_path, "w") as json_file:
+            json.dump(results, json_file, indent=2)
@@ -0,0 +1,379 @@
+"""Apollo state (i.e normalized GraphQL cache) helpers.
+
+Provide lazy view of page ``apolloState`` which index entities offsets in a
+single scan and decode entities only on first access, and locate page script
+data (i.e ``__NEXT_DATA__``) holding it.
+"""
+
+import re
+from collections import defaultdict
+from collections.abc import Mapping
+
+from producthunt_scraper import jsonlib
+
+APOLLO_STATE_MARKER = b'"apolloState"'
+DEFAULT_PAGE_SCRIPT_DATA_MARKER = b'id="__NEXT_DATA__"'
+JSON_BRACKET_PATTERN = re.compile(
+    rb'[^"{}\[\]]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}\[\]]*)*([{}\[\]])'
+)
+JSON_STRING_PATTERN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+JSON_WHITESPACE = b" \t\r\n"
+EMPTY_REFS = frozenset()
+
+__all__ = ["ApolloRefIndex", "LazyApolloState", "locate_script_data", "parse_refs"]
+
+
+def locate_script_data(body=None, marker=None):
+    """Locate start and end offsets of page script data in a body.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.apollo import locate_script_data
+    >>> locate_script_data(b'<script id="__NEXT_DATA__">{}</script>')
+    (27, 29)
+    """
+    # ensure script data marker
+    marker = marker or DEFAULT_PAGE_SCRIPT_DATA_MARKER
+
+    # locate script data between script start and end tags
+    marker_start = body.find(marker)
+    if marker_start < 0:
+        return None
+
+    tag_start = body.rfind(b"<script", 0, marker_start)
+    if tag_start < 0 or b">" in body[tag_start:marker_start]:
+        return None
+
+    data_start = body.find(b">", marker_start)
+    data_end = body.find(b"</script>", data_start)
+    if data_start < 0 or data_end < 0:
+        return None
+
+    return data_start + 1, data_end
+
+
+def parse_refs(value=None, ref_type="__ref"):
+    """Parse reference keys from an entity field value.
+
+    Parameters
+    ----------
+    value (dict|list):
+        Valid entity field value.
+
+    ref_type (str):
+        Valid type of related data. Default to ``__ref``.
+
+    Returns
+    -------
+    refs (frozenset):
+        Valid set of keys to referenced data.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.apollo import parse_refs
+    >>> parse_refs({"edges": [{"node": {"__ref": "Topic1"}}]})
+    frozenset({'Topic1'})
+    """
+    value = value or {}
+
+    # parse a dict with list of refs i.e ``{"edges": [{"node": {"__ref": "Product21"}}]}``
+    if isinstance(value, dict) and "edges" in value:
+        value = value.get("edges") or []
+
+    # parse a list of refs i.e ``[{"node": {"__ref": "Product21"}}]``
+    # parse a list of refs i.e ``[{"__ref": "Product21"}]``
+    if isinstance(value, list):
+        value = [
+            ref_value.get("node") or {} if "node" in ref_value else ref_value
+            for ref_value in value
+            if ref_value and isinstance(ref_value, dict)
+        ]
+
+    # parse a dict ref e.g ``{"__ref": "Product21"}``
+    if isinstance(value, dict) and ref_type in value:
+        value = [value]
+
+    # collect refs from a list of refs i.e ``[{"__ref": "Product21"}]``
+    value = value if isinstance(value, list) else []
+    refs = [(ref_value.get(ref_type) or "").strip() for ref_value in value if ref_value]
+    refs = frozenset(ref for ref in refs if ref)
+
+    return refs or EMPTY_REFS
+
+
+class LazyApolloState(Mapping):
+    """Read-only mapping of apollo state entities, decoded on first access.
+
+    Entities offsets are indexed in a single scan over brackets of the raw
+    apollo state document. Nested entity values are skipped without being
+    decoded, so memory and decoding cost scale with accessed entities.
+
+    Parameters
+    ----------
+    data (bytes):
+        Valid utf-8 encoded apollo state JSON object.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.apollo import LazyApolloState
+    >>> state = LazyApolloState(b'{"Topic1": {"name": "AI"}, "Topic2": {}}')
+    >>> state["Topic1"]
+    {'name': 'AI'}
+    >>> list(state.find("Topic"))
+    [('Topic1', {'name': 'AI'}), ('Topic2', {})]
+    """
+
+    def __init__(self, data=None):
+        self.data = data or b"{}"
+        self._offsets = None
+        self._entities = {}
+
+    @classmethod
+    def from_script_data(cls, data=None, start=0, end=None):
+        """Create lazy apollo state from raw page script data.
+
+        Parameters
+        ----------
+        data (bytes):
+            Valid utf-8 encoded page script data (i.e ``__NEXT_DATA__``) or
+            a page body which contains it.
+
+        start (int):
+            Valid offset where page script data starts. Default to ``0``.
+
+        end (int):
+            Valid offset where page script data ends. Default to data length.
+
+        Returns
+        -------
+        state (LazyApolloState|None):
+            Valid lazy apollo state or ``None`` if apollo state not found.
+        """
+        end = len(data) if end is None else end
+        marker_start = data.find(APOLLO_STATE_MARKER, start, end)
+        if marker_start < 0:
+            return None
+
+        # ensure apollo state is an object
+        value_start = data.find(b":", marker_start + len(APOLLO_STATE_MARKER))
+        value_start = value_start + 1
+        while value_start < len(data) and data[value_start] in JSON_WHITESPACE:
+            value_start = value_start + 1
+        if data[value_start : value_start + 1] != b"{":
+            return None
+
+        # index apollo state in place, without copying its data
+        state = cls(data)
+        state._index(start=value_start)
+        return state
+
+    def _index(self, start=0):
+        """Index top level keys and their values offsets in a single scan.
+
+        Only brackets are visited while skipping over nested strings, and
+        top level keys are collected from segments between brackets.
+        """
+        data = self.data
+        keys = []
+        depth = 0
+        segment_start = start
+        self._end = len(data) - 1
+
+        for bracket in JSON_BRACKET_PATTERN.finditer(data, start):
+            bracket_start = bracket.start(1)
+
+            # collect top level keys and where their values start
+            if depth == 1:
+                for token in JSON_STRING_PATTERN.finditer(
+                    data, segment_start, bracket_start
+                ):
+                    colon = token.end()
+                    while data[colon] in JSON_WHITESPACE:
+                        colon = colon + 1
+                    if data[colon] == 58:  # i.e ``:``
+                        keys.append((token.start(), token.end(), colon + 1))
+
+            # track nesting of objects and arrays
+            depth = depth + 1 if data[bracket_start] in b"{[" else depth - 1
+            segment_start = bracket_start + 1
+            if depth == 0:
+                self._end = bracket_start
+                break
+
+        # compute values offsets, a value ends before next key separator
+        offsets = {}
+        for index, (key_start, key_end, value_start) in enumerate(keys):
+            value_end = self._end
+            if index + 1 < len(keys):
+                value_end = data.rfind(b",", value_start, keys[index + 1][0])
+            key = jsonlib.loads(data[key_start:key_end])
+            offsets[key] = (value_start, value_end)
+
+        self._offsets = offsets
+
+    @property
+    def offsets(self):
+        """Entities keys to their raw value offsets."""
+        if self._offsets is None:
+            self._index()
+        return self._offsets
+
+    def __getitem__(self, key):
+        if key in self._entities:
+            return self._entities[key]
+
+        start, end = self.offsets[key]
+        entity = jsonlib.loads(self.data[start:end])
+        self._entities[key] = entity
+        return entity
+
+    def __contains__(self, key):
+        return key in self.offsets
+
+    def __iter__(self):
+        return iter(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def find(self, key=None):
+        """Iterate entities whose keys contain a given key.
+
+        Parameters
+        ----------
+        key (str):
+            Valid part of entities keys e.g ``Product``.
+
+        Returns
+        -------
+        entities (iterator):
+            Valid iterator of ``(key, entity)`` pairs.
+        """
+        for entity_key in self.offsets:
+            if key in entity_key:
+                yield entity_key, self[entity_key]
+
+
+class ApolloRefIndex:
+    """Index of apollo state entities and their references.
+
+    The index is built in a single pass over apollo state, and contain:
+        * typename to entities keys
+        * entity key to its fields references (i.e field to set of keys)
+    Only fields holding objects or arrays are kept as references, so lookups
+    of entity fields and typenames are answered without scanning entities.
+
+    Parameters
+    ----------
+    source (dict|Mapping):
+        Valid apollo state.
+
+    ref_type (str):
+        Valid type of related data. Default to ``__ref``.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.apollo import ApolloRefIndex
+    >>> state = {
+    ...     "Product1": {"__typename": "Product", "topics": [{"__ref": "Topic1"}]},
+    ...     "Topic1": {"__typename": "Topic", "name": "AI"},
+    ... }
+    >>> index = ApolloRefIndex(state)
+    >>> index.typenames["Topic"]
+    ['Topic1']
+    >>> list(index.find("Product"))
+    [('Product1', {'__typename': 'Product', 'topics': [{'__ref': 'Topic1'}]})]
+    >>> index.ref_keys(key="topic", source=state["Product1"])
+    frozenset({'Topic1'})
+    >>> index.ref_values("Topic1")
+    [{'__typename': 'Topic', 'name': 'AI'}]
+    """
+
+    def __init__(self, source=None, ref_type="__ref"):
+        self.source = source if source is not None else {}
+        self.ref_type = ref_type
+        self.typenames = defaultdict(list)
+        self.entities = {}
+        self.refs = {}
+        self._keys = {}
+        self._index()
+
+    def _index(self):
+        """Index typenames and fields references of entities in a single pass."""
+        for key, entity in self.source.items():
+            if not isinstance(entity, dict):
+                continue
+            self.typenames[entity.get("__typename")].append(key)
+            self.entities[key] = entity
+            self.refs[key] = {
+                field: parse_refs(value=value, ref_type=self.ref_type)
+                for field, value in entity.items()
+                if isinstance(value, (dict, list))
+            }
+            # map entities to their keys, as spiders look up entities values
+            self._keys[id(entity)] = key
+
+    def find(self, typename=None):
+        """Iterate entities of a typename.
+
+        Parameters
+        ----------
+        typename (str):
+            Valid entities typename e.g ``Product``.
+
+        Returns
+        -------
+        entities (iterator):
+            Valid iterator of ``(key, entity)`` pairs.
+        """
+        for key in self.typenames.get(typename, ()):
+            yield key, self.entities[key]
+
+    def ref_keys(self, key=None, source=None, strict=False):
+        """Get referenced keys of an entity field.
+
+        Parameters
+        ----------
+        key (str):
+            Valid related data key. Match first reference field which contain
+            the key, unless ``strict``.
+
+        source (dict):
+            Valid indexed apollo state entity.
+
+        strict (bool):
+            Whether related data key should match exactly. Default to ``False``.
+
+        Returns
+        -------
+        refs (frozenset|None):
+            Valid set of keys to referenced data, or ``None`` if the entity is
+            not indexed (i.e it is not an entity of apollo state).
+        """
+        refs = self.refs.get(self._keys.get(id(source)))
+        if refs is None:
+            return None
+        if strict:
+            return refs.get(key, EMPTY_REFS)
+
+        # match first reference field, as fields are ordered
+        for field, field_refs in refs.items():
+            if key in field:
+                return field_refs
+        return EMPTY_REFS
+
+    def ref_values(self, *keys):
+        """Resolve referenced keys to their entities.
+
+        Parameters
+        ----------
+        keys (*str):
+            Valid keys of related data.
+
+        Returns
+        -------
+        values (list):
+            Valid list of referenced entities.
+        """
+        values = [self.entities.get(key) for key in keys if key]
+        return [value for value in values if value]
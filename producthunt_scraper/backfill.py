@@ -0,0 +1,188 @@
+"""Historical backfill of featured product launches, over a range of days.
+
+Leaderboard page of each day (i.e ``/leaderboard/daily/2023/10/24``) is
+crawled along with its launches pages, a bounded window of days at a time.
+Items are written into the partition of their launch day (i.e
+``date=2023-10-24``) instead of the crawl date, using a feed per day which
+accepts items featured on that day only (see ``BackfillDateFilter``).
+
+Finished days (i.e all of their pages parsed) are checkpointed, so an
+interrupted backfill resumes without refetching them.
+
+Configure backfills using ``BACKFILL_*`` settings.
+"""
+
+import sqlite3
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from itemadapter import ItemAdapter
+from scrapy.extensions.feedexport import ItemFilter
+
+__all__ = [
+    "BackfillCheckpoint",
+    "BackfillDateFilter",
+    "get_backfill_feeds",
+    "get_launch_date",
+    "iter_dates",
+]
+
+# launch fields holding launch day, in order of preference
+LAUNCH_DATE_FIELDS = ("launch_featured_at", "launch_created_at")
+
+
+def iter_dates(started_on=None, ended_on=None):
+    """Iterate days of a date range, both ends included.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.backfill import iter_dates
+    >>> [str(day) for day in iter_dates("2023-10-30", "2023-11-01")]
+    ['2023-10-30', '2023-10-31', '2023-11-01']
+    """
+    if isinstance(started_on, str):
+        started_on = date.fromisoformat(started_on)
+    if isinstance(ended_on, str):
+        ended_on = date.fromisoformat(ended_on)
+    ended_on = ended_on or started_on
+    if ended_on < started_on:
+        raise ValueError(f"""Backfill ends ({ended_on}) before it starts""")
+
+    for days in range((ended_on - started_on).days + 1):
+        yield started_on + timedelta(days=days)
+
+
+def get_launch_date(item=None):
+    """Get launch day of a launch item, as on producthunt leaderboards.
+
+    Launch times are local to producthunt (i.e ``-07:00``), so their date
+    part is their leaderboard day.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.backfill import get_launch_date
+    >>> get_launch_date({"launch_featured_at": "2023-10-24T00:01:00-07:00"})
+    '2023-10-24'
+    >>> get_launch_date({"launch_featured_at": None}) is None
+    True
+    """
+    adapter = ItemAdapter(item)
+    for field in LAUNCH_DATE_FIELDS:
+        value = adapter.get(field)
+        if value:
+            return str(value)[:10]
+    return None
+
+
+class BackfillDateFilter(ItemFilter):
+    """Accept items launched on day of a feed (i.e ``backfill_date`` option)."""
+
+    def __init__(self, feed_options=None):
+        super(BackfillDateFilter, self).__init__(feed_options)
+        self.backfill_date = (feed_options or {}).get("backfill_date")
+
+    def accepts(self, item):
+        if not super(BackfillDateFilter, self).accepts(item):
+            return False
+        return get_launch_date(item) == self.backfill_date
+
+
+def get_backfill_feeds(feeds=None, dates=None):
+    """Split feeds into a feed per day, written into its day partition.
+
+    Feeds whose uri depend on crawl date (i.e ``%(last_scraped_date)s``)
+    are split, other feeds are kept as is.
+
+    Parameters
+    ----------
+    feeds (dict):
+        Valid ``FEEDS`` setting.
+
+    dates (iterable):
+        Valid days of backfill.
+
+    Returns
+    -------
+    feeds (dict):
+        Valid ``FEEDS`` setting, with a feed per day.
+
+    Examples
+    --------
+    >>> from datetime import date
+    >>> from producthunt_scraper.backfill import get_backfill_feeds
+    >>> feeds = {"data/date=%(last_scraped_date)s/part.jsonl": {"format": "jsonlines"}}
+    >>> feeds = get_backfill_feeds(feeds, [date(2023, 10, 24)])
+    >>> list(feeds)
+    ['data/date=2023-10-24/part.jsonl']
+    >>> feeds["data/date=2023-10-24/part.jsonl"]["backfill_date"]
+    '2023-10-24'
+    """
+    dates = list(dates or ())
+    backfill_feeds = {}
+    for uri, options in (feeds or {}).items():
+        if "%(last_scraped_date)s" not in str(uri):
+            backfill_feeds[uri] = options
+            continue
+
+        for day in dates:
+            day = day.isoformat()
+            backfill_feeds[str(uri).replace("%(last_scraped_date)s", day)] = {
+                **(options or {}),
+                "item_filter": BackfillDateFilter,
+                "backfill_date": day,
+            }
+    return backfill_feeds
+
+
+class BackfillCheckpoint:
+    """On-disk checkpoint of finished days of backfills, per spider.
+
+    Parameters
+    ----------
+    path (str):
+        Valid path of sqlite database file.
+
+    Examples
+    --------
+    >>> from datetime import date
+    >>> from producthunt_scraper.backfill import BackfillCheckpoint
+    >>> checkpoint = BackfillCheckpoint(path=":memory:")
+    >>> checkpoint.finish("spider", date(2023, 10, 24), requests=21)
+    >>> checkpoint.get_finished("spider")
+    {datetime.date(2023, 10, 24)}
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path or ":memory:")
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS days ("
+            "name TEXT NOT NULL, date TEXT NOT NULL, requests INTEGER, "
+            "finished_at REAL, PRIMARY KEY (name, date)) WITHOUT ROWID"
+        )
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(path=crawler.settings.get("BACKFILL_CHECKPOINT_PATH"))
+
+    def get_finished(self, name=None):
+        """Get finished days of a spider."""
+        rows = self.connection.execute("SELECT date FROM days WHERE name = ?", (name,))
+        return {date.fromisoformat(row[0]) for row in rows}
+
+    def finish(self, name=None, day=None, requests=0):
+        """Checkpoint a finished day of a spider, with its number of requests."""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO days (name, date, requests, finished_at) "
+            "VALUES (?, ?, ?, ?)",
+            (name, day.isoformat(), requests, time.time()),
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
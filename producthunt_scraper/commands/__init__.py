@@ -0,0 +1,5 @@
+# This package will contain the custom commands of your Scrapy project
+#
+# Please refer to the documentation for information on how to create and manage
+# your commands.
+# See: https://docs.scrapy.org/en/latest/topics/commands.html#custom-project-commands
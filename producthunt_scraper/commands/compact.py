@@ -0,0 +1,69 @@
+"""Compact day partitions of a spider, into a time-series store of metrics.
+
+Usage:
+
+To compact new `trending products` partitions, and update its metrics, run:
+>>> scrapy compact trending-products
+
+To compact partition of 2023-10-24 only, if new or changed, run:
+>>> scrapy compact trending-products --date 2023-10-24
+"""
+
+from datetime import date
+from pathlib import Path
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+from producthunt_scraper.compaction import compact
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+
+    def syntax(self):
+        return "[options] <spider>"
+
+    def short_desc(self):
+        return "Compact day partitions of a spider into a time-series store"
+
+    def long_desc(self):
+        return (
+            "Merge part files of new or changed day partitions of a spider into "
+            "a single file sorted by item id without duplicate items, and append "
+            "items numeric fields to a time-series store (see COMPACTION_*)."
+        )
+
+    def add_options(self, parser):
+        super(Command, self).add_options(parser)
+        parser.add_argument(
+            "--date",
+            type=date.fromisoformat,
+            action="append",
+            help="compact partition of a date (YYYY-MM-DD), may be repeated",
+        )
+        parser.add_argument(
+            "--keep-parts",
+            action="store_true",
+            help="keep part files of compacted partitions",
+        )
+
+    def run(self, args, opts):
+        if len(args) != 1:
+            raise UsageError()
+        name = args[0]
+
+        spider_class = self.crawler_process.spider_loader.load(name)
+        results = compact(
+            path=Path(spider_class.data_dir) / name,
+            store_path=Path(self.settings.get("COMPACTION_STORE_DIR")) / name,
+            dates=opts.date,
+            keep_parts=opts.keep_parts,
+            compression=self.settings.get("FEED_EXPORT_PARQUET_COMPRESSION"),
+            row_group_size=self.settings.getint("COMPACTION_ROW_GROUP_SIZE"),
+        )
+        for partition_date, stats in results.items():
+            stats = ", ".join(f"""{key}={value}""" for key, value in stats.items())
+            print(f"""date={partition_date}: {stats}""")
+        if not results:
+            print("No new partitions to compact")
@@ -0,0 +1,95 @@
+"""Re-parse cached pages of a spider into items.
+
+Usage:
+
+To rebuild `trending products` items of 2023-10-24 from cached pages, run:
+>>> scrapy reparse trending-products --from-cache --date 2023-10-24
+"""
+
+import os
+from datetime import date, datetime, time, timezone
+
+from scrapy.commands import BaseRunSpiderCommand
+from scrapy.exceptions import UsageError
+
+from producthunt_scraper.httpcache import iter_cached_pages
+from producthunt_scraper.reparse import ReparseSpiderMixin, reparse_pages
+
+
+class Command(BaseRunSpiderCommand):
+    requires_project = True
+
+    def syntax(self):
+        return "[options] <spider>"
+
+    def short_desc(self):
+        return "Re-parse cached pages of a spider into items"
+
+    def long_desc(self):
+        return (
+            "Re-parse pages cached by HTTP cache (see HTTPCACHE_STORAGE) into "
+            "items using spider callbacks, across a pool of worker processes, "
+            "and process items through item pipelines and feeds as a crawl do."
+        )
+
+    def add_options(self, parser):
+        super(Command, self).add_options(parser)
+        parser.add_argument(
+            "--from-cache",
+            action="store_true",
+            help="re-parse pages stored by HTTP cache",
+        )
+        parser.add_argument(
+            "--date",
+            type=date.fromisoformat,
+            help="re-parse pages cached on a date (YYYY-MM-DD), into its partition",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="number of worker processes (default: number of cpus)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=16,
+            help="number of pages sent to a worker process at once",
+        )
+
+    def run(self, args, opts):
+        if len(args) != 1:
+            raise UsageError()
+        if not opts.from_cache:
+            raise UsageError("only re-parsing pages --from-cache is supported")
+        name = args[0]
+
+        # select pages cached on a date, if any
+        started_at, ended_at = None, None
+        if opts.date is not None:
+            started_at = datetime.combine(opts.date, time(), tzinfo=timezone.utc)
+            started_at = started_at.timestamp()
+            ended_at = started_at + 86400
+
+        pages = iter_cached_pages(
+            self.settings, name, started_at=started_at, ended_at=ended_at
+        )
+        items = reparse_pages(
+            pages,
+            name=name,
+            settings=self.settings,
+            workers=opts.workers,
+            chunk_size=opts.chunk_size,
+        )
+
+        # yield items from spider, so they are processed as crawled items
+        spider_class = self.crawler_process.spider_loader.load(name)
+        spider_class = type(
+            spider_class.__name__, (ReparseSpiderMixin, spider_class), {}
+        )
+        self.crawler_process.crawl(
+            spider_class, reparse_items=items, reparse_date=opts.date, **opts.spargs
+        )
+        self.crawler_process.start()
+        if self.crawler_process.bootstrap_failed:
+            self.exitcode = 1
@@ -0,0 +1,528 @@
+"""Compact day partitions of feeds, into a time-series store of item metrics.
+
+Each crawl leaves many small part files within a day partition (i.e
+``data/<spider>/date=YYYY-MM-DD/part-*.jsonl``). Compaction merges parts of
+a partition into a single ``compacted`` file sorted by item id, dropping
+duplicate items (i.e the last exported wins), and appends numeric fields of
+items (i.e votes and followers counts) to a parquet time-series store keyed
+by item id and date, as a file per day sorted by item id, so that history of
+an item is read from a row group per day instead of scanning every part file.
+
+Delta partitions (i.e ``part-*.delta.jsonl``) are kept as written, as
+snapshots of next days are reconstructed from them, and metrics of their
+items are read from their reconstructed snapshot (see ``read_snapshot``).
+
+Compaction is incremental: a manifest of compacted partitions (with names,
+sizes and modification times of their files) is kept next to the store, so
+only new or changed partitions are read.
+"""
+
+import gzip
+import json
+import os
+import typing
+from dataclasses import fields
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from producthunt_scraper import jsonlib
+from producthunt_scraper.delta import read_snapshot
+from producthunt_scraper.items import ProductItem, ProductLaunchItem
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+__all__ = [
+    "MetricsStore",
+    "compact",
+    "compact_partition",
+    "get_metric_fields",
+    "list_partitions",
+    "read_metrics",
+]
+
+# item id field to item class, in order of preference (i.e launches have both)
+ITEM_CLASSES = {"launch_id": ProductLaunchItem, "product_id": ProductItem}
+
+# non numeric fields kept on metrics, to relate items
+ITEM_REFERENCES = {"launch_id": ("product_id",), "product_id": ()}
+
+# name of a partition file holding compacted items
+COMPACTED_NAME = "compacted"
+
+# formats of partition files i.e first part of their extension
+FEED_FORMATS = ("jsonl", "parquet", "delta")
+
+
+def get_metric_fields(item_class=None):
+    """Get numeric fields of an item class, with their pandas dtype.
+
+    Parameters
+    ----------
+    item_class (class):
+        Valid dataclass item class.
+
+    Returns
+    -------
+    metric_fields (dict):
+        Valid mapping of numeric field name to nullable pandas dtype.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.compaction import get_metric_fields
+    >>> from producthunt_scraper.items import ProductLaunchItem
+    >>> get_metric_fields(ProductLaunchItem)
+    {'launch_votes_count': 'Int64', 'launch_comments_count': 'Int64', \
+'launch_daily_rank': 'Int64', 'launch_weekly_rank': 'Int64'}
+    """
+    dtypes = {int: "Int64", float: "float64"}
+    hints = typing.get_type_hints(item_class)
+    metric_fields = {}
+    for item_field in fields(item_class):
+        args = getattr(hints.get(item_field.name), "__args__", ())
+        args = [arg for arg in args if arg in dtypes]
+        if args:
+            metric_fields[item_field.name] = dtypes[args[0]]
+    return metric_fields
+
+
+def list_partitions(path=None):
+    """List day partitions of a spider data directory, in order of dates.
+
+    Parameters
+    ----------
+    path (str|Path):
+        Valid spider data directory i.e ``data/trending-products``.
+
+    Returns
+    -------
+    partitions (dict):
+        Valid mapping of partition date to partition directory.
+    """
+    partitions = {}
+    for partition_path in Path(path).glob("date=*"):
+        try:
+            partition_date = date.fromisoformat(_get_date(partition_path))
+        except ValueError:
+            continue
+        if partition_path.is_dir():
+            partitions[partition_date] = partition_path
+    return dict(sorted(partitions.items()))
+
+
+def _get_date(path=None):
+    """Get date of a day partition directory i.e ``date=2023-10-24``."""
+    return Path(path).name[len("date=") :]
+
+
+def _get_extension(path=None):
+    """Get file extension, with compression i.e ``jsonl.gz``."""
+    return path.name.partition(".")[2]
+
+
+def _list_files(path=None):
+    """List feed files of a partition, in order of export.
+
+    Compacted file come first, then part files in order of modification, so
+    items of latest parts win when dropping duplicates.
+    """
+    files = [
+        file
+        for file in Path(path).iterdir()
+        if file.is_file() and _get_extension(file).split(".")[0] in FEED_FORMATS
+    ]
+    return sorted(
+        files,
+        key=lambda file: (
+            file.name.partition(".")[0] != COMPACTED_NAME,
+            file.stat().st_mtime_ns,
+            file.name,
+        ),
+    )
+
+
+def _get_signature(files=None):
+    """Get names, sizes and modification times of partition files."""
+    return {
+        file.name: [file.stat().st_size, file.stat().st_mtime_ns]
+        for file in sorted(files)
+    }
+
+
+def _open_file(path=None, mode="rb", extension=None):
+    """Open a jsonlines file, compressed by its (or given) extension."""
+    extension = extension or _get_extension(path)
+    if extension.endswith(".gz"):
+        return gzip.open(path, mode)
+    if extension.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError(
+                "Compacting zstd feeds requires zstandard, install it using "
+                "`pip install -e .[zstd]`"
+            )
+        return zstandard.open(path, mode)
+    return open(path, mode)
+
+
+def _read_jsonlines(files=None):
+    """Read lines of jsonlines files, with their decoded items."""
+    lines = []
+    for file in files:
+        with _open_file(file, "rb") as jsonlines_file:
+            lines.extend(line for line in jsonlines_file if line.strip())
+    lines = [line if line.endswith(b"\n") else line + b"\n" for line in lines]
+    return lines, [jsonlib.loads(line) for line in lines]
+
+
+def _get_order(ids=None):
+    """Get positions of last occurrence of each id, sorted by id.
+
+    Items without id are not deduplicated, and are kept last in order.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.compaction import _get_order
+    >>> _get_order(["2", "1", None, "2"]).tolist()
+    [1, 3, 2]
+    """
+    ids = pd.Series(ids, dtype="object")
+    missing = ids.isna().to_numpy()
+    found = ids[~missing].drop_duplicates(keep="last")
+    found = found.sort_values(kind="stable")
+    return np.concatenate([found.index.to_numpy(), np.flatnonzero(missing)])
+
+
+def _get_metrics(data=None, key=None, partition_date=None):
+    """Select id, references and numeric fields of items, as typed columns."""
+    metric_fields = get_metric_fields(ITEM_CLASSES[key])
+    columns = [key, *ITEM_REFERENCES[key], *metric_fields]
+    metrics = data.reindex(columns=columns)
+    metrics = metrics.astype({key: "object"})
+    for name, dtype in metric_fields.items():
+        metrics[name] = pd.to_numeric(metrics[name], errors="coerce").astype(dtype)
+    metrics.insert(1, "date", pd.Timestamp(partition_date))
+    return metrics[metrics[key].notna()].reset_index(drop=True)
+
+
+def _get_key(columns=None):
+    """Get item id field of item columns."""
+    for key in ITEM_CLASSES:
+        if key in columns:
+            return key
+    raise ValueError(f"""No item id field (i.e {", ".join(ITEM_CLASSES)}) found""")
+
+
+def _replace_files(path=None, write=None, files=None, keep_parts=False):
+    """Write a compacted file atomically, then remove compacted part files."""
+    temp_path = path.with_name(f""".{path.name}.tmp""")
+    write(temp_path)
+    os.replace(temp_path, path)
+    for file in files:
+        if file != path and not keep_parts:
+            file.unlink()
+
+
+def compact_partition(path=None, keep_parts=False, compression="zstd"):
+    """Compact files of a day partition into a single file.
+
+    Items are sorted by id, and duplicates dropped keeping the last exported.
+    Jsonlines items are written as exported (i.e lines are not re-encoded).
+    Delta files are kept as is, and metrics are read from their snapshot.
+
+    Parameters
+    ----------
+    path (str|Path):
+        Valid day partition directory i.e ``data/<spider>/date=2023-10-24``.
+
+    keep_parts (bool):
+        Whether to keep part files once compacted. Default to ``False``.
+
+    compression (str):
+        Valid parquet compression codec, of parquet partitions.
+
+    Returns
+    -------
+    metrics (pandas.DataFrame|None):
+        Valid id, date, references and numeric fields of compacted items.
+
+    stats (dict):
+        Valid number of files, items and duplicate items dropped.
+    """
+    path = Path(path)
+    partition_date = date.fromisoformat(_get_date(path))
+    files = _list_files(path)
+    stats = {"files": len(files), "items": 0, "duplicates": 0}
+    if not files:
+        return None, stats
+
+    formats = {_get_extension(file).split(".")[0] for file in files}
+    if len(formats) > 1:
+        raise ValueError(f"""Mixed feed formats found in {path}: {formats}""")
+
+    # read metrics of delta partitions from their snapshot, keeping their files
+    if formats == {"delta"}:
+        data = pd.DataFrame.from_records(read_snapshot(path.parent, partition_date))
+        stats["items"] = len(data.index)
+        if data.empty:
+            return None, stats
+        key = _get_key(data.columns)
+        return _get_metrics(data, key=key, partition_date=partition_date), stats
+
+    extension = _get_extension(files[-1])
+    compacted_path = path / f"""{COMPACTED_NAME}.{extension}"""
+
+    if formats == {"parquet"}:
+        if pyarrow is None:
+            raise ImportError(
+                "Compacting parquet feeds requires pyarrow, install it using "
+                "`pip install -e .[parquet]`"
+            )
+        table = pyarrow.concat_tables(
+            [pyarrow.parquet.read_table(file) for file in files]
+        )
+        key = _get_key(table.column_names)
+        order = _get_order(table.column(key).to_pylist())
+        stats["duplicates"] = table.num_rows - len(order)
+        table = table.take(order)
+        data = table.to_pandas()
+
+        def write(temp_path):
+            pyarrow.parquet.write_table(table, temp_path, compression=compression)
+
+    else:
+        lines, records = _read_jsonlines(files)
+        data = pd.DataFrame.from_records(records)
+        key = _get_key(data.columns)
+        order = _get_order(data[key].to_numpy())
+        stats["duplicates"] = len(data.index) - len(order)
+        data = data.take(order)
+
+        def write(temp_path):
+            with _open_file(temp_path, "wb", extension=extension) as file:
+                file.writelines(lines[index] for index in order)
+
+    _replace_files(compacted_path, write=write, files=files, keep_parts=keep_parts)
+    stats["items"] = len(order)
+    return _get_metrics(data, key=key, partition_date=partition_date), stats
+
+
+class MetricsStore:
+    """Time-series store of item numeric fields, as a parquet dataset.
+
+    Metrics of a day partition are written to their own file within the
+    dataset directory (i.e ``metrics/part-2023-10-24.parquet``), so a
+    compaction only writes files of its partitions, instead of rewriting the
+    whole store. Rows of a file are sorted by item id, and written in row
+    groups, so reading history of a few items skips row groups by their
+    statistics. A manifest of compacted partitions is kept next to the store.
+
+    Parameters
+    ----------
+    path (str|Path):
+        Valid store directory i.e ``data/metrics/trending-products``.
+
+    row_group_size (int):
+        Valid number of rows per row group.
+    """
+
+    def __init__(self, path=None, row_group_size=10000):
+        if pyarrow is None:
+            raise ImportError(
+                "MetricsStore requires pyarrow, install it using "
+                "`pip install -e .[parquet]`"
+            )
+        self.path = Path(path)
+        self.data_path = self.path / "metrics"
+        self.manifest_path = self.path / "manifest.json"
+        self.row_group_size = row_group_size
+        self.manifest = {}
+        if self.manifest_path.exists():
+            self.manifest = json.loads(self.manifest_path.read_text())
+
+    def is_compacted(self, partition_path=None):
+        """Check if a partition is compacted, and unchanged since."""
+        compacted = self.manifest.get(_get_date(partition_path))
+        return compacted is not None and compacted == _get_signature(
+            _list_files(partition_path)
+        )
+
+    def _write(self, path=None, write=None):
+        """Write a store file atomically."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f""".{path.name}.tmp""")
+        write(temp_path)
+        os.replace(temp_path, path)
+
+    def _get_data_file(self, partition_path=None):
+        """Get dataset file of a partition metrics."""
+        return self.data_path / f"""part-{_get_date(partition_path)}.parquet"""
+
+    def _write_data(self, metrics=None, partition_path=None):
+        """Replace metrics of a partition, sorted by id."""
+        data_file = self._get_data_file(partition_path)
+        if metrics is None or metrics.empty:
+            data_file.unlink(missing_ok=True)
+            return
+
+        key = _get_key(metrics.columns)
+        metrics = metrics.sort_values(key, kind="stable", ignore_index=True)
+        self._write(
+            data_file,
+            lambda temp_path: metrics.to_parquet(
+                temp_path, index=False, row_group_size=self.row_group_size
+            ),
+        )
+
+    def update(self, partitions=None):
+        """Replace metrics of compacted partitions, and record them.
+
+        Parameters
+        ----------
+        partitions (dict):
+            Valid mapping of partition directory to its metrics.
+        """
+        if not partitions:
+            return
+
+        for path, metrics in partitions.items():
+            self._write_data(metrics=metrics, partition_path=path)
+
+        for path in partitions:
+            self.manifest[_get_date(path)] = _get_signature(_list_files(path))
+        self._write(
+            self.manifest_path,
+            lambda temp_path: temp_path.write_text(
+                json.dumps(dict(sorted(self.manifest.items())), indent=2)
+            ),
+        )
+
+    def read(self, ids=None, started_at=None, ended_at=None, columns=None):
+        """Read metrics of items within dates, sorted by item id then date.
+
+        Parameters
+        ----------
+        ids (list):
+            Valid item ids to read. Default to all items.
+
+        started_at (date|str):
+            Valid first date to read, inclusive.
+
+        ended_at (date|str):
+            Valid last date to read, inclusive.
+
+        columns (list):
+            Valid metrics columns to read. Default to all columns.
+
+        Returns
+        -------
+        metrics (pandas.DataFrame):
+            Valid metrics of items.
+        """
+        data_files = sorted(self.data_path.glob("part-*.parquet"))
+        if not data_files:
+            return pd.DataFrame()
+
+        schema = pyarrow.parquet.read_schema(data_files[0])
+        key = _get_key(schema.names)
+        filters = []
+        if ids is not None:
+            filters.append((key, "in", [str(item_id) for item_id in ids]))
+        if started_at is not None:
+            filters.append(("date", ">=", pd.Timestamp(started_at)))
+        if ended_at is not None:
+            filters.append(("date", "<=", pd.Timestamp(ended_at)))
+        if columns is not None:
+            columns = [key, "date", *(name for name in columns if name != key)]
+            columns = list(dict.fromkeys(columns))
+        metrics = pd.read_parquet(
+            [str(data_file) for data_file in data_files],
+            columns=columns,
+            filters=filters or None,
+        )
+        return metrics.sort_values([key, "date"], kind="stable", ignore_index=True)
+
+
+def compact(
+    path=None,
+    store_path=None,
+    dates=None,
+    keep_parts=False,
+    compression="zstd",
+    row_group_size=10000,
+):
+    """Compact new or changed day partitions of a spider, into a metrics store.
+
+    Parameters
+    ----------
+    path (str|Path):
+        Valid spider data directory i.e ``data/trending-products``.
+
+    store_path (str|Path):
+        Valid store directory i.e ``data/metrics/trending-products``.
+
+    dates (list):
+        Valid partition dates to compact. Default to all partitions.
+
+    keep_parts (bool):
+        Whether to keep part files once compacted. Default to ``False``.
+
+    compression (str):
+        Valid parquet compression codec, of parquet partitions.
+
+    row_group_size (int):
+        Valid number of rows per row group of the metrics store.
+
+    Returns
+    -------
+    results (dict):
+        Valid mapping of compacted partition date to its stats.
+    """
+    store = MetricsStore(store_path, row_group_size=row_group_size)
+    partitions, results = {}, {}
+    for partition_date, partition_path in list_partitions(path).items():
+        if dates is not None and partition_date not in dates:
+            continue
+        if store.is_compacted(partition_path):
+            continue
+        partitions[partition_path], results[partition_date] = compact_partition(
+            partition_path, keep_parts=keep_parts, compression=compression
+        )
+    store.update(partitions)
+    return results
+
+
+def read_metrics(store_path=None, ids=None, started_at=None, ended_at=None):
+    """Read metrics of items from a metrics store.
+
+    Parameters
+    ----------
+    store_path (str|Path):
+        Valid store directory i.e ``data/metrics/trending-products``.
+
+    ids (list):
+        Valid item ids to read. Default to all items.
+
+    started_at (date|str):
+        Valid first date to read, inclusive.
+
+    ended_at (date|str):
+        Valid last date to read, inclusive.
+
+    Returns
+    -------
+    metrics (pandas.DataFrame):
+        Valid metrics of items, sorted by item id then date.
+    """
+    store = MetricsStore(store_path)
+    return store.read(ids=ids, started_at=started_at, ended_at=ended_at)
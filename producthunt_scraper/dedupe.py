@@ -0,0 +1,306 @@
+"""Stores of seen item ids, used to drop duplicate items.
+
+Stores available are:
+    * ``MemoryItemIdStore``: exact, in-memory set of item ids
+    * ``BloomItemIdStore``: approximate, in-memory scalable bloom filter
+    * ``SqliteItemIdStore``: exact, on-disk store persisted across runs
+
+Configure a store using ``ITEM_DEDUPE_STORE`` setting.
+"""
+
+import hashlib
+import math
+import sqlite3
+import time
+from pathlib import Path
+
+__all__ = [
+    "BloomFilter",
+    "BloomItemIdStore",
+    "ItemIdStore",
+    "MemoryItemIdStore",
+    "SqliteItemIdStore",
+]
+
+
+class ItemIdStore:
+    """Base store of seen item ids.
+
+    Item ids are item type qualified i.e ``ProductItem/<product_id>``.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls()
+
+    def add(self, item_id=None):
+        """Add an item id, and return ``True`` if it was not seen before."""
+        raise NotImplementedError
+
+    def __contains__(self, item_id):
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources used by the store."""
+
+
+class MemoryItemIdStore(ItemIdStore):
+    """Exact, in-memory set of item ids.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.dedupe import MemoryItemIdStore
+    >>> store = MemoryItemIdStore()
+    >>> store.add("ProductItem/1"), store.add("ProductItem/1")
+    (True, False)
+    """
+
+    def __init__(self):
+        self.item_ids = set()
+
+    def add(self, item_id=None):
+        if item_id in self.item_ids:
+            return False
+        self.item_ids.add(item_id)
+        return True
+
+    def __contains__(self, item_id):
+        return item_id in self.item_ids
+
+    def __len__(self):
+        return len(self.item_ids)
+
+
+class BloomFilter:
+    """Fixed capacity bloom filter.
+
+    Parameters
+    ----------
+    capacity (int):
+        Valid number of keys to hold within ``error_rate``.
+
+    error_rate (float):
+        Valid false positive rate when filter is at capacity.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        bits = -capacity * math.log(error_rate) / (math.log(2) ** 2)
+        self.bits_count = max(8, math.ceil(bits))
+        self.hashes_count = max(1, round(self.bits_count / capacity * math.log(2)))
+        self.bits = bytearray((self.bits_count + 7) // 8)
+        self.count = 0
+
+    @staticmethod
+    def hash(key=None):
+        """Hash a key into a pair of hashes, shared across filters."""
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return first, second
+
+    def _positions(self, hashes=None):
+        """Compute bits positions of a pair of hashes using double hashing."""
+        first, second = hashes
+        bits_count = self.bits_count
+        return [
+            (first + index * second) % bits_count for index in range(self.hashes_count)
+        ]
+
+    def add(self, key=None, hashes=None):
+        """Add a key, and return ``True`` if it was not (probably) seen before."""
+        bits = self.bits
+        is_new = False
+        for position in self._positions(hashes or self.hash(key)):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                is_new = True
+        self.count = self.count + 1 if is_new else self.count
+        return is_new
+
+    def contains(self, key=None, hashes=None):
+        """Check if a key was (probably) seen before."""
+        bits = self.bits
+        for position in self._positions(hashes or self.hash(key)):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __contains__(self, key):
+        return self.contains(key=key)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        """Number of bytes used by filter bits."""
+        return len(self.bits)
+
+
+class BloomItemIdStore(ItemIdStore):
+    """Approximate, in-memory scalable bloom filter of item ids.
+
+    When a filter reach its capacity, a new filter with larger capacity and
+    tighter error rate is added, so the overall false positive rate stays
+    within ``error_rate`` while memory grows predictably with item ids.
+
+    Parameters
+    ----------
+    capacity (int):
+        Valid number of item ids of the first filter.
+
+    error_rate (float):
+        Valid overall false positive rate.
+
+    growth (int):
+        Valid capacity growth factor of each added filter.
+
+    tightening (float):
+        Valid error rate tightening ratio of each added filter.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.dedupe import BloomItemIdStore
+    >>> store = BloomItemIdStore(capacity=100, error_rate=0.001)
+    >>> store.add("ProductItem/1"), store.add("ProductItem/1")
+    (True, False)
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.001, growth=2, tightening=0.5):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.filters = []
+        self._add_filter()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            capacity=crawler.settings.getint("ITEM_DEDUPE_BLOOM_CAPACITY", 1000000),
+            error_rate=crawler.settings.getfloat("ITEM_DEDUPE_BLOOM_ERROR_RATE", 0.001),
+        )
+
+    def _add_filter(self):
+        """Add a filter, with larger capacity and tighter error rate."""
+        index = len(self.filters)
+        capacity = self.capacity * self.growth**index
+        error_rate = self.error_rate * (1 - self.tightening) * self.tightening**index
+        self.filters.append(BloomFilter(capacity=capacity, error_rate=error_rate))
+
+    def add(self, item_id=None):
+        hashes = BloomFilter.hash(item_id)
+        filters = self.filters
+        if len(filters) > 1 and self._contains(hashes, filters[:-1]):
+            return False
+        if len(filters[-1]) >= filters[-1].capacity:
+            if filters[-1].contains(hashes=hashes):
+                return False
+            self._add_filter()
+        return self.filters[-1].add(hashes=hashes)
+
+    def _contains(self, hashes=None, filters=None):
+        """Check if a pair of hashes was (probably) seen by any of filters."""
+        return any(bloom_filter.contains(hashes=hashes) for bloom_filter in filters)
+
+    def __contains__(self, item_id):
+        return self._contains(BloomFilter.hash(item_id), self.filters)
+
+    def __len__(self):
+        return sum(len(bloom_filter) for bloom_filter in self.filters)
+
+    @property
+    def nbytes(self):
+        """Number of bytes used by filters bits."""
+        return sum(bloom_filter.nbytes for bloom_filter in self.filters)
+
+
+class SqliteItemIdStore(ItemIdStore):
+    """Exact, on-disk store of item ids persisted across runs.
+
+    Item ids expire after time to live of their item type, so items are
+    scraped again on later runs i.e daily partitions.
+
+    Parameters
+    ----------
+    path (str):
+        Valid path of sqlite database file.
+
+    ttl (dict):
+        Valid item type (i.e ``ProductItem``) to time to live in seconds.
+        Item ids of item types without time to live never expire.
+
+    commit_every (int):
+        Valid number of added item ids between commits.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.dedupe import SqliteItemIdStore
+    >>> store = SqliteItemIdStore(path=":memory:", ttl={"ProductItem": 0})
+    >>> store.add("ProductLaunchItem/1"), store.add("ProductLaunchItem/1")
+    (True, False)
+    >>> store.add("ProductItem/1"), store.add("ProductItem/1")
+    (True, True)
+    """
+
+    def __init__(self, path=None, ttl=None, commit_every=1000):
+        self.path = str(path or ":memory:")
+        self.ttl = {key: float(value) for key, value in (ttl or {}).items()}
+        self.commit_every = commit_every
+        self.pending = 0
+
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS item_ids "
+            "(item_id TEXT PRIMARY KEY, seen_at REAL NOT NULL) WITHOUT ROWID"
+        )
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            path=crawler.settings.get("ITEM_DEDUPE_SQLITE_PATH"),
+            ttl=crawler.settings.getdict("ITEM_DEDUPE_TTL"),
+        )
+
+    def _is_expired(self, item_id=None, seen_at=None, now=None):
+        """Check if a seen item id has expired."""
+        ttl = self.ttl.get(item_id.split("/", 1)[0])
+        return ttl is not None and seen_at + ttl <= now
+
+    def add(self, item_id=None):
+        now = time.time()
+        row = self.connection.execute(
+            "SELECT seen_at FROM item_ids WHERE item_id = ?", (item_id,)
+        ).fetchone()
+        if row is not None and not self._is_expired(item_id, row[0], now):
+            return False
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO item_ids (item_id, seen_at) VALUES (?, ?)",
+            (item_id, now),
+        )
+        self.pending = self.pending + 1
+        if self.pending >= self.commit_every:
+            self.connection.commit()
+            self.pending = 0
+        return True
+
+    def __contains__(self, item_id):
+        row = self.connection.execute(
+            "SELECT seen_at FROM item_ids WHERE item_id = ?", (item_id,)
+        ).fetchone()
+        return row is not None and not self._is_expired(item_id, row[0], time.time())
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM item_ids").fetchone()[0]
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
@@ -0,0 +1,265 @@
+"""Delta snapshots of items, storing only fields changed between daily crawls.
+
+Items are compared against their previous snapshot (i.e state on the last
+date they were exported) held in an on-disk index. New items, and items
+whose last full record is older than ``keyframe_days``, are written as full
+records. Otherwise only changed fields are written, with the item id and a
+``_delta`` marker i.e ``{"product_id": "1", "_delta": true, ...}``.
+
+A full snapshot of a day is reconstructed from that day partition, walking
+back previous partitions only for items written as deltas, until their last
+full record (i.e at most ``keyframe_days`` partitions).
+
+Configure delta snapshots using ``FEED_EXPORT_FORMAT=jsonlines-delta`` and
+``DELTA_*`` settings.
+"""
+
+import sqlite3
+import zlib
+from datetime import date, timedelta
+from pathlib import Path
+
+from producthunt_scraper import jsonlib
+
+__all__ = [
+    "DELTA_FIELD",
+    "DeltaIndex",
+    "apply_delta",
+    "get_delta",
+    "get_item_key",
+    "list_delta_files",
+    "read_snapshot",
+]
+
+# field marking a record holding only changed fields of an item
+DELTA_FIELD = "_delta"
+
+# item id fields, in order of preference (i.e launches have both)
+ITEM_KEYS = ("launch_id", "product_id")
+
+
+def get_item_key(record=None):
+    """Get id field of an item record.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.delta import get_item_key
+    >>> get_item_key({"launch_id": "2", "product_id": "1"})
+    'launch_id'
+    """
+    for key in ITEM_KEYS:
+        if record.get(key) is not None:
+            return key
+    return None
+
+
+def _is_changed(previous=None, value=None):
+    """Check if a field value changed, ignoring order of list values."""
+    if isinstance(previous, list) and isinstance(value, list):
+        return sorted(map(str, previous)) != sorted(map(str, value))
+    return previous != value
+
+
+def get_delta(previous=None, record=None):
+    """Get fields of a record changed from its previous record.
+
+    Parameters
+    ----------
+    previous (dict):
+        Valid previous record of an item.
+
+    record (dict):
+        Valid current record of an item.
+
+    Returns
+    -------
+    delta (dict):
+        Valid changed fields, with their current values.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.delta import get_delta
+    >>> previous = {"product_id": "1", "votes": 2, "topics": ["a", "b"]}
+    >>> get_delta(previous, {"product_id": "1", "votes": 3, "topics": ["b", "a"]})
+    {'votes': 3}
+    """
+    return {
+        name: value
+        for name, value in record.items()
+        if name not in previous or _is_changed(previous[name], value)
+    }
+
+
+def apply_delta(previous=None, delta=None):
+    """Apply a delta record on a previous record of an item.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.delta import apply_delta
+    >>> previous = {"product_id": "1", "votes": 2, "name": "A"}
+    >>> apply_delta(previous, {"product_id": "1", "_delta": True, "votes": 3})
+    {'product_id': '1', 'votes': 3, 'name': 'A'}
+    """
+    record = dict(previous)
+    record.update(delta)
+    record.pop(DELTA_FIELD, None)
+    return record
+
+
+class DeltaIndex:
+    """On-disk index of latest snapshots of items, of each spider.
+
+    Snapshots are kept as compressed JSON records, per item and date. Only
+    the latest snapshot before a date (i.e the delta base) and the snapshot
+    of that date are kept, so re-running a crawl on a same day computes
+    deltas against the same base.
+
+    Parameters
+    ----------
+    path (str):
+        Valid path of sqlite database file.
+
+    timeout (float):
+        Valid seconds to wait for a lock held by another exporter.
+
+    Examples
+    --------
+    >>> from datetime import date
+    >>> from producthunt_scraper.delta import DeltaIndex
+    >>> index = DeltaIndex(path=":memory:")
+    >>> index.put("spider", "1", date(2023, 10, 24), date(2023, 10, 24), {"a": 1})
+    >>> index.get_base("spider", "1", date(2023, 10, 25))
+    (datetime.date(2023, 10, 24), {'a': 1})
+    >>> index.get_base("spider", "1", date(2023, 10, 24)) is None
+    True
+    """
+
+    def __init__(self, path=None, timeout=60.0):
+        self.path = str(path or ":memory:")
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=timeout)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "name TEXT NOT NULL, item_id TEXT NOT NULL, date TEXT NOT NULL, "
+            "full_date TEXT NOT NULL, record BLOB NOT NULL, "
+            "PRIMARY KEY (name, item_id, date)) WITHOUT ROWID"
+        )
+
+    def get_base(self, name=None, item_id=None, before=None):
+        """Get date of last full record and latest snapshot of an item."""
+        row = self.connection.execute(
+            "SELECT full_date, record FROM snapshots "
+            "WHERE name = ? AND item_id = ? AND date < ? "
+            "ORDER BY date DESC LIMIT 1",
+            (name, item_id, before.isoformat()),
+        ).fetchone()
+        if row is None:
+            return None
+        return date.fromisoformat(row[0]), jsonlib.loads(zlib.decompress(row[1]))
+
+    def put(
+        self, name=None, item_id=None, snapshot_date=None, full_date=None, record=None
+    ):
+        """Save snapshot of an item, dropping snapshots older than its base."""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO snapshots "
+            "(name, item_id, date, full_date, record) VALUES (?, ?, ?, ?, ?)",
+            (
+                name,
+                item_id,
+                snapshot_date.isoformat(),
+                full_date.isoformat(),
+                zlib.compress(jsonlib.dumps(record)),
+            ),
+        )
+        self.connection.execute(
+            "DELETE FROM snapshots WHERE name = ? AND item_id = ? AND date < ("
+            "SELECT MAX(date) FROM snapshots "
+            "WHERE name = ? AND item_id = ? AND date < ?)",
+            (name, item_id, name, item_id, snapshot_date.isoformat()),
+        )
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+def list_delta_files(path=None):
+    """List delta files of a day partition, in order of export."""
+    files = [file for file in Path(path).glob("*.delta.jsonl") if file.is_file()]
+    return sorted(files, key=lambda file: (file.stat().st_mtime_ns, file.name))
+
+
+def _read_partition(path=None):
+    """Read last record of each item of a day partition, by item id."""
+    records = {}
+    for file in list_delta_files(path):
+        with open(file, "rb") as delta_file:
+            for line in delta_file:
+                if line.strip():
+                    record = jsonlib.loads(line)
+                    key = get_item_key(record)
+                    records[(key, record.get(key))] = record
+    return records
+
+
+def read_snapshot(path=None, snapshot_date=None, max_days=366):
+    """Reconstruct full records of items exported on a day.
+
+    Parameters
+    ----------
+    path (str|Path):
+        Valid spider data directory i.e ``data/trending-products``.
+
+    snapshot_date (date|str):
+        Valid date of snapshot to reconstruct.
+
+    max_days (int):
+        Valid maximum number of days to walk back for full records.
+
+    Returns
+    -------
+    records (list):
+        Valid full records of items, sorted by item id.
+    """
+    if isinstance(snapshot_date, str):
+        snapshot_date = date.fromisoformat(snapshot_date)
+
+    records = _read_partition(Path(path) / f"""date={snapshot_date}""")
+    chains = {item_id: [record] for item_id, record in records.items()}
+    pending = {
+        item_id for item_id, record in records.items() if record.get(DELTA_FIELD)
+    }
+
+    # walk back previous partitions, until last full record of each item
+    for days in range(1, max_days + 1):
+        if not pending:
+            break
+        partition_path = Path(path) / f"""date={snapshot_date - timedelta(days)}"""
+        if not partition_path.is_dir():
+            continue
+        for item_id, record in _read_partition(partition_path).items():
+            if item_id in pending:
+                chains[item_id].append(record)
+                if not record.get(DELTA_FIELD):
+                    pending.discard(item_id)
+
+    snapshot = []
+    for item_id in sorted(chains, key=lambda item_id: tuple(map(str, item_id))):
+        chain = chains[item_id]
+        record = {}
+        for delta in reversed(chain):
+            record = apply_delta(record, delta)
+        if item_id in pending:
+            raise ValueError(
+                f"""No full record of {item_id[0]}={item_id[1]} found within """
+                f"""{max_days} days before {snapshot_date}"""
+            )
+        snapshot.append(record)
+    return snapshot
@@ -49,6 +49,7 @@ def env(key=None, default=None, cast=None, transform=None):
         value = transform(value)
 
     if value and callable(cast):
-        value = bool(strtobool(value)) if cast == bool else cast(value)
+        is_bool_str = cast is bool and isinstance(value, str)
+        value = bool(strtobool(value)) if is_bool_str else cast(value)
 
     return value
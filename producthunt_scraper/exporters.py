@@ -0,0 +1,554 @@
+"""Feed exporters.
+
+Provide columnar feed exporters, to write scraped items in formats which
+are fast to load downstream (i.e using pandas).
+
+Don't forget to add your exporter to the FEED_EXPORTERS setting
+See: https://docs.scrapy.org/en/latest/topics/feed-exports.html
+"""
+
+import gzip
+import queue
+import threading
+import typing
+from dataclasses import fields, is_dataclass
+
+from itemadapter import ItemAdapter
+from scrapy.exporters import BaseItemExporter
+from scrapy.extensions.feedexport import FileFeedStorage
+from twisted.internet import threads
+
+from producthunt_scraper import jsonlib
+from producthunt_scraper.delta import DELTA_FIELD, DeltaIndex, get_delta, get_item_key
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+__all__ = [
+    "DeltaJsonLinesItemExporter",
+    "ParquetItemExporter",
+    "ThreadedFileFeedStorage",
+    "ThreadedJsonLinesItemExporter",
+    "get_feed_extension",
+    "get_feeds",
+    "get_item_schema",
+]
+
+# sentinel which stop background writer
+_FINISH_EXPORTING = object()
+
+# files of threaded file feed storage, to deferred join of their writer
+_WRITERS = {}
+
+# python type to arrow type factory
+ARROW_TYPES = {
+    str: lambda: pyarrow.string(),
+    int: lambda: pyarrow.int64(),
+    float: lambda: pyarrow.float64(),
+    bool: lambda: pyarrow.bool_(),
+}
+
+
+def _get_arrow_type(hint=None):
+    """Get arrow type of a field type hint, unwrapping ``Optional``."""
+    origin = getattr(hint, "__origin__", None)
+    args = [arg for arg in getattr(hint, "__args__", ()) if arg is not type(None)]
+
+    # unwrap optional i.e ``Optional[str]``
+    if origin is typing.Union and len(args) == 1:
+        return _get_arrow_type(args[0])
+
+    # dictionary encode list values i.e ``Tuple[str, ...]`` or ``List[str]``
+    if origin in (tuple, list) and args:
+        value_type = _get_arrow_type(args[0])
+        if value_type == pyarrow.string():
+            value_type = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        return pyarrow.list_(value_type)
+
+    return ARROW_TYPES.get(hint, ARROW_TYPES[str])()
+
+
+def get_item_schema(item_class=None):
+    """Derive arrow schema of an item class from its fields type hints.
+
+    Parameters
+    ----------
+    item_class (class):
+        Valid dataclass item class.
+
+    Returns
+    -------
+    schema (pyarrow.Schema):
+        Valid arrow schema, with dictionary encoded list of strings.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.exporters import get_item_schema
+    >>> from producthunt_scraper.items import ProductLaunchItem
+    >>> schema = get_item_schema(ProductLaunchItem)
+    >>> str(schema.field("launch_votes_count").type)
+    'int64'
+    >>> str(schema.field("launch_topics").type)
+    'list<item: dictionary<values=string, indices=int32, ordered=0>>'
+    """
+    hints = typing.get_type_hints(item_class)
+    return pyarrow.schema(
+        [
+            (item_field.name, _get_arrow_type(hints.get(item_field.name)))
+            for item_field in fields(item_class)
+        ]
+    )
+
+
+def get_feed_extension(settings=None, feed_format=None):
+    """Get extension of feed files, from feed format and export compression.
+
+    Feed format default to ``FEED_EXPORT_FORMAT`` setting.
+
+    Examples
+    --------
+    >>> from scrapy.settings import Settings
+    >>> from producthunt_scraper.exporters import get_feed_extension
+    >>> get_feed_extension(Settings({"FEED_EXPORT_FORMAT": "parquet"}))
+    'parquet'
+    """
+    extensions = settings.getdict("FEED_EXPORT_EXTENSIONS")
+    feed_format = feed_format or settings.get("FEED_EXPORT_FORMAT") or "jsonlines"
+    compression = settings.get("FEED_EXPORT_COMPRESSION")
+    extension = extensions.get(feed_format, feed_format)
+    if feed_format == "jsonlines-threaded" and compression:
+        extension = ".".join([extension, extensions.get(compression, compression)])
+    return extension
+
+
+def get_feeds(settings=None):
+    """Set format and extension of feeds, from feed export settings.
+
+    Feeds without format are written in ``FEED_EXPORT_FORMAT``, and
+    ``%(extension)s`` of their uri is replaced by extension of their format,
+    so feed export settings may be set from command line or spider settings.
+    Feeds with an ``uri_template`` option (i.e default feed, resolved once
+    settings are loaded) are resolved again from their template.
+
+    Parameters
+    ----------
+    settings (Settings):
+        Valid crawler settings.
+
+    Returns
+    -------
+    feeds (dict):
+        Valid ``FEEDS`` setting.
+
+    Examples
+    --------
+    >>> from scrapy.settings import Settings
+    >>> from producthunt_scraper.exporters import get_feeds
+    >>> settings = Settings({
+    ...     "FEEDS": {"part-%(batch_id)d.%(extension)s": {}},
+    ...     "FEED_EXPORT_FORMAT": "jsonlines-threaded",
+    ...     "FEED_EXPORT_COMPRESSION": "gzip",
+    ...     "FEED_EXPORT_EXTENSIONS": {"jsonlines-threaded": "jsonl", "gzip": "gz"},
+    ... })
+    >>> get_feeds(settings)
+    {'part-%(batch_id)d.jsonl.gz': {'format': 'jsonlines-threaded'}}
+    >>> settings.set("FEEDS", {
+    ...     "part-%(batch_id)d.jsonl": {
+    ...         "format": "jsonlines",
+    ...         "uri_template": "part-%(batch_id)d.%(extension)s",
+    ...     },
+    ... })
+    >>> get_feeds(settings)
+    {'part-%(batch_id)d.jsonl.gz': {'format': 'jsonlines-threaded'}}
+    """
+    feeds = {}
+    for uri, options in settings.getdict("FEEDS").items():
+        options = dict(options or {})
+        if options.get("uri_template"):
+            uri = options.pop("uri_template")
+            options.pop("format", None)
+        options["format"] = options.get("format") or settings.get(
+            "FEED_EXPORT_FORMAT", "jsonlines"
+        )
+        extension = get_feed_extension(settings, feed_format=options["format"])
+        feeds[str(uri).replace("%(extension)s", extension)] = options
+    return feeds
+
+
+class ParquetItemExporter(BaseItemExporter):
+    """Export items as a parquet file, writing a row group per batch of items.
+
+    Schema is derived from type hints of first exported item class.
+
+    Parameters
+    ----------
+    file (object):
+        Valid binary file object.
+
+    compression (str):
+        Valid parquet compression codec. Default to ``zstd``.
+
+    row_group_size (int):
+        Valid number of items per row group.
+    """
+
+    def __init__(self, file, compression="zstd", row_group_size=10000, **kwargs):
+        if pyarrow is None:
+            raise ImportError(
+                "ParquetItemExporter requires pyarrow, install it using "
+                "`pip install -e .[parquet]`"
+            )
+        super(ParquetItemExporter, self).__init__(dont_fail=True, **kwargs)
+        self.file = file
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.schema = None
+        self.writer = None
+        self.columns = None
+        self.count = 0
+
+    @classmethod
+    def from_crawler(cls, crawler, file, **kwargs):
+        settings = crawler.settings
+        kwargs.setdefault(
+            "compression", settings.get("FEED_EXPORT_PARQUET_COMPRESSION", "zstd")
+        )
+        kwargs.setdefault(
+            "row_group_size",
+            settings.getint("FEED_EXPORT_PARQUET_ROW_GROUP_SIZE", 10000),
+        )
+        return cls(file, **kwargs)
+
+    def _start_schema(self, item=None):
+        """Derive schema and open parquet writer from first exported item."""
+        if is_dataclass(item):
+            schema = get_item_schema(type(item))
+        else:
+            schema = pyarrow.schema(
+                [
+                    (
+                        (name, _get_arrow_type(typing.Tuple[str, ...]))
+                        if isinstance(value, (list, tuple))
+                        else (name, _get_arrow_type(type(value)))
+                    )
+                    for name, value in ItemAdapter(item).items()
+                ]
+            )
+
+        # keep only fields to export, in their order
+        if self.fields_to_export:
+            names = list(self.fields_to_export)
+            schema = pyarrow.schema([schema.field(name) for name in names])
+
+        self.schema = schema
+        self.columns = {name: [] for name in schema.names}
+        self.writer = pyarrow.parquet.ParquetWriter(
+            self.file, schema, compression=self.compression
+        )
+
+    def _write_row_group(self):
+        """Write buffered items as a row group."""
+        if not self.count:
+            return
+
+        arrays = [
+            pyarrow.array(self.columns[schema_field.name], type=schema_field.type)
+            for schema_field in self.schema
+        ]
+        table = pyarrow.Table.from_arrays(arrays, schema=self.schema)
+        self.writer.write_table(table, row_group_size=self.count)
+        self.columns = {name: [] for name in self.schema.names}
+        self.count = 0
+
+    def export_item(self, item):
+        if self.schema is None:
+            self._start_schema(item=item)
+
+        adapter = ItemAdapter(item)
+        for name, column in self.columns.items():
+            column.append(adapter.get(name))
+
+        self.count = self.count + 1
+        if self.count >= self.row_group_size:
+            self._write_row_group()
+
+    def finish_exporting(self):
+        self._write_row_group()
+        if self.writer is not None:
+            self.writer.close()
+
+
+class ThreadedFileFeedStorage(FileFeedStorage):
+    """Local file feed storage, which close files once their writer finish.
+
+    Files written by ``ThreadedJsonLinesItemExporter`` are closed once their
+    writer thread is joined, within a thread, so the reactor thread does not
+    wait for a batch to be written when its feed slot is closed.
+
+    Don't forget to add the storage to the FEED_STORAGES setting, for
+    ``file`` and local (i.e ``""``) uri schemes.
+    """
+
+    def open(self, spider):
+        file = super(ThreadedFileFeedStorage, self).open(spider)
+        _WRITERS[id(file)] = None
+        return file
+
+    def store(self, file):
+        finished = _WRITERS.pop(id(file), None)
+        if finished is None:
+            return super(ThreadedFileFeedStorage, self).store(file)
+
+        def close(result=None):
+            file.close()
+            return result
+
+        return finished.addBoth(close)
+
+
+class ThreadedJsonLinesItemExporter(BaseItemExporter):
+    """Export items as jsonlines, encoded and written by a background thread.
+
+    Items are handed to a queue without blocking, and a writer thread
+    encode them (using ``jsonlib``), optionally compress them (``gzip`` or
+    ``zstd``) and write them, so the reactor thread is not stalled by large
+    batches. When the queue reach its high watermark the engine is paused,
+    and resumed once the writer drain the queue to its low watermark.
+
+    Writer thread is joined within a thread, when files are stored by
+    ``ThreadedFileFeedStorage``. Otherwise (i.e other storages or post
+    processing), writer thread is joined once exporting is finished.
+
+    Parameters
+    ----------
+    file (object):
+        Valid binary file object.
+
+    compression (str):
+        Valid streaming compression i.e ``gzip`` or ``zstd``. Default to none.
+
+    queue_size (int):
+        Valid number of items waiting to be written, at which the engine is
+        paused (i.e its high watermark is 80% of it).
+
+    engine (ExecutionEngine):
+        Valid crawler engine to pause when the queue fills.
+    """
+
+    def __init__(self, file, compression=None, queue_size=10000, engine=None, **kwargs):
+        super(ThreadedJsonLinesItemExporter, self).__init__(dont_fail=True, **kwargs)
+        if compression == "zstd" and zstandard is None:
+            raise ImportError(
+                "zstd compression requires zstandard, install it using "
+                "`pip install -e .[zstd]`"
+            )
+        self.file = file
+        self.compression = compression
+        self.engine = engine
+        self.queue = queue.Queue()
+        self.high_watermark = max(1, int(queue_size * 0.8))
+        self.low_watermark = int(queue_size * 0.2)
+        self.paused = False
+        self.error = None
+        self.writer = None
+
+    @classmethod
+    def from_crawler(cls, crawler, file, **kwargs):
+        settings = crawler.settings
+        kwargs.setdefault("compression", settings.get("FEED_EXPORT_COMPRESSION"))
+        kwargs.setdefault(
+            "queue_size", settings.getint("FEED_EXPORT_QUEUE_SIZE", 10000)
+        )
+        kwargs.setdefault("engine", crawler.engine)
+        return cls(file, **kwargs)
+
+    def _open_stream(self):
+        """Open compressed stream over file, without closing file on close."""
+        if self.compression == "gzip":
+            return gzip.GzipFile(fileobj=self.file, mode="wb", compresslevel=6)
+        if self.compression == "zstd":
+            compressor = zstandard.ZstdCompressor(level=3)
+            return compressor.stream_writer(self.file, closefd=False)
+        return None
+
+    def _write(self):
+        """Encode, compress and write queued items until finished."""
+        stream = self._open_stream()
+        write = stream.write if stream is not None else self.file.write
+        finished = False
+        try:
+            while not finished:
+                # write queued items in chunks, to reduce write calls
+                lines = []
+                value = self.queue.get()
+                while value is not _FINISH_EXPORTING:
+                    lines.append(jsonlib.dumps(value))
+                    lines.append(b"\n")
+                    if len(lines) >= 1000 or self.queue.empty():
+                        break
+                    value = self.queue.get()
+                finished = value is _FINISH_EXPORTING
+                write(b"".join(lines))
+                self._resume()
+        except Exception as error:
+            self.error = error
+            # drain queued items, so exporting does not block on a full queue
+            while not finished:
+                finished = self.queue.get() is _FINISH_EXPORTING
+            self._resume()
+        finally:
+            if stream is not None:
+                stream.close()
+
+    def _pause(self):
+        """Pause engine, when the queue reach its high watermark."""
+        if self.engine is not None and not self.paused:
+            if self.queue.qsize() >= self.high_watermark:
+                self.paused = True
+                self.engine.pause()
+
+    def _resume(self):
+        """Resume engine from reactor thread, once the queue is drained."""
+        if self.paused and self.queue.qsize() <= self.low_watermark:
+            from twisted.internet import reactor
+
+            reactor.callFromThread(self._unpause)
+
+    def _unpause(self):
+        if self.paused:
+            self.paused = False
+            self.engine.unpause()
+
+    def _raise_error(self):
+        """Raise error of writer thread, if any, on reactor thread."""
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def start_exporting(self):
+        self.writer = threading.Thread(
+            target=self._write, name="jsonlines-writer", daemon=True
+        )
+        self.writer.start()
+
+    def export_item(self, item):
+        self._raise_error()
+        self.queue.put_nowait(dict(self._get_serialized_fields(item)))
+        self._pause()
+
+    def _join(self, writer=None):
+        """Wait for writer thread, then raise its error, if any."""
+        writer.join()
+        self._raise_error()
+
+    def finish_exporting(self):
+        writer, self.writer = self.writer, None
+        if writer is None:
+            self._unpause()
+            return self._raise_error()
+
+        # join writer within a thread, if its file is closed once it finish
+        # otherwise, join it and raise its error now
+        self.queue.put_nowait(_FINISH_EXPORTING)
+        self._unpause()
+        if id(self.file) in _WRITERS:
+            _WRITERS[id(self.file)] = threads.deferToThread(self._join, writer)
+        else:
+            self._join(writer)
+
+
+class DeltaJsonLinesItemExporter(BaseItemExporter):
+    """Export items as jsonlines, writing only fields changed since last export.
+
+    Each item is compared against its previous snapshot held in a delta index
+    (see ``producthunt_scraper.delta``). New items, and items whose last full
+    record is ``keyframe_days`` old, are written as full records, others as
+    their id, a ``_delta`` marker and changed fields only.
+
+    Parameters
+    ----------
+    file (object):
+        Valid binary file object.
+
+    index (DeltaIndex):
+        Valid index of latest snapshots of items. Default to an index opened
+        from ``index_path``, and closed once exporting is finished.
+
+    index_path (str):
+        Valid path of delta index sqlite database file.
+
+    name (str):
+        Valid spider name, items are indexed by.
+
+    snapshot_date (date):
+        Valid date of exported snapshot i.e day partition date.
+
+    keyframe_days (int):
+        Valid maximum days between full records of an item.
+    """
+
+    def __init__(
+        self,
+        file,
+        index=None,
+        index_path=None,
+        name=None,
+        snapshot_date=None,
+        keyframe_days=7,
+        **kwargs,
+    ):
+        super(DeltaJsonLinesItemExporter, self).__init__(dont_fail=True, **kwargs)
+        self.file = file
+        self.owns_index = index is None
+        self.index = DeltaIndex(path=index_path) if index is None else index
+        self.name = name
+        self.snapshot_date = snapshot_date
+        self.keyframe_days = keyframe_days
+
+    @classmethod
+    def from_crawler(cls, crawler, file, **kwargs):
+        settings = crawler.settings
+        kwargs.setdefault("index_path", settings.get("DELTA_INDEX_PATH"))
+        kwargs.setdefault("name", crawler.spider.name)
+        kwargs.setdefault("snapshot_date", crawler.spider.last_scraped_date)
+        kwargs.setdefault("keyframe_days", settings.getint("DELTA_KEYFRAME_DAYS", 7))
+        return cls(file, **kwargs)
+
+    def _get_record(self, record=None):
+        """Get full or delta record of an item, and index its snapshot."""
+        key = get_item_key(record)
+        if key is None:
+            return record
+
+        item_id = f"""{key}/{record[key]}"""
+        base = self.index.get_base(self.name, item_id, self.snapshot_date)
+        full_date = self.snapshot_date
+        delta = record
+        if base is not None and (
+            (self.snapshot_date - base[0]).days < self.keyframe_days
+        ):
+            full_date = base[0]
+            delta = {key: record[key], DELTA_FIELD: True}
+            delta.update(get_delta(base[1], record))
+        self.index.put(self.name, item_id, self.snapshot_date, full_date, record)
+        return delta
+
+    def export_item(self, item):
+        # encode and decode item, so it compares with indexed records
+        record = jsonlib.loads(jsonlib.dumps(dict(self._get_serialized_fields(item))))
+        self.file.write(jsonlib.dumps(self._get_record(record)))
+        self.file.write(b"\n")
+
+    def finish_exporting(self):
+        if self.owns_index:
+            self.index.close()
+        else:
+            self.index.commit()
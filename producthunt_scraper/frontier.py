@@ -0,0 +1,558 @@
+"""Shared frontier of requests, used to crawl a spider with many workers.
+
+Requests are partitioned across workers (i.e nodes) by a hash of their
+canonical url, and pushed to a shared queue of their partition, so each
+worker downloads pages of its own partition only. Fingerprints of seen
+requests are shared, so a page is scheduled once across workers.
+
+Frontiers available are:
+    * ``SqliteFrontier``: sqlite file, shared by workers of a machine
+    * ``RedisFrontier``: redis server, shared by workers across machines
+
+Enable shared frontier using ``SCHEDULER`` setting, and configure workers
+using ``WORKER_ID`` and ``WORKER_COUNT`` settings.
+
+A crawl (i.e ``<spider>/<date>`` or ``FRONTIER_CRAWL_ID``) interrupted before
+it is done is resumed by its next run: seen requests are not scheduled again,
+and pending requests are popped. Once all workers are done, the crawl is
+marked done, and is cleared when opened again (i.e a second run of a same
+day crawls pages again). Workers record when they were last seen, every
+third of ``FRONTIER_WORKER_TIMEOUT``, so workers waiting on slow downloads
+are not taken for stopped workers. A crawl with pending requests (i.e of
+stopped workers) is not marked done.
+"""
+
+import hashlib
+import logging
+import pickle
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from scrapy import signals
+from scrapy.core.scheduler import BaseScheduler
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.misc import load_object
+from scrapy.utils.request import request_from_dict
+from twisted.internet import task
+from w3lib.url import canonicalize_url
+
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+__all__ = [
+    "Frontier",
+    "FrontierScheduler",
+    "RedisFrontier",
+    "SqliteFrontier",
+    "feed_uri_params",
+    "get_partition",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def get_partition(url=None, count=1):
+    """Get partition of a url, by a stable hash of its canonical form.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.frontier import get_partition
+    >>> get_partition("https://www.producthunt.com/products/notion", count=1)
+    0
+    >>> a = get_partition("https://www.producthunt.com/products/notion?b=1&a=2", 4)
+    >>> a == get_partition("https://www.producthunt.com/products/notion?a=2&b=1", 4)
+    True
+    """
+    if count <= 1:
+        return 0
+    digest = hashlib.blake2b(canonicalize_url(url).encode("utf-8"), digest_size=8)
+    return int.from_bytes(digest.digest(), "little") % count
+
+
+def feed_uri_params(params=None, spider=None):
+    """Add ``part_name`` feed uri parameter, unique per worker.
+
+    Feed files are named ``part-<batch_id>`` with a single worker, and
+    ``part-<worker_id>-<batch_id>`` with many workers, so workers write
+    their own files within a same partition (i.e ``date=``). Spiders without
+    data dir or scraped date (i.e of ``scrapy fetch`` or ``scrapy shell``)
+    write into data dir of project settings, on crawl date.
+    """
+    settings = spider.crawler.settings
+    part_name = "part"
+    if settings.getint("WORKER_COUNT", 1) > 1:
+        part_name = f"""part-{settings.getint("WORKER_ID", 0)}"""
+    return {
+        "data_dir": settings.get("BASE_DATA_DIR"),
+        "last_scraped_date": datetime.utcnow().date(),
+        **params,
+        "part_name": part_name,
+    }
+
+
+class Frontier:
+    """Base shared frontier of a crawl.
+
+    Requests are pushed to queues of their partitions, and popped from
+    queues of workers' partitions (i.e worker ``0`` pops from partition
+    ``0``). Workers record whether they are busy, so idle workers wait for
+    busy workers before closing.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls()
+
+    def open(self, crawl=None):
+        """Open frontier of a crawl i.e ``trending-products/2023-10-24``.
+
+        A crawl marked done is cleared first, otherwise it is resumed.
+        """
+        self.crawl = crawl
+
+    def finish(self):
+        """Mark crawl done, so it is cleared once opened again."""
+        raise NotImplementedError
+
+    def push(self, partition=0, data=None, priority=0, fingerprint=None):
+        """Push request data to a partition queue, unless already seen.
+
+        Returns ``False`` when request ``fingerprint`` was seen before.
+        """
+        raise NotImplementedError
+
+    def pop(self, partition=0, worker_id=0):
+        """Pop request data from a partition queue, and mark worker busy."""
+        raise NotImplementedError
+
+    def size(self, partition=0):
+        """Get number of requests within a partition queue."""
+        raise NotImplementedError
+
+    def set_worker(self, worker_id=0, busy=False):
+        """Record whether a worker is busy, and when it was last seen."""
+        raise NotImplementedError
+
+    def get_workers(self):
+        """Get ``{worker_id: (busy, seen_at)}`` of workers of a crawl."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources used by the frontier."""
+
+
+class SqliteFrontier(Frontier):
+    """Shared frontier within a sqlite file, for workers of a machine.
+
+    Parameters
+    ----------
+    path (str):
+        Valid path of sqlite database file.
+
+    timeout (float):
+        Valid seconds to wait for a database lock held by another worker.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.frontier import SqliteFrontier
+    >>> frontier = SqliteFrontier(path=":memory:")
+    >>> frontier.open("crawl")
+    >>> frontier.push(1, b"a", fingerprint="a"), frontier.push(1, b"a", fingerprint="a")
+    (True, False)
+    >>> frontier.size(1), frontier.pop(1, worker_id=1), frontier.pop(1, worker_id=1)
+    (1, b'a', None)
+    >>> frontier.get_workers()[1][0]
+    True
+    >>> frontier.finish(), frontier.open("crawl")
+    (None, None)
+    >>> frontier.push(1, b"a", fingerprint="a"), frontier.size(1)
+    (True, 1)
+    """
+
+    def __init__(self, path=None, timeout=30.0):
+        self.path = str(path or ":memory:")
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(
+            self.path, timeout=timeout, isolation_level=None
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS seen (
+                crawl TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                PRIMARY KEY (crawl, fingerprint)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                crawl TEXT NOT NULL,
+                partition INTEGER NOT NULL,
+                priority INTEGER NOT NULL,
+                data BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS requests_queue
+                ON requests (crawl, partition, priority DESC, id);
+            CREATE TABLE IF NOT EXISTS workers (
+                crawl TEXT NOT NULL,
+                worker_id INTEGER NOT NULL,
+                busy INTEGER NOT NULL,
+                seen_at REAL NOT NULL,
+                PRIMARY KEY (crawl, worker_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS crawls (
+                crawl TEXT PRIMARY KEY,
+                done_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+        self.crawl = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(path=crawler.settings.get("FRONTIER_SQLITE_PATH"))
+
+    def open(self, crawl=None):
+        self.crawl = crawl
+        connection = self.connection
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            cursor = connection.execute("DELETE FROM crawls WHERE crawl = ?", (crawl,))
+            if cursor.rowcount == 0:
+                return
+            for table in ("seen", "requests", "workers"):
+                connection.execute(f"""DELETE FROM {table} WHERE crawl = ?""", (crawl,))
+
+    def finish(self):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO crawls (crawl, done_at) VALUES (?, ?)",
+            (self.crawl, time.time()),
+        )
+
+    def push(self, partition=0, data=None, priority=0, fingerprint=None):
+        connection = self.connection
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            if fingerprint is not None:
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO seen (crawl, fingerprint) VALUES (?, ?)",
+                    (self.crawl, fingerprint),
+                )
+                if cursor.rowcount == 0:
+                    return False
+            connection.execute(
+                "INSERT INTO requests (crawl, partition, priority, data) "
+                "VALUES (?, ?, ?, ?)",
+                (self.crawl, partition, priority, data),
+            )
+        return True
+
+    def _peek(self, partition=0):
+        """Get id and data of next request of a partition queue, if any."""
+        return self.connection.execute(
+            "SELECT id, data FROM requests WHERE crawl = ? AND partition = ? "
+            "ORDER BY priority DESC, id LIMIT 1",
+            (self.crawl, partition),
+        ).fetchone()
+
+    def pop(self, partition=0, worker_id=0):
+        # check without a write lock first, as empty queues are polled often
+        if self._peek(partition) is None:
+            return None
+
+        connection = self.connection
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = self._peek(partition)
+            if row is None:
+                return None
+            connection.execute("DELETE FROM requests WHERE id = ?", (row[0],))
+            self._set_worker(worker_id, busy=True)
+        return row[1]
+
+    def size(self, partition=0):
+        (size,) = self.connection.execute(
+            "SELECT COUNT(*) FROM requests WHERE crawl = ? AND partition = ?",
+            (self.crawl, partition),
+        ).fetchone()
+        return size
+
+    def _set_worker(self, worker_id=0, busy=False):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO workers (crawl, worker_id, busy, seen_at) "
+            "VALUES (?, ?, ?, ?)",
+            (self.crawl, worker_id, int(busy), time.time()),
+        )
+
+    def set_worker(self, worker_id=0, busy=False):
+        self._set_worker(worker_id, busy=busy)
+
+    def get_workers(self):
+        rows = self.connection.execute(
+            "SELECT worker_id, busy, seen_at FROM workers WHERE crawl = ?",
+            (self.crawl,),
+        )
+        return {worker_id: (bool(busy), seen_at) for worker_id, busy, seen_at in rows}
+
+    def close(self):
+        self.connection.close()
+
+
+class RedisFrontier(Frontier):
+    """Shared frontier within a redis server, for workers across machines.
+
+    Partition queues are sorted sets scored by priority then push order, and
+    seen fingerprints a set, updated atomically using lua scripts.
+
+    Parameters
+    ----------
+    url (str):
+        Valid redis url i.e ``redis://localhost:6379/0``.
+
+    prefix (str):
+        Valid prefix of redis keys.
+    """
+
+    PUSH_SCRIPT = """
+    if ARGV[1] ~= '' and redis.call('SADD', KEYS[1], ARGV[1]) == 0 then
+        return 0
+    end
+    local sequence = redis.call('INCR', KEYS[2])
+    local score = -tonumber(ARGV[2]) * 4294967296 + sequence
+    redis.call('ZADD', KEYS[3], score, struct.pack('>I8', sequence) .. ARGV[3])
+    return 1
+    """
+
+    POP_SCRIPT = """
+    local popped = redis.call('ZPOPMIN', KEYS[1])
+    if popped[1] then
+        redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+    end
+    return popped[1]
+    """
+
+    def __init__(self, url=None, prefix="producthunt"):
+        if redis is None:
+            raise ImportError(
+                "redis frontier requires redis, install it using "
+                "`pip install -e .[redis]`"
+            )
+        self.client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.prefix = prefix
+        self._push = self.client.register_script(self.PUSH_SCRIPT)
+        self._pop = self.client.register_script(self.POP_SCRIPT)
+        self.crawl = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(url=crawler.settings.get("FRONTIER_REDIS_URL"))
+
+    def _key(self, *names):
+        return ":".join([self.prefix, self.crawl, *map(str, names)])
+
+    def open(self, crawl=None):
+        self.crawl = crawl
+        if self.client.delete(self._key("done")):
+            keys = list(self.client.scan_iter(match=self._key("*")))
+            if keys:
+                self.client.delete(*keys)
+
+    def finish(self):
+        self.client.set(self._key("done"), time.time())
+
+    def push(self, partition=0, data=None, priority=0, fingerprint=None):
+        keys = [self._key("seen"), self._key("sequence"), self._key(partition)]
+        args = [fingerprint or "", priority, data]
+        return bool(self._push(keys=keys, args=args))
+
+    def pop(self, partition=0, worker_id=0):
+        keys = [self._key(partition), self._key("workers")]
+        data = self._pop(keys=keys, args=[worker_id, f"""1:{time.time()}"""])
+        return data[8:] if data is not None else None
+
+    def size(self, partition=0):
+        return self.client.zcard(self._key(partition))
+
+    def set_worker(self, worker_id=0, busy=False):
+        state = f"""{int(busy)}:{time.time()}"""
+        self.client.hset(self._key("workers"), worker_id, state)
+
+    def get_workers(self):
+        workers = {}
+        for worker_id, state in self.client.hgetall(self._key("workers")).items():
+            busy, _, seen_at = state.decode("utf-8").partition(":")
+            workers[int(worker_id)] = (busy == "1", float(seen_at))
+        return workers
+
+    def close(self):
+        self.client.close()
+
+
+class FrontierScheduler(BaseScheduler):
+    """Schedule requests of a worker within a shared frontier.
+
+    A request is pushed to partition of its url, unless its fingerprint was
+    seen by any worker, and a worker only pops requests of its partition
+    (i.e ``WORKER_ID``). An idle worker keeps its spider open while other
+    workers are busy or have pending requests, as they may push requests
+    to its partition, and closes it once all workers are idle. Workers not
+    seen within ``FRONTIER_WORKER_TIMEOUT`` are taken for stopped, and their
+    pending requests are left to next run of the crawl.
+
+    Parameters
+    ----------
+    crawler (Crawler):
+        Valid scrapy crawler.
+
+    frontier (Frontier):
+        Valid shared frontier.
+    """
+
+    def __init__(self, crawler=None, frontier=None):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.frontier = frontier
+        self.worker_id = settings.getint("WORKER_ID", 0)
+        self.worker_count = max(1, settings.getint("WORKER_COUNT", 1))
+        if not 0 <= self.worker_id < self.worker_count:
+            raise ValueError(
+                f"""WORKER_ID must be within [0, {self.worker_count}), """
+                f"""got {self.worker_id}"""
+            )
+        self.crawl_id = settings.get("FRONTIER_CRAWL_ID")
+        self.idle_poll = settings.getfloat("FRONTIER_IDLE_POLL", 0.5)
+        self.worker_timeout = settings.getfloat("FRONTIER_WORKER_TIMEOUT", 60.0)
+        self.spider = None
+        self.opened_at = None
+        self.busy = False
+        self.heartbeat = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        frontier_class = load_object(crawler.settings.get("FRONTIER_BACKEND"))
+        return cls(crawler=crawler, frontier=frontier_class.from_crawler(crawler))
+
+    def open(self, spider):
+        self.spider = spider
+        crawl = self.crawl_id or (
+            f"""{spider.name}/{getattr(spider, "last_scraped_date", "")}"""
+        )
+        self.frontier.open(crawl)
+
+        # warn of an interrupted run of worker, as its crawl is resumed
+        if self.worker_id in self.frontier.get_workers():
+            logger.warning(
+                "Resuming %s, interrupted with %d pending requests",
+                crawl,
+                self._get_pending_requests(),
+                extra={"spider": spider},
+            )
+
+        self.busy = True
+        self.frontier.set_worker(self.worker_id, busy=True)
+        self.opened_at = time.time()
+        self.crawler.signals.connect(self.spider_idle, signals.spider_idle)
+
+        # record worker is alive, while it waits on slow downloads
+        self.heartbeat = task.LoopingCall(self.beat)
+        self.heartbeat.start(self.worker_timeout / 3, now=False)
+        logger.info(
+            "Crawling partition %d of %d of %s",
+            self.worker_id,
+            self.worker_count,
+            crawl,
+            extra={"spider": spider},
+        )
+
+    def close(self, reason):
+        if self.heartbeat is not None and self.heartbeat.running:
+            self.heartbeat.stop()
+        self.frontier.set_worker(self.worker_id, busy=False)
+        self.frontier.close()
+
+    def beat(self):
+        """Record worker is alive, and whether it is busy."""
+        self.frontier.set_worker(self.worker_id, busy=self.busy)
+
+    def has_pending_requests(self):
+        return self.frontier.size(self.worker_id) > 0
+
+    def enqueue_request(self, request):
+        fingerprint = None
+        if not request.dont_filter:
+            fingerprint = self.crawler.request_fingerprinter.fingerprint(request)
+            fingerprint = fingerprint.hex()
+
+        partition = get_partition(request.url, self.worker_count)
+        data = pickle.dumps(request.to_dict(spider=self.spider), protocol=4)
+        pushed = self.frontier.push(
+            partition, data, priority=request.priority, fingerprint=fingerprint
+        )
+        if not pushed:
+            self.stats.inc_value("dupefilter/filtered", spider=self.spider)
+            return False
+
+        self.stats.inc_value("scheduler/enqueued/frontier", spider=self.spider)
+        self.stats.inc_value(
+            f"""scheduler/enqueued/frontier/partition/{partition}""",
+            spider=self.spider,
+        )
+        return True
+
+    def next_request(self):
+        data = self.frontier.pop(self.worker_id, worker_id=self.worker_id)
+        if data is None:
+            return None
+        self.busy = True
+        self.stats.inc_value("scheduler/dequeued/frontier", spider=self.spider)
+        return request_from_dict(pickle.loads(data), spider=self.spider)
+
+    def _is_crawl_idle(self):
+        """Check if all workers are idle, without pending requests."""
+        now = time.time()
+        workers = {
+            worker_id: busy
+            for worker_id, (busy, seen_at) in self.frontier.get_workers().items()
+            if now - seen_at < self.worker_timeout
+        }
+
+        # wait for workers to start, unless they are late
+        is_late = now - self.opened_at >= self.worker_timeout
+        if len(workers) < self.worker_count and not is_late:
+            return False
+
+        return not any(
+            busy or self.frontier.size(worker_id) for worker_id, busy in workers.items()
+        )
+
+    def _get_pending_requests(self):
+        """Get number of pending requests of all partitions, of any worker."""
+        return sum(
+            self.frontier.size(partition) for partition in range(self.worker_count)
+        )
+
+    def spider_idle(self, spider):
+        self.busy = False
+        self.frontier.set_worker(self.worker_id, busy=False)
+        if not self._is_crawl_idle():
+            # poll frontier for requests pushed by other workers
+            self.crawler.engine.slot.nextcall.schedule(self.idle_poll)
+            raise DontCloseSpider
+
+        # keep crawl with pending requests of stopped workers, to resume it
+        pending = self._get_pending_requests()
+        if pending:
+            logger.warning(
+                "Closing with %d pending requests of stopped workers, "
+                "crawled by next run",
+                pending,
+                extra={"spider": spider},
+            )
+            return
+        self.frontier.finish()
@@ -0,0 +1,284 @@
+"""GraphQL (i.e compact JSON) fetch mode helpers.
+
+Instead of downloading Next.js pages to read their embedded apollo state,
+entities are requested from producthunt graphql endpoint as persisted
+queries (i.e ``GET`` requests with operation name, variables and query
+hash), with cursor pagination of lists and batches of entities ids. Queries
+unknown to the server (i.e ``PersistedQueryNotFound``) are sent again with
+their query text, which registers them (see ``GraphQLPersistedQueryMiddleware``).
+
+Responses are normalized into an apollo state (i.e entities keyed by
+``<__typename><id>`` and nested entities replaced by ``__ref``), so spiders
+parse them as page script data, using the same data mappings.
+
+Configure fetch mode using ``PRODUCTHUNT_FETCH_MODE`` and
+``PRODUCTHUNT_GRAPHQL_*`` settings.
+"""
+
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from producthunt_scraper import jsonlib
+
+__all__ = [
+    "GRAPHQL_QUERIES",
+    "add_typename",
+    "build_graphql_url",
+    "get_query_hash",
+    "is_graphql_response",
+    "is_persisted_query_not_found",
+    "load_graphql_data",
+    "normalize_graphql",
+    "parse_graphql_url",
+]
+
+# fields of graphql entities, as used by spiders data mappings
+_TOPICS_FIELDS = "topics(first: 3) { edges { node { id name } } }"
+_PRODUCT_FIELDS = (
+    "id slug name tagline description url websiteUrl reviewsRating "
+    "followersCount totalVotesCount reviewersCount reviewsCount postsCount "
+    "stacksCount alternativesCount tipsCount addonsCount platforms "
+    f"""structuredData {_TOPICS_FIELDS} categories {{ id name }}"""
+)
+_POST_FIELDS = (
+    "id slug name tagline description url votesCount commentsCount dailyRank "
+    "weeklyRank createdAt featuredAt updatedAt structuredData "
+    f"""product {{ id name url }} {_TOPICS_FIELDS}"""
+)
+_PAGE_INFO_FIELDS = "pageInfo { endCursor hasNextPage }"
+
+# error of a persisted query unknown to the server
+PERSISTED_QUERY_NOT_FOUND = "PersistedQueryNotFound"
+
+
+def add_typename(query=None):
+    """Add ``__typename`` to every selection set of a query, but its root.
+
+    Entities are normalized by their ``__typename`` (see
+    ``normalize_graphql``), which servers only return when selected.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.graphql import add_typename
+    >>> add_typename("query A($id: ID!) { a(id: $id) { id b { id } } }")
+    'query A($id: ID!) { a(id: $id) { __typename id b { __typename id } } }'
+    """
+    head, brace, body = query.partition("{")
+    return f"""{head}{brace}{body.replace("{", "{ __typename")}"""
+
+
+# queries by operation name, selecting __typename of every entity
+GRAPHQL_QUERIES = {
+    "TrendingTopics": (
+        "query TrendingTopics($first: Int!) { trendingTopics(first: $first) "
+        "{ edges { node { id slug name } } } }"
+    ),
+    "TopicProducts": (
+        "query TopicProducts($slug: String!, $order: String!, $first: Int!, "
+        "$after: String) { topic(slug: $slug) { id products(order: $order, "
+        f"""first: $first, after: $after) {{ edges {{ node {{ id }} }} """
+        f"""{_PAGE_INFO_FIELDS} }} }} }}"""
+    ),
+    "Products": (
+        f"""query Products($ids: [ID!]!) {{ products(ids: $ids) """
+        f"""{{ {_PRODUCT_FIELDS} }} }}"""
+    ),
+    "FeaturedPosts": (
+        "query FeaturedPosts($first: Int!, $after: String) "
+        "{ featuredPosts(first: $first, after: $after) "
+        f"""{{ edges {{ node {{ id }} }} {_PAGE_INFO_FIELDS} }} }}"""
+    ),
+    "Posts": (
+        f"""query Posts($ids: [ID!]!) {{ posts(ids: $ids) """
+        f"""{{ {_POST_FIELDS} }} }}"""
+    ),
+}
+GRAPHQL_QUERIES = {
+    operation: add_typename(query) for operation, query in GRAPHQL_QUERIES.items()
+}
+
+
+def _dumps(value=None):
+    """Encode a value as compact JSON, with sorted keys."""
+    return jsonlib.dumps(dict(sorted(value.items()))).decode("utf-8")
+
+
+def get_query_hash(operation=None):
+    """Get sha256 hash of a query, as sent by persisted queries.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.graphql import get_query_hash
+    >>> len(get_query_hash("Products"))
+    64
+    """
+    return hashlib.sha256(GRAPHQL_QUERIES[operation].encode("utf-8")).hexdigest()
+
+
+def build_graphql_url(
+    graphql_url=None, operation=None, variables=None, include_query=False
+):
+    """Build url of a persisted query of an operation.
+
+    Parameters
+    ----------
+    graphql_url (str):
+        Valid graphql endpoint url.
+
+    operation (str):
+        Valid operation name i.e ``Products``.
+
+    variables (dict):
+        Valid operation variables.
+
+    include_query (bool):
+        Whether to send query text along its hash, to register it. Default to
+        ``False``.
+
+    Returns
+    -------
+    url (str):
+        Valid url of a ``GET`` graphql request.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.graphql import build_graphql_url
+    >>> url = build_graphql_url("https://ph.test/graphql", "Posts", {"ids": ["1"]})
+    >>> url.split("&")[0]
+    'https://ph.test/graphql?operationName=Posts'
+    """
+    extensions = {
+        "persistedQuery": {"version": 1, "sha256Hash": get_query_hash(operation)}
+    }
+    query = {
+        "operationName": operation,
+        "variables": _dumps(variables or {}),
+        "extensions": _dumps(extensions),
+    }
+    if include_query:
+        query["query"] = GRAPHQL_QUERIES[operation]
+    return f"""{graphql_url}?{urlencode(query)}"""
+
+
+def parse_graphql_url(url=None, graphql_url=None):
+    """Parse operation name and variables of a graphql url.
+
+    Parameters
+    ----------
+    url (str):
+        Valid url.
+
+    graphql_url (str):
+        Valid graphql endpoint url. Default to any url with operation name.
+
+    Returns
+    -------
+    operation (str|None):
+        Valid operation name, or ``None`` if url is not a graphql url.
+
+    variables (dict):
+        Valid operation variables.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.graphql import build_graphql_url, parse_graphql_url
+    >>> url = build_graphql_url("https://ph.test/graphql", "Posts", {"ids": ["1"]})
+    >>> parse_graphql_url(url, "https://ph.test/graphql")
+    ('Posts', {'ids': ['1']})
+    >>> parse_graphql_url("https://ph.test/posts/1", "https://ph.test/graphql")
+    (None, {})
+    """
+    url = str(url)
+    if graphql_url and not url.startswith(f"""{graphql_url}?"""):
+        return None, {}
+
+    query = dict(parse_qsl(urlsplit(url).query))
+    operation = query.get("operationName")
+    if operation is None:
+        return None, {}
+    variables = jsonlib.loads(query.get("variables") or "{}")
+    return operation, variables if isinstance(variables, dict) else {}
+
+
+def is_graphql_response(response=None):
+    """Check if a response is a JSON (i.e graphql) response."""
+    headers = getattr(response, "headers", None) or {}
+    content_type = headers.get(b"Content-Type") or b""
+    return b"json" in content_type.lower()
+
+
+def is_persisted_query_not_found(response=None):
+    """Check if a graphql response is of a persisted query unknown to the server."""
+    if not is_graphql_response(response=response):
+        return False
+    if PERSISTED_QUERY_NOT_FOUND.encode("utf-8") not in (response.body or b""):
+        return False
+    _, errors = load_graphql_data(response=response)
+    return any(error.get("message") == PERSISTED_QUERY_NOT_FOUND for error in errors)
+
+
+def load_graphql_data(response=None):
+    """Decode data of a graphql response.
+
+    Returns
+    -------
+    data (dict):
+        Valid response data.
+
+    errors (list):
+        Valid response errors, if any.
+    """
+    try:
+        payload = jsonlib.loads(response.body or b"{}")
+    except ValueError:
+        return {}, [{"message": "Invalid JSON response"}]
+    payload = payload if isinstance(payload, dict) else {}
+    return payload.get("data") or {}, payload.get("errors") or []
+
+
+def normalize_graphql(data=None):
+    """Normalize graphql response data into an apollo state.
+
+    Nested entities (i.e with ``__typename`` and ``id``) are keyed by
+    ``<__typename><id>``, and replaced by their reference.
+
+    Parameters
+    ----------
+    data (dict):
+        Valid graphql response data.
+
+    Returns
+    -------
+    state (dict):
+        Valid apollo state, with response root as ``ROOT_QUERY``.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.graphql import normalize_graphql
+    >>> state = normalize_graphql(
+    ...     {"posts": [{"__typename": "Post", "id": "1",
+    ...     "product": {"__typename": "Product", "id": "2"}}]}
+    ... )
+    >>> state["Post1"]
+    {'__typename': 'Post', 'id': '1', 'product': {'__ref': 'Product2'}}
+    >>> state["ROOT_QUERY"]
+    {'posts': [{'__ref': 'Post1'}]}
+    """
+    state = {}
+
+    def normalize(value=None):
+        if isinstance(value, list):
+            return [normalize(nested_value) for nested_value in value]
+        if not isinstance(value, dict):
+            return value
+
+        value = {key: normalize(nested_value) for key, nested_value in value.items()}
+        typename, entity_id = value.get("__typename"), value.get("id")
+        if typename and entity_id is not None:
+            key = f"""{typename}{entity_id}"""
+            state[key] = {**state.get(key, {}), **value}
+            return {"__ref": key}
+        return value
+
+    state["ROOT_QUERY"] = normalize(data or {})
+    return state
@@ -0,0 +1,142 @@
+"""Download handlers.
+
+Provide a HTTP/2 download handler which multiplex requests over a small pool
+of persistent connections per host, as all pages live on a single host.
+
+Don't forget to add your handler to the DOWNLOAD_HANDLERS setting
+See: https://docs.scrapy.org/en/latest/topics/settings.html#download-handlers
+"""
+
+from itertools import count
+
+from scrapy.core.downloader.contextfactory import load_context_factory_from_settings
+from scrapy.core.downloader.handlers.http import HTTPDownloadHandler
+from scrapy.exceptions import NotConfigured
+from twisted.internet.protocol import Factory
+
+try:
+    # HTTP/2 support requires h2 i.e pip install -e .[http2]
+    from scrapy.core.downloader.handlers.http2 import ScrapyH2Agent
+    from scrapy.core.http2.agent import H2ConnectionPool
+except ImportError:  # pragma: no cover
+    ScrapyH2Agent = H2ConnectionPool = None
+
+__all__ = ["PooledH2ConnectionPool", "PooledH2DownloadHandler"]
+
+
+class ClientFactory(Factory):
+    """Build HTTP/2 client protocols, without negotiating protocols.
+
+    Acceptable protocols are already set on tls context of a host (see
+    ``AcceptableProtocolsContextFactory``), and setting them again on each
+    connection mutate a used tls context (unsupported by pyOpenSSL).
+    """
+
+    def __init__(self, factory=None):
+        self.factory = factory
+
+    def buildProtocol(self, addr):
+        return self.factory.buildProtocol(addr)
+
+
+class ClientEndpoint:
+    """Connect an endpoint using ``ClientFactory`` over protocol factories."""
+
+    def __init__(self, endpoint=None):
+        self.endpoint = endpoint
+
+    def connect(self, factory=None):
+        return self.endpoint.connect(ClientFactory(factory=factory))
+
+
+class PooledH2ConnectionPool:
+    """Pool of persistent HTTP/2 connections, with many connections per host.
+
+    Requests are spread across ``pool_size`` connection pools (i.e a
+    connection per host each) in round robin order. Each connection
+    multiplex its requests as streams, so a small pool avoid head of line
+    blocking of a single connection (i.e on packet loss) without the cost of
+    a connection per request.
+
+    Only public methods of scrapy ``H2ConnectionPool`` (i.e
+    ``get_connection`` and ``close_connections``) are used, as its private
+    methods change between scrapy versions (tested with scrapy 2.11).
+
+    Parameters
+    ----------
+    reactor (object):
+        Valid twisted reactor.
+
+    settings (Settings):
+        Valid scrapy settings.
+
+    pool_size (int):
+        Valid number of connections per host.
+    """
+
+    def __init__(self, reactor, settings, pool_size=2):
+        self.settings = settings
+        self.pool_size = max(1, pool_size)
+        self.pools = [
+            H2ConnectionPool(reactor, settings) for _ in range(self.pool_size)
+        ]
+        self._counters = {}
+
+    def get_connection(self, key, uri, endpoint):
+        counter = self._counters.setdefault(key, count())
+        pool = self.pools[next(counter) % self.pool_size]
+        return pool.get_connection(key, uri, ClientEndpoint(endpoint=endpoint))
+
+    def close_connections(self):
+        for pool in self.pools:
+            pool.close_connections()
+
+
+class PooledH2DownloadHandler:
+    """HTTP/2 download handler, using a pool of connections per host.
+
+    Enable HTTP/2 using ``HTTP2_ENABLED`` setting, otherwise (default) pages
+    are downloaded using scrapy HTTP/1.1 download handler. Configure
+    connections per host using ``HTTP2_POOL_SIZE`` setting. Host names are
+    resolved using scrapy DNS cache (i.e ``DNSCACHE_ENABLED``).
+
+    Parameters
+    ----------
+    settings (Settings):
+        Valid scrapy settings.
+
+    crawler (Crawler):
+        Valid scrapy crawler.
+    """
+
+    def __init__(self, settings, crawler=None):
+        from twisted.internet import reactor
+
+        self._crawler = crawler
+        self._pool = PooledH2ConnectionPool(
+            reactor, settings, pool_size=settings.getint("HTTP2_POOL_SIZE", 2)
+        )
+        self._context_factory = load_context_factory_from_settings(settings, crawler)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        # download over HTTP/1.1, unless HTTP/2 is enabled
+        settings = crawler.settings
+        if not settings.getbool("HTTP2_ENABLED"):
+            return HTTPDownloadHandler.from_crawler(crawler)
+        if H2ConnectionPool is None:
+            raise NotConfigured(
+                "HTTP/2 requires h2, install it using `pip install -e .[http2]`"
+            )
+        return cls(settings, crawler)
+
+    def download_request(self, request, spider):
+        agent = ScrapyH2Agent(
+            context_factory=self._context_factory,
+            pool=self._pool,
+            crawler=self._crawler,
+        )
+        return agent.download_request(request, spider)
+
+    def close(self):
+        self._pool.close_connections()
@@ -0,0 +1,422 @@
+"""HTTP cache storages.
+
+Provide a compact, on-disk HTTP cache storage which keep responses keyed by
+request fingerprint in a single sqlite database file, with compressed
+bodies, per url path expiration and least recently used size eviction.
+
+Don't forget to set your storage to the HTTPCACHE_STORAGE setting
+See: https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-storage
+"""
+
+import io
+import logging
+import pickle
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from scrapy.extensions.httpcache import FilesystemCacheStorage
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.gz import gunzip
+from scrapy.utils.misc import load_object
+from scrapy.utils.project import data_path
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+from producthunt_scraper.apollo import locate_script_data
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+__all__ = [
+    "SqliteCacheStorage",
+    "decode_body",
+    "get_expiration_secs",
+    "iter_cached_pages",
+    "iter_filesystem_pages",
+]
+
+logger = logging.getLogger(__name__)
+
+# errors of bodies failing to be decoded, kept as is
+DECODE_ERRORS = (OSError, zlib.error)
+if zstandard is not None:
+    DECODE_ERRORS += (zstandard.ZstdError,)
+if brotli is not None:
+    DECODE_ERRORS += (brotli.error,)
+
+# page rebuilt around cached page script data only
+SCRIPT_DATA_PAGE = (
+    b'<html><head></head><body><script id="__NEXT_DATA__" type="application/json">'
+    b"%s</script></body></html>"
+)
+
+
+def get_expiration_secs(url=None, expiration=None, default=0):
+    """Get expiration seconds of an url, by its longest matching path prefix.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.httpcache import get_expiration_secs
+    >>> expiration = {"/topics": 3600, "/products/": 604800}
+    >>> get_expiration_secs("https://a.b/topics/ai", expiration)
+    3600
+    >>> get_expiration_secs("https://a.b/posts/x", expiration, default=60)
+    60
+    """
+    path = urlsplit(url).path or "/"
+    matches = [prefix for prefix in expiration or {} if path.startswith(prefix)]
+    if not matches:
+        return default
+    return expiration[max(matches, key=len)]
+
+
+def decode_body(body=None, headers=None):
+    """Decode body by its ``Content-Encoding``, as scrapy http compression does.
+
+    Cache middleware stores responses before they are decoded, so cached
+    bodies may be encoded with gzip, deflate, zstd or br (if zstandard or
+    brotli are installed). Decoded body's ``Content-Encoding`` (and
+    ``Content-Length``) headers are dropped. Bodies of unsupported encodings,
+    or which fail to be decoded, are kept as is.
+
+    Parameters
+    ----------
+    body (bytes):
+        Valid response body.
+
+    headers (Headers):
+        Valid scrapy response headers, updated in place.
+
+    Returns
+    -------
+    body (bytes):
+        Valid decoded body.
+
+    Examples
+    --------
+    >>> import gzip
+    >>> from scrapy.http import Headers
+    >>> from producthunt_scraper.httpcache import decode_body
+    >>> headers = Headers({"Content-Encoding": "gzip"})
+    >>> decode_body(gzip.compress(b"<html></html>"), headers)
+    b'<html></html>'
+    >>> b"Content-Encoding" in headers
+    False
+    """
+    encoding = (headers.get(b"Content-Encoding") or b"").lower()
+    try:
+        if encoding in (b"gzip", b"x-gzip"):
+            body = gunzip(body)
+        elif encoding == b"deflate":
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:
+                body = zlib.decompress(body, -zlib.MAX_WBITS)
+        elif encoding == b"zstd" and zstandard is not None:
+            # frames may not have their content size i.e streamed responses
+            reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body))
+            body = reader.read()
+        elif encoding == b"br" and brotli is not None:
+            body = brotli.decompress(body)
+        else:
+            return body
+    except DECODE_ERRORS:
+        return body
+    headers.pop(b"Content-Encoding")
+    headers.pop(b"Content-Length", None)
+    return body
+
+
+class SqliteCacheStorage:
+    """Single file, compressed HTTP cache storage keyed by request fingerprint.
+
+    Responses bodies are compressed (``zstd`` if installed, or ``zlib``), and
+    pages whose url path match ``HTTPCACHE_SQLITE_SCRIPT_DATA_PATHS`` are
+    stored as their ``__NEXT_DATA__`` script only. Responses expire per url
+    path prefix (see ``HTTPCACHE_SQLITE_EXPIRATION``), and least recently used
+    responses are evicted once stored bytes exceed ``HTTPCACHE_SQLITE_MAX_BYTES``.
+
+    Hit rate and bytes saved by compression are collected in stats as
+    ``httpcache/hit_rate`` and ``httpcache/bytes_saved``.
+
+    Parameters
+    ----------
+    settings (Settings):
+        Valid scrapy settings.
+    """
+
+    def __init__(self, settings):
+        self.cachedir = data_path(settings["HTTPCACHE_DIR"], createdir=True)
+        self.expiration_secs = settings.getint("HTTPCACHE_EXPIRATION_SECS")
+        self.expiration = {
+            prefix: int(secs)
+            for prefix, secs in settings.getdict("HTTPCACHE_SQLITE_EXPIRATION").items()
+        }
+        self.script_data_paths = tuple(
+            path
+            for path in settings.getlist("HTTPCACHE_SQLITE_SCRIPT_DATA_PATHS")
+            if path
+        )
+        self.max_bytes = settings.getint("HTTPCACHE_SQLITE_MAX_BYTES")
+        self.commit_every = settings.getint("HTTPCACHE_SQLITE_COMMIT_EVERY", 100)
+        # compress using zstd if installed, otherwise zlib (unless configured)
+        self.compression = settings.get("HTTPCACHE_SQLITE_COMPRESSION") or (
+            "zstd" if zstandard is not None else "zlib"
+        )
+        if self.compression == "zstd" and zstandard is None:
+            raise ImportError(
+                "zstd compression requires zstandard, install it using "
+                "`pip install -e .[zstd]`"
+            )
+        if zstandard is not None:
+            self._zstd_compressor = zstandard.ZstdCompressor(level=3)
+            self._zstd_decompressor = zstandard.ZstdDecompressor()
+        self.connection = None
+        self.stats = None
+        self.pending = 0
+        self.size = 0
+
+    def open_spider(self, spider):
+        path = Path(self.cachedir, f"""{spider.name}.sqlite3""")
+        logger.debug(
+            "Using sqlite cache storage in %(path)s",
+            {"path": path},
+            extra={"spider": spider},
+        )
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        self.stats = spider.crawler.stats
+
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "fingerprint BLOB PRIMARY KEY, url TEXT NOT NULL, status INTEGER, "
+            "headers BLOB, body BLOB, codec TEXT, script_data INTEGER, "
+            "size INTEGER, stored_at REAL, accessed_at REAL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+            "ON responses (accessed_at)"
+        )
+        self.size = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def close_spider(self, spider):
+        hits = self.stats.get_value("httpcache/hit", 0)
+        misses = self.stats.get_value("httpcache/miss", 0)
+        if hits + misses:
+            self.stats.set_value("httpcache/hit_rate", hits / (hits + misses))
+        self.stats.set_value("httpcache/sqlite/size", self.size)
+        self.connection.commit()
+        self.connection.close()
+
+    def _commit(self):
+        """Commit pending changes, once in a while."""
+        self.pending = self.pending + 1
+        if self.pending >= self.commit_every:
+            self.connection.commit()
+            self.pending = 0
+
+    def _compress(self, body=None):
+        """Compress a body, using configured codec."""
+        if self.compression == "zstd":
+            return self._zstd_compressor.compress(body)
+        if self.compression == "zlib":
+            return zlib.compress(body, 6)
+        return body
+
+    def _decompress(self, body=None, codec=None):
+        """Decompress a body, using its codec."""
+        if codec == "zstd":
+            return self._zstd_decompressor.decompress(body)
+        if codec == "zlib":
+            return zlib.decompress(body)
+        return body
+
+    def retrieve_response(self, spider, request):
+        """Return response if present in cache, or None otherwise."""
+        fingerprint = self._fingerprinter.fingerprint(request)
+        row = self.connection.execute(
+            "SELECT url, status, headers, body, codec, script_data, stored_at "
+            "FROM responses WHERE fingerprint = ?",
+            (fingerprint,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        url, status, headers, body, codec, script_data, stored_at = row
+        expiration_secs = get_expiration_secs(
+            request.url, self.expiration, self.expiration_secs
+        )
+        if 0 < expiration_secs < time.time() - stored_at:
+            self.stats.inc_value("httpcache/sqlite/expired", spider=spider)
+            return None
+
+        self.connection.execute(
+            "UPDATE responses SET accessed_at = ? WHERE fingerprint = ?",
+            (time.time(), fingerprint),
+        )
+        self._commit()
+
+        body = self._decompress(body, codec)
+        body = SCRIPT_DATA_PAGE % body if script_data else body
+        headers = Headers(headers_raw_to_dict(headers))
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, headers=headers, status=status, body=body)
+
+    def iter_pages(self, name=None, started_at=None, ended_at=None):
+        """Iterate ``(url, status, headers, body)`` of cached ``200`` pages.
+
+        Pages of a spider are ordered by url, and optionally restricted to
+        pages stored within ``[started_at, ended_at)`` timestamps.
+        """
+        path = Path(self.cachedir, f"""{name}.sqlite3""")
+        if not path.exists():
+            return
+
+        query = (
+            "SELECT url, status, headers, body, codec, script_data "
+            "FROM responses WHERE status = 200"
+        )
+        params = []
+        if started_at is not None:
+            query, params = f"""{query} AND stored_at >= ?""", [*params, started_at]
+        if ended_at is not None:
+            query, params = f"""{query} AND stored_at < ?""", [*params, ended_at]
+
+        connection = sqlite3.connect(f"""file:{path}?mode=ro""", uri=True)
+        try:
+            rows = connection.execute(f"""{query} ORDER BY url""", params)
+            for url, status, headers, body, codec, script_data in rows:
+                body = self._decompress(body, codec)
+                body = SCRIPT_DATA_PAGE % body if script_data else body
+                yield url, status, headers, body
+        finally:
+            connection.close()
+
+    def store_response(self, spider, request, response):
+        """Store the given response in the cache."""
+        # decode downloaded body (i.e zstd), so it is compressed once
+        headers = response.headers.copy()
+        body = decode_body(response.body, headers)
+        raw_size = len(body)
+
+        # keep page script data only, for pages parsed from it only
+        script_data = False
+        path = urlsplit(request.url).path
+        if response.status == 200 and path.startswith(self.script_data_paths):
+            offsets = locate_script_data(body=body)
+            if offsets is not None:
+                body = body[offsets[0] : offsets[1]]
+                headers.pop(b"Content-Length", None)
+                script_data = True
+
+        body = self._compress(body)
+        headers = headers_dict_to_raw(headers)
+        size = len(body) + len(headers)
+        fingerprint = self._fingerprinter.fingerprint(request)
+        previous = self.connection.execute(
+            "SELECT size FROM responses WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        now = time.time()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses (fingerprint, url, status, headers, "
+            "body, codec, script_data, size, stored_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                fingerprint,
+                response.url,
+                response.status,
+                headers,
+                body,
+                self.compression,
+                int(script_data),
+                size,
+                now,
+                now,
+            ),
+        )
+        self.size = self.size + size - (previous[0] if previous else 0)
+        self.stats.inc_value("httpcache/bytes_raw", raw_size, spider=spider)
+        self.stats.inc_value("httpcache/bytes_stored", len(body), spider=spider)
+        self.stats.inc_value(
+            "httpcache/bytes_saved", raw_size - len(body), spider=spider
+        )
+
+        if self.max_bytes and self.size > self.max_bytes:
+            self._evict(spider=spider)
+        self._commit()
+
+    def _evict(self, spider=None):
+        """Evict least recently used responses, down to 90% of max bytes."""
+        target = self.max_bytes * 0.9
+        rows = self.connection.execute(
+            "SELECT fingerprint, size FROM responses ORDER BY accessed_at"
+        )
+        evicted = []
+        for fingerprint, size in rows:
+            if self.size <= target:
+                break
+            evicted.append((fingerprint,))
+            self.size = self.size - size
+        self.connection.executemany(
+            "DELETE FROM responses WHERE fingerprint = ?", evicted
+        )
+        self.stats.inc_value("httpcache/sqlite/evicted", len(evicted), spider=spider)
+
+
+def iter_filesystem_pages(storage=None, name=None, started_at=None, ended_at=None):
+    """Iterate ``(url, status, headers, body)`` of pages cached on filesystem.
+
+    Pages of a spider are ordered by url, and optionally restricted to
+    pages stored within ``[started_at, ended_at)`` timestamps.
+    """
+    pages = []
+    for meta_path in Path(storage.cachedir, name).glob("*/*/pickled_meta"):
+        with storage._open(meta_path, "rb") as meta_file:
+            metadata = pickle.load(meta_file)
+        timestamp = metadata.get("timestamp", 0)
+        if metadata.get("status") != 200:
+            continue
+        if started_at is not None and timestamp < started_at:
+            continue
+        if ended_at is not None and timestamp >= ended_at:
+            continue
+        pages.append((metadata["response_url"], meta_path.parent))
+
+    for url, page_path in sorted(pages):
+        with storage._open(page_path / "response_headers", "rb") as headers_file:
+            headers = headers_file.read()
+        with storage._open(page_path / "response_body", "rb") as body_file:
+            body = body_file.read()
+        yield url, 200, headers, body
+
+
+def iter_cached_pages(settings=None, name=None, started_at=None, ended_at=None):
+    """Iterate ``(url, status, headers, body)`` of pages cached for a spider.
+
+    Pages are read from cache storage configured by ``HTTPCACHE_STORAGE``
+    setting, either ``SqliteCacheStorage`` or scrapy filesystem storage.
+    """
+    storage = load_object(settings["HTTPCACHE_STORAGE"])(settings)
+    if isinstance(storage, SqliteCacheStorage):
+        return storage.iter_pages(name, started_at=started_at, ended_at=ended_at)
+    if isinstance(storage, FilesystemCacheStorage):
+        return iter_filesystem_pages(
+            storage, name, started_at=started_at, ended_at=ended_at
+        )
+    raise ValueError(
+        f"""Unsupported cache storage to iterate pages: {type(storage).__name__}"""
+    )
@@ -0,0 +1,184 @@
+"""Incremental crawl state, used to scrape only what changed across runs.
+
+State of each page is keyed by its url and keep:
+    * page validators i.e ``ETag`` and ``Last-Modified`` response headers
+    * hash of page body, to skip identical pages without parsing them
+    * last scraped time
+
+State of each page content (i.e product) is keyed by its id (i.e
+``product_id``) and keep:
+    * hash of content, including its resolved references (i.e topics and
+      categories names), to emit changed items only
+    * url of page where content was last scraped, and last scraped time
+
+Enable incremental mode using ``INCREMENTAL_ENABLED`` setting.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+__all__ = ["IncrementalStateStore", "hash_body", "hash_content"]
+
+INCREMENTAL_STATE_FIELDS = ("etag", "last_modified", "body_hash", "scraped_at")
+
+
+def hash_body(body=None):
+    """Hash raw page body.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.incremental import hash_body
+    >>> hash_body(b"<html></html>") == hash_body(b"<html></html>")
+    True
+    """
+    return hashlib.blake2b(body or b"", digest_size=16).hexdigest()
+
+
+def hash_content(content=None):
+    """Hash page content (i.e decoded entity), independent of keys order.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.incremental import hash_content
+    >>> hash_content({"id": "1", "name": "A"}) == hash_content({"name": "A", "id": "1"})
+    True
+    """
+    data = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class IncrementalStateStore:
+    """On-disk store of pages and contents state persisted across runs.
+
+    Parameters
+    ----------
+    path (str):
+        Valid path of sqlite database file.
+
+    commit_every (int):
+        Valid number of updated pages and contents between commits.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.incremental import IncrementalStateStore
+    >>> store = IncrementalStateStore(path=":memory:")
+    >>> url = "https://www.producthunt.com/products/a"
+    >>> store.get(url) is None
+    True
+    >>> store.set(url, etag='"v1"')
+    >>> store.set_content("1", url=url, content_hash="h1")
+    >>> store.set_content("2", url=url, content_hash="h2")
+    >>> state = store.get(url)
+    >>> state["etag"], state["contents"]
+    ('"v1"', {'1': 'h1', '2': 'h2'})
+    >>> store.get_content("2")
+    'h2'
+    """
+
+    def __init__(self, path=None, commit_every=100):
+        self.path = str(path or ":memory:")
+        self.commit_every = commit_every
+        self.pending = 0
+
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS page_states "
+            "(url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+            "body_hash TEXT, scraped_at REAL) WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS content_states "
+            "(content_id TEXT PRIMARY KEY, url TEXT, content_hash TEXT, "
+            "scraped_at REAL) WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS content_states_url ON content_states (url)"
+        )
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(path=crawler.settings.get("INCREMENTAL_STATE_PATH"))
+
+    def get(self, url=None):
+        """Get state of a page, or ``None`` if page was never scraped.
+
+        State include hashes of contents last scraped from the page, as
+        ``contents`` i.e content id to content hash.
+        """
+        row = self.connection.execute(
+            f"""SELECT {", ".join(INCREMENTAL_STATE_FIELDS)} FROM page_states
+            WHERE url = ?""",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        state = dict(zip(INCREMENTAL_STATE_FIELDS, row))
+        rows = self.connection.execute(
+            "SELECT content_id, content_hash FROM content_states WHERE url = ?",
+            (url,),
+        )
+        state["contents"] = dict(rows)
+        return state
+
+    def set(self, url=None, **state):
+        """Set state of a page, merged with its previous state."""
+        previous = self.connection.execute(
+            f"""SELECT {", ".join(INCREMENTAL_STATE_FIELDS)} FROM page_states
+            WHERE url = ?""",
+            (url,),
+        ).fetchone()
+        previous = dict(zip(INCREMENTAL_STATE_FIELDS, previous or ()))
+        state = {**previous, **state, "scraped_at": time.time()}
+        values = [state.get(field) for field in INCREMENTAL_STATE_FIELDS]
+        self.connection.execute(
+            f"""INSERT OR REPLACE INTO page_states
+            (url, {", ".join(INCREMENTAL_STATE_FIELDS)})
+            VALUES (?, {", ".join("?" for _ in INCREMENTAL_STATE_FIELDS)})""",
+            [url, *values],
+        )
+        self._commit()
+
+    def get_content(self, content_id=None):
+        """Get hash of a content, or ``None`` if content was never scraped."""
+        row = self.connection.execute(
+            "SELECT content_hash FROM content_states WHERE content_id = ?",
+            (content_id,),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def set_content(self, content_id=None, url=None, content_hash=None):
+        """Set state of a content, scraped from a page."""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO content_states "
+            "(content_id, url, content_hash, scraped_at) VALUES (?, ?, ?, ?)",
+            (content_id, url, content_hash, time.time()),
+        )
+        self._commit()
+
+    def _commit(self):
+        """Commit updates, once every ``commit_every`` updates."""
+        self.pending = self.pending + 1
+        if self.pending >= self.commit_every:
+            self.connection.commit()
+            self.pending = 0
+
+    def touch(self, url=None):
+        """Update last scraped time of a page."""
+        self.connection.execute(
+            "UPDATE page_states SET scraped_at = ? WHERE url = ?", (time.time(), url)
+        )
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM page_states").fetchone()[0]
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
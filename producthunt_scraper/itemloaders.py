@@ -4,15 +4,71 @@
 # https://docs.scrapy.org/en/latest/topics/loaders.html
 
 
-from itemloaders.processors import Identity, MapCompose, TakeFirst
+import sys
+from dataclasses import MISSING, fields
+from functools import lru_cache
+from types import GeneratorType
+
+from itemloaders.processors import Compose, Identity, MapCompose, TakeFirst
+from itemloaders.utils import get_func_args
 from scrapy.loader import ItemLoader
 
-__all__ = ["ProductItemLoader", "ProductLaunchItemLoader"]
+from producthunt_scraper.items import ProductItem, ProductLaunchItem
+
+__all__ = [
+    "ProductItemLoader",
+    "ProductLaunchItemLoader",
+    "compile_item_loader",
+    "intern_tuple",
+    "load_product_item",
+    "load_product_launch_item",
+]
+
+# maximum number of interned tuples, most recently used are kept
+INTERNED_TUPLES_SIZE = 4096
+
+
+@lru_cache(maxsize=INTERNED_TUPLES_SIZE)
+def _intern_tuple(value=None):
+    """Get first cached tuple equal to a tuple, i.e bounded tuples interning."""
+    return value
+
+
+def intern_tuple(values=None):
+    """Convert values to an interned immutable tuple of interned strings.
+
+    Up to ``INTERNED_TUPLES_SIZE`` distinct tuples are kept, least recently
+    used are dropped, so interning does not grow with distinct values.
+
+    Parameters
+    ----------
+    values (list):
+        Valid list of values i.e topics, categories, platforms.
+
+    Returns
+    -------
+    value (tuple):
+        Valid tuple, shared by all values which are equal.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.itemloaders import intern_tuple
+    >>> intern_tuple(["Web", "iOS"]) is intern_tuple(["Web", "iOS"])
+    True
+    """
+    value = tuple(
+        sys.intern(item) if type(item) is str else item for item in values or ()
+    )
+    try:
+        return _intern_tuple(value)
+    except TypeError:  # i.e unhashable values
+        return value
 
 
 class ProductItemLoader(ItemLoader):
     """Product item loader."""
 
+    default_item_class = ProductItem
     default_input_processor = MapCompose(str.strip)
     default_output_processor = TakeFirst()
 
@@ -27,14 +83,15 @@ class ProductItemLoader(ItemLoader):
     product_tips_count_in = MapCompose(int)
     product_addons_count_in = MapCompose(int)
 
-    product_platforms_out = Identity()
-    product_categories_out = Identity()
-    product_topics_out = Identity()
+    product_platforms_out = Compose(intern_tuple)
+    product_categories_out = Compose(intern_tuple)
+    product_topics_out = Compose(intern_tuple)
 
 
 class ProductLaunchItemLoader(ItemLoader):
     """ProductLaunch item loader."""
 
+    default_item_class = ProductLaunchItem
     default_input_processor = MapCompose(str.strip)
     default_output_processor = TakeFirst()
 
@@ -43,4 +100,187 @@ class ProductLaunchItemLoader(ItemLoader):
     launch_daily_rank_in = MapCompose(int)
     launch_weekly_rank_in = MapCompose(int)
 
-    launch_topics_out = Identity()
+    launch_topics_out = Compose(intern_tuple)
+
+
+def _is_context_free(function=None):
+    """Check if a processor function does not receive loader context."""
+    try:
+        return "loader_context" not in get_func_args(function)
+    except (TypeError, ValueError):
+        return False
+
+
+def _compile_input_processor(processor=None, name=None, namespace=None):
+    """Compile field input processor into source lines, or ``None``."""
+    if not isinstance(processor, MapCompose) or processor.default_loader_context:
+        return None
+    if not all(_is_context_free(function) for function in processor.functions):
+        return None
+
+    # apply each function to each value and flatten results
+    lines = [
+        f"""    {name} = data.get({name!r})""",
+        f"""    {name} = () if {name} is None else {name}""",
+        f"""    {name} = {name} if isinstance({name}, ITERABLES) else ({name},)""",
+    ]
+    for index, function in enumerate(processor.functions):
+        function_name = f"""{name}_in_{index}"""
+        namespace[function_name] = function
+        lines += [
+            f"""    {name}_values = []""",
+            f"""    for value in {name}:""",
+            f"""        value = {function_name}(value)""",
+            """        if value is None:""",
+            """            continue""",
+            """        if isinstance(value, ITERABLES):""",
+            f"""            {name}_values.extend(value)""",
+            """        else:""",
+            f"""            {name}_values.append(value)""",
+            f"""    {name} = {name}_values""",
+        ]
+    return lines
+
+
+def _compile_output_processor(processor=None, name=None, namespace=None):
+    """Compile field output processor into source lines, or ``None``."""
+    # take first non-null/non-empty value
+    if isinstance(processor, TakeFirst):
+        return [
+            f"""    for value in {name}:""",
+            """        if value is not None and value != "":""",
+            f"""            {name} = value""",
+            """            break""",
+            """    else:""",
+            f"""        {name} = None""",
+        ]
+
+    # return collected values unchanged
+    if isinstance(processor, Identity):
+        return []
+
+    # compose functions, stop on ``None`` value if required
+    if isinstance(processor, Compose) and all(
+        _is_context_free(function) for function in processor.functions
+    ):
+        if set(processor.default_loader_context) - {"stop_on_none"}:
+            return None
+        lines = []
+        for index, function in enumerate(processor.functions):
+            function_name = f"""{name}_out_{index}"""
+            namespace[function_name] = function
+            guard = f"""{name} is not None and """ if processor.stop_on_none else ""
+            lines += [
+                f"""    if {guard}True:""",
+                f"""        {name} = {function_name}({name})""",
+            ]
+        return lines
+
+    return None
+
+
+def compile_item_loader(loader_class=None, item_class=None):
+    """Compile item loader processors into a single item load function.
+
+    The compiled function produce same item as loading a ``dict`` with an
+    item loader i.e ``loader.add_value(None, data)`` and ``loader.load_item()``,
+    without intermediate item adapters and loader values.
+
+    Only ``MapCompose`` input processors, and ``TakeFirst``, ``Identity`` and
+    ``Compose`` output processors whose functions do not receive loader
+    context are compiled. Otherwise, items are loaded using item loader.
+
+    Parameters
+    ----------
+    loader_class (class):
+        Valid item loader class.
+
+    item_class (class):
+        Valid dataclass item class. Default to ``loader_class.default_item_class``.
+
+    Returns
+    -------
+    load_item (callable):
+        Valid function which load an item from a ``dict``.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.itemloaders import (
+    ...     ProductItemLoader,
+    ...     compile_item_loader,
+    ... )
+    >>> load_product_item = compile_item_loader(ProductItemLoader)
+    >>> item = load_product_item({"product_name": " Chat ", "product_rating": "4"})
+    >>> item.product_name, item.product_rating, item.product_topics
+    ('Chat', 4.0, ())
+    """
+    item_class = item_class or loader_class.default_item_class
+    item_fields = fields(item_class)
+    item_field_names = frozenset(item_field.name for item_field in item_fields)
+    item_fields = [item_field for item_field in item_fields if item_field.init]
+    loader = loader_class(item=item_class())
+
+    def load_item_with_loader(data=None):
+        """Load an item from a ``dict`` using item loader."""
+        item_loader = loader_class(item=item_class())
+        item_loader.add_value(None, data)
+        return item_loader.load_item()
+
+    # compile processors of each item field
+    namespace = {"ITERABLES": (list, tuple, GeneratorType), "MISSING": MISSING}
+    lines = []
+    for item_field in item_fields:
+        name = item_field.name
+        input_lines = _compile_input_processor(
+            processor=loader.get_input_processor(name),
+            name=name,
+            namespace=namespace,
+        )
+        output_lines = _compile_output_processor(
+            processor=loader.get_output_processor(name),
+            name=name,
+            namespace=namespace,
+        )
+        if input_lines is None or output_lines is None:
+            return load_item_with_loader
+        lines += input_lines + output_lines
+
+        # keep item field default, if output value is None
+        default_name = f"""{name}_default"""
+        namespace[default_name] = item_field.default
+        if item_field.default is MISSING:
+            namespace[default_name] = item_field.default_factory
+            default_name = f"""{default_name}()"""
+        lines.append(f"""    {name} = {default_name} if {name} is None else {name}""")
+
+    # create item in a single call
+    arguments = ", ".join(f"""{field.name}={field.name}""" for field in item_fields)
+    source = "\n".join(
+        [
+            "def load_item(data):",
+            *lines,
+            f"""    return item_class({arguments})""",
+        ]
+    )
+    namespace["item_class"] = item_class
+    exec(source, namespace)
+    load_compiled_item = namespace["load_item"]
+
+    def load_item(data=None):
+        """Load an item from a ``dict`` using compiled item loader."""
+        data = data or {}
+
+        # ensure item loader errors (i.e unknown fields, invalid values)
+        if not item_field_names.issuperset(data):
+            return load_item_with_loader(data)
+        try:
+            return load_compiled_item(data)
+        except Exception:
+            return load_item_with_loader(data)
+
+    load_item.source = source
+    return load_item
+
+
+load_product_item = compile_item_loader(ProductItemLoader)
+load_product_launch_item = compile_item_loader(ProductLaunchItemLoader)
@@ -4,12 +4,49 @@
 # https://docs.scrapy.org/en/latest/topics/items.html
 
 
-from dataclasses import dataclass, field
-from typing import List, Optional
+from dataclasses import dataclass, field, fields
+from typing import Optional, Tuple
 
-__all__ = ["ProductItem", "ProductLaunchItem"]
+__all__ = ["ProductItem", "ProductLaunchItem", "slotted"]
 
 
+def slotted(cls=None):
+    """Recreate a dataclass with ``__slots__`` for its fields.
+
+    Instances of slotted dataclass do not carry a ``__dict__``, which reduce
+    memory used by each instance. It is equivalent to ``dataclass(slots=True)``
+    available on python 3.10+.
+
+    Parameters
+    ----------
+    cls (class):
+        Valid dataclass.
+
+    Returns
+    -------
+    cls (class):
+        Valid dataclass with ``__slots__``.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.items import ProductItem
+    >>> hasattr(ProductItem(), "__dict__")
+    False
+    """
+    field_names = tuple(item_field.name for item_field in fields(cls))
+
+    # drop fields defaults and instance dict, as they conflict with slots
+    cls_dict = dict(cls.__dict__)
+    for name in (*field_names, "__dict__", "__weakref__"):
+        cls_dict.pop(name, None)
+    cls_dict["__slots__"] = field_names
+
+    slotted_cls = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+    slotted_cls.__qualname__ = cls.__qualname__
+    return slotted_cls
+
+
+@slotted
 @dataclass
 class ProductItem:
     """Product item."""
@@ -31,11 +68,12 @@ class ProductItem:
     product_alternatives_count: Optional[int] = field(default=None)
     product_tips_count: Optional[int] = field(default=None)
     product_addons_count: Optional[int] = field(default=None)
-    product_platforms: Optional[List[str]] = field(default=None)
-    product_categories: Optional[List[str]] = field(default=None)
-    product_topics: Optional[List[str]] = field(default=None)
+    product_platforms: Optional[Tuple[str, ...]] = field(default=None)
+    product_categories: Optional[Tuple[str, ...]] = field(default=None)
+    product_topics: Optional[Tuple[str, ...]] = field(default=None)
 
 
+@slotted
 @dataclass
 class ProductLaunchItem:
     """ProductLaunch item."""
@@ -53,7 +91,7 @@ class ProductLaunchItem:
     launch_created_at: Optional[str] = field(default=None)
     launch_featured_at: Optional[str] = field(default=None)
     launch_updated_at: Optional[str] = field(default=None)
-    launch_topics: Optional[List[str]] = field(default=None)
+    launch_topics: Optional[Tuple[str, ...]] = field(default=None)
     product_id: Optional[str] = field(default=None)
     product_name: Optional[str] = field(default=None)
     product_url: Optional[str] = field(default=None)
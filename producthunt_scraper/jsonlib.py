@@ -0,0 +1,76 @@
+"""Decode and encode JSON using the fastest available backend.
+
+Backends are tried in order of preference:
+    * ``orjson`` (if installed)
+    * ``simdjson`` (if installed)
+    * ``json`` (standard library)
+
+Set ``JSON_BACKEND`` environment variable to force a specific backend.
+Backends without an encoder (i.e ``simdjson``) encode using ``json``.
+"""
+
+import json
+from importlib import import_module
+
+from producthunt_scraper.env import env
+
+__all__ = ["JSON_BACKEND", "dumps", "loads"]
+
+
+def _import_backend(name=None):
+    """Import and return a JSON backend module by name, if installed."""
+    try:
+        return import_module(name)
+    except ImportError:
+        return None
+
+
+_backend = json
+for _backend_name in [env("JSON_BACKEND", None, str), "orjson", "simdjson"]:
+    _backend_module = _import_backend(_backend_name) if _backend_name else None
+    if _backend_module is not None:
+        _backend = _backend_module
+        break
+
+JSON_BACKEND = _backend.__name__
+
+
+def loads(data=None):
+    """Decode a JSON document.
+
+    Parameters
+    ----------
+    data (str|bytes):
+        Valid JSON document. ``bytes`` must be utf-8 encoded.
+
+    Returns
+    -------
+    value (*):
+        Valid decoded JSON value.
+    """
+    return _backend.loads(data)
+
+
+def dumps(value=None):
+    """Encode a value as a compact JSON document.
+
+    Parameters
+    ----------
+    value (*):
+        Valid JSON serializable value.
+
+    Returns
+    -------
+    data (bytes):
+        Valid utf-8 encoded JSON document.
+
+    Examples
+    --------
+    >>> from producthunt_scraper import jsonlib
+    >>> jsonlib.dumps({"name": "Café", "topics": ("AI",)})
+    b'{"name":"Caf\xc3\xa9","topics":["AI"]}'
+    """
+    if JSON_BACKEND == "orjson":
+        return _backend.dumps(value)
+    data = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return data.encode("utf-8")
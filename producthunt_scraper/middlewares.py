@@ -4,62 +4,131 @@
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
 # useful for handling different item types with a single interface
+import random
 from importlib import import_module
 
-from fake_useragent import FakeUserAgent
 from scrapy import signals
 from scrapy.downloadermiddlewares.retry import RetryMiddleware
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.utils.httpobj import urlparse_cached
 from scrapy.utils.response import response_status_message
+from twisted.internet.task import deferLater
 
-__all__ = ["RandomUserAgentMiddleware", "RetryRandomUserAgentMiddleware"]
+from producthunt_scraper.graphql import (
+    GRAPHQL_QUERIES,
+    build_graphql_url,
+    is_persisted_query_not_found,
+    parse_graphql_url,
+)
+from producthunt_scraper.incremental import IncrementalStateStore, hash_body
+from producthunt_scraper.throttle import get_retry_after
+from producthunt_scraper.useragents import UserAgentPool, get_user_agent_pool
+
+__all__ = [
+    "GraphQLPersistedQueryMiddleware",
+    "IncrementalMiddleware",
+    "RandomUserAgentMiddleware",
+    "RetryRandomUserAgentMiddleware",
+]
+
+
+def get_request_slot(request=None):
+    """Get download slot of a request, or its host before it is assigned."""
+    return request.meta.get("download_slot") or urlparse_cached(request).hostname
 
 
 class RandomUserAgentMiddleware:
-    """Set random ``User-Agent`` header per spider or use a default value from settings."""
+    """Set random ``User-Agent`` header per spider or use a default value from settings.
+
+    User agents are served from a pool shared within a process (see
+    ``producthunt_scraper.useragents``).
+    """
 
-    def __init__(self, user_agent=None):
+    def __init__(self, user_agent=None, user_agents=None):
         self.user_agent_fallback = (
             user_agent
             or f"""Scrapy/{import_module("scrapy").__version__} (+https://scrapy.org)"""
         )
-        self.user_agent_provider = FakeUserAgent(fallback=self.user_agent_fallback)
+        self.user_agents = user_agents or UserAgentPool(
+            fallback=self.user_agent_fallback
+        )
 
     @classmethod
     def from_crawler(cls, crawler):
-        o = cls(user_agent=crawler.settings.get("USER_AGENT"))
+        o = cls(
+            user_agent=crawler.settings.get("USER_AGENT"),
+            user_agents=get_user_agent_pool(settings=crawler.settings),
+        )
         crawler.signals.connect(o.spider_opened, signal=signals.spider_opened)
         return o
 
     def spider_opened(self, spider):
-        self.user_agent = getattr(spider, "user_agent", self.user_agent_provider.random)
+        self.user_agent = getattr(spider, "user_agent", None) or self.user_agents.get()
 
     def process_request(self, request, spider):
-        request.headers.setdefault("User-Agent", self.user_agent_provider.random)
+        if b"User-Agent" not in request.headers:
+            user_agent = self.user_agents.get(slot=get_request_slot(request))
+            request.headers[b"User-Agent"] = user_agent
 
 
 class RetryRandomUserAgentMiddleware(RetryMiddleware):
-    """Set random ``User-Agent`` header on request retry."""
+    """Set random ``User-Agent`` header on request retry, from shared pool.
+
+    Retries are delayed with jittered exponential backoff (i.e a random
+    delay up to ``RETRY_BACKOFF_BASE * 2 ** retry_times`` seconds, capped by
+    ``RETRY_BACKOFF_MAX``), and at least by ``Retry-After`` header of
+    response. Delayed retries hold their place in ``CONCURRENT_REQUESTS``,
+    so rate limited crawls slow down instead of queueing more requests.
+    """
 
     def __init__(self, crawler):
         super(RetryRandomUserAgentMiddleware, self).__init__(crawler.settings)
-        self.user_agent_fallback = (
-            crawler.settings.get("USER_AGENT")
-            or f"""Scrapy/{import_module("scrapy").__version__} (+https://scrapy.org)"""
-        )
-        self.user_agent_provider = FakeUserAgent(fallback=self.user_agent_fallback)
+        self.user_agents = get_user_agent_pool(settings=crawler.settings)
+        self.backoff_base = crawler.settings.getfloat("RETRY_BACKOFF_BASE", 0.0)
+        self.backoff_max = crawler.settings.getfloat("RETRY_BACKOFF_MAX", 60.0)
+        self.stats = crawler.stats
+        self.random = random.Random()
 
     @classmethod
     def from_crawler(cls, crawler):
         return cls(crawler)
 
+    def get_backoff_delay(self, request=None, retry_after=None):
+        """Get seconds to wait before sending a retry request."""
+        retry_times = request.meta.get("retry_times", 1)
+        backoff = min(self.backoff_max, self.backoff_base * 2 ** (retry_times - 1))
+        delay = self.random.uniform(0, backoff)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def _backoff(self, request=None, retry_after=None):
+        """Delay a retry request, if any, with jittered backoff."""
+        if request is None:
+            return None
+        delay = self.get_backoff_delay(request=request, retry_after=retry_after)
+        if delay <= 0:
+            return request
+
+        from twisted.internet import reactor
+
+        self.stats.inc_value("retry/backoff/count")
+        self.stats.inc_value("retry/backoff/time", delay)
+        return deferLater(reactor, delay, lambda: request)
+
     def process_response(self, request, response, spider):
         if request.meta.get("dont_retry", False):
             return response
 
         if response.status in self.retry_http_codes:
             reason = response_status_message(response.status)
-            request.headers["User-Agent"] = self.user_agent_provider.random
-            return self._retry(request, reason, spider) or response
+            request.headers["User-Agent"] = self.user_agents.rotate(
+                slot=get_request_slot(request)
+            )
+            retry_request = self._retry(request, reason, spider)
+            if retry_request is None:
+                return response
+            return self._backoff(retry_request, get_retry_after(response))
 
         return response
 
@@ -67,5 +136,121 @@ class RetryRandomUserAgentMiddleware(RetryMiddleware):
         if isinstance(exception, self.exceptions_to_retry) and not request.meta.get(
             "dont_retry", False
         ):
-            request.headers["User-Agent"] = self.user_agent_provider.random
-            return self._retry(request, exception, spider)
+            request.headers["User-Agent"] = self.user_agents.rotate(
+                slot=get_request_slot(request)
+            )
+            return self._backoff(self._retry(request, exception, spider))
+
+
+class IncrementalMiddleware:
+    """Send conditional requests and skip pages not changed since last run.
+
+    Only requests with ``incremental`` meta key are handled. Their previous
+    state is set on ``incremental_state`` meta key, and their validators and
+    body hash on ``incremental_validators`` meta key, so spiders can record
+    new state once they have checked page content. Pages not modified (i.e
+    ``304``) or with identical body are ignored before being parsed.
+    """
+
+    def __init__(self, store=None, stats=None):
+        self.store = store
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("INCREMENTAL_ENABLED"):
+            raise NotConfigured
+        o = cls(store=IncrementalStateStore.from_crawler(crawler), stats=crawler.stats)
+        crawler.signals.connect(o.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def spider_opened(self, spider):
+        spider.incremental_store = self.store
+
+    def spider_closed(self, spider):
+        self.store.close()
+
+    def process_request(self, request, spider):
+        if not request.meta.get("incremental") or "incremental_state" in request.meta:
+            return
+
+        # set page validators from previous state
+        state = self.store.get(request.url)
+        request.meta["incremental_state"] = state
+        if state is not None and state.get("etag"):
+            request.headers.setdefault("If-None-Match", state["etag"])
+        if state is not None and state.get("last_modified"):
+            request.headers.setdefault("If-Modified-Since", state["last_modified"])
+
+    def process_response(self, request, response, spider):
+        if not request.meta.get("incremental"):
+            return response
+
+        # ignore page not modified since last run
+        if response.status == 304:
+            self.store.touch(request.url)
+            self.stats.inc_value("incremental/skipped", spider=spider)
+            self.stats.inc_value("incremental/skipped/not_modified", spider=spider)
+            raise IgnoreRequest(f"""Page not modified: {request.url}""")
+
+        if response.status != 200:
+            return response
+
+        # ignore page identical to last run, without parsing it
+        self.stats.inc_value("incremental/fetched", spider=spider)
+        state = request.meta.get("incremental_state") or {}
+        body_hash = hash_body(response.body)
+        if body_hash == state.get("body_hash"):
+            self.store.touch(request.url)
+            self.stats.inc_value("incremental/skipped", spider=spider)
+            self.stats.inc_value("incremental/skipped/identical", spider=spider)
+            raise IgnoreRequest(f"""Page identical: {request.url}""")
+
+        # collect page validators, for spider to record once parsed
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        request.meta["incremental_validators"] = {
+            "etag": etag.decode("latin-1") if etag else None,
+            "last_modified": last_modified.decode("latin-1") if last_modified else None,
+            "body_hash": body_hash,
+        }
+        return response
+
+
+class GraphQLPersistedQueryMiddleware:
+    """Send again persisted queries unknown to the server, with their query text.
+
+    Graphql requests send query hash only, and servers answer
+    ``PersistedQueryNotFound`` until a query is registered. Such requests are
+    sent once again with their query text (which registers it), so next
+    requests of a same operation are sent as hash only.
+    """
+
+    def __init__(self, stats=None):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(stats=crawler.stats)
+
+    def process_response(self, request, response, spider):
+        # send query text once, only if server does not know its hash
+        if request.meta.get("graphql_query"):
+            return response
+        if not is_persisted_query_not_found(response=response):
+            return response
+
+        operation, variables = parse_graphql_url(url=request.url)
+        if operation not in GRAPHQL_QUERIES:
+            return response
+
+        self.stats.inc_value("graphql/persisted_query_not_found", spider=spider)
+        url = build_graphql_url(
+            graphql_url=request.url.partition("?")[0],
+            operation=operation,
+            variables=variables,
+            include_query=True,
+        )
+        meta = {**request.meta, "graphql_query": True}
+        return request.replace(url=url, meta=meta, dont_filter=True)
@@ -0,0 +1,212 @@
+"""Parse item pages within a pool of threads or processes.
+
+Item pages (i.e product and post pages) are parsed by spider callbacks
+within a pool of workers, each with its own spider, while the reactor keeps
+downloading pages. Parsed items, incremental states and stats are sent back
+and applied within the reactor thread.
+
+Don't forget to add the extension to the EXTENSIONS setting
+See: https://docs.scrapy.org/en/latest/topics/extensions.html
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.settings import Settings
+from scrapy.statscollectors import MemoryStatsCollector
+from twisted.internet import defer
+
+from producthunt_scraper.reparse import create_spider, parse_page
+
+__all__ = ["ParsePool"]
+
+logger = logging.getLogger(__name__)
+
+PARSE_POOL_KINDS = ("process", "thread")
+
+# request meta keys used to parse pages within workers
+PARSE_POOL_META_KEYS = ("incremental", "incremental_state", "incremental_validators")
+
+# spider of a worker thread or process
+_local = threading.local()
+
+
+class RecordingStore:
+    """Record incremental states set within a worker, to set them back.
+
+    Contents last scraped from other pages are not looked up, so they are
+    considered new within workers.
+    """
+
+    def __init__(self):
+        self.states = []
+
+    def set(self, url=None, **state):
+        self.states.append(("set", (url,), state))
+
+    def set_content(self, content_id=None, **state):
+        self.states.append(("set_content", (content_id,), state))
+
+
+def init_worker(name=None, settings=None):
+    """Create spider of a worker thread or process."""
+    spider = create_spider(name=name, settings=settings)
+    spider.crawler.stats = MemoryStatsCollector(spider.crawler)
+    _local.spider = spider
+
+
+def parse_worker_page(page=None, request_url=None, meta=None, cb_kwargs=None):
+    """Parse a page into items within a worker.
+
+    Returns
+    -------
+    result (tuple):
+        Valid ``(items, states, stats)`` of parsed items, incremental states
+        to record and stats to increase.
+    """
+    spider = _local.spider
+    spider.crawler.stats.clear_stats()
+    spider.incremental_store = RecordingStore() if meta.get("incremental") else None
+    items = parse_page(
+        spider=spider,
+        page=page,
+        request_url=request_url,
+        meta=meta,
+        **(cb_kwargs or {}),
+    )
+    states = spider.incremental_store.states if spider.incremental_store else []
+    return items, states, spider.crawler.stats.get_stats()
+
+
+class ParsePool:
+    """Parse item pages of spiders within a pool of threads or processes.
+
+    Spiders parse item pages through ``parse_pool`` attribute, set when
+    spider is opened, and are sent back a deferred list of items. Process
+    workers are started with ``spawn``, so they don't inherit reactor threads.
+
+    Parameters
+    ----------
+    crawler (Crawler):
+        Valid scrapy crawler.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool("PARSE_POOL_ENABLED"):
+            raise NotConfigured
+
+        self.kind = settings.get("PARSE_POOL_KIND", "process")
+        if self.kind not in PARSE_POOL_KINDS:
+            raise NotConfigured(f"""Unknown parse pool kind: {self.kind}""")
+
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.size = settings.getint("PARSE_POOL_SIZE", 0) or os.cpu_count() or 1
+        self.executor = None
+
+        crawler.signals.connect(self.spider_opened, signals.spider_opened)
+        crawler.signals.connect(self.spider_closed, signals.spider_closed)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def spider_opened(self, spider):
+        # parse pages within spiders of same settings, without parse pool
+        settings = Settings(self.crawler.settings.copy_to_dict())
+        settings.set("PARSE_POOL_ENABLED", False)
+        initargs = (spider.name, settings)
+        if self.kind == "thread":
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.size, initializer=init_worker, initargs=initargs
+            )
+        else:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(spider.name, settings.copy_to_dict()),
+            )
+        spider.parse_pool = self
+        logger.info("Parsing item pages within %d %s workers", self.size, self.kind)
+
+    def spider_closed(self, spider):
+        spider.parse_pool = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def parse(self, spider=None, response=None, **kwargs):
+        """Parse an item page within pool.
+
+        Parameters
+        ----------
+        spider (Spider):
+            Valid spider parsing the page.
+
+        response (object):
+            Valid scrapy response of an item page.
+
+        kwargs (dict):
+            Valid callback keyword arguments.
+
+        Returns
+        -------
+        items (Deferred):
+            Valid deferred list of parsed items.
+        """
+        from twisted.internet import reactor
+
+        # send incremental state of page, if spider records it
+        meta = {}
+        if getattr(spider, "incremental_store", None) is not None:
+            meta = {
+                key: response.meta[key]
+                for key in PARSE_POOL_META_KEYS
+                if key in response.meta
+            }
+
+        page = (
+            response.url,
+            response.status,
+            response.headers.to_string(),
+            response.body,
+        )
+        request_url = response.request.url if response.request else response.url
+        future = self.executor.submit(
+            parse_worker_page,
+            page=page,
+            request_url=request_url,
+            meta=meta,
+            cb_kwargs=kwargs,
+        )
+        self.stats.inc_value("parse_pool/pages", spider=spider)
+
+        # fire deferred within reactor thread, once page is parsed
+        dfd = defer.Deferred()
+
+        def done(future):
+            exception = future.exception()
+            if exception is not None:
+                reactor.callFromThread(dfd.errback, exception)
+            else:
+                reactor.callFromThread(dfd.callback, future.result())
+
+        future.add_done_callback(done)
+        return dfd.addCallback(self._apply, spider=spider)
+
+    def _apply(self, result=None, spider=None):
+        """Record incremental states and stats of a parsed page."""
+        items, states, stats = result
+        for method, args, state in states:
+            getattr(spider.incremental_store, method)(*args, **state)
+        for key, value in stats.items():
+            if isinstance(value, (int, float)):
+                self.stats.inc_value(key, value, spider=spider)
+        return items
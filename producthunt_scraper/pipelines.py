@@ -10,42 +10,88 @@
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
 
+import time
+
 from itemadapter import ItemAdapter
 from scrapy.exceptions import DropItem
+from scrapy.utils.misc import load_object
 
+from producthunt_scraper.dedupe import MemoryItemIdStore
 from producthunt_scraper.items import ProductItem, ProductLaunchItem
 
 __all__ = [
+    "DuplicateItemFilterPipeline",
+    "FusedItemPipeline",
     "NormalizeItemPipeline",
     "ValidItemFilterPipeline",
-    "DuplicateItemFilterPipeline",
 ]
 
+# item type to fields which are set to ``None`` when empty
+NORMALIZE_ITEM_FIELDS = {
+    ProductItem: ("product_categories", "product_topics"),
+    ProductLaunchItem: ("launch_topics",),
+}
+
+# item type to fields which are required
+REQUIRED_ITEM_FIELDS = {
+    ProductItem: ("product_url",),
+    ProductLaunchItem: ("product_url",),
+}
+DEFAULT_REQUIRED_ITEM_FIELDS = ("product_url",)
+
+# item type to field which identify an item
+ID_ITEM_FIELDS = {
+    ProductItem: "product_id",
+    ProductLaunchItem: "launch_id",
+}
+DEFAULT_ID_ITEM_FIELD = "launch_id"
+
+
+def _get_item_value(item=None, field=None):
+    """Get item field value, without an adapter for known item types."""
+    if type(item) in ID_ITEM_FIELDS:
+        return getattr(item, field, None)
+    return ItemAdapter(item).get(field)
+
+
+def normalize_item(item=None):
+    """Restructure and reformat item."""
+    item_fields = NORMALIZE_ITEM_FIELDS.get(type(item), ())
+    for field in item_fields:
+        if not getattr(item, field):
+            setattr(item, field, None)
+    return item
+
+
+def validate_item(item=None):
+    """Verify and drop item which does not have required fields."""
+    item_fields = REQUIRED_ITEM_FIELDS.get(type(item), DEFAULT_REQUIRED_ITEM_FIELDS)
+    for field in item_fields:
+        if not _get_item_value(item=item, field=field):
+            raise DropItem(f"""Invalid item found: {item!r}""")
+    return item
 
-class NormalizeItemPipeline:
-    """Normalize item pipeline."""
 
-    def process_item(self, item, spider):
-        """Restructure and reformat item."""
-        item_adapter = ItemAdapter(item)
+def get_item_id(item=None):
+    """Get item type qualified item id i.e ``ProductItem/<product_id>``."""
+    item_field = ID_ITEM_FIELDS.get(type(item), DEFAULT_ID_ITEM_FIELD)
+    item_id = _get_item_value(item=item, field=item_field)
+    return f"""{type(item).__name__}/{item_id}"""
 
-        is_product_launch_item = isinstance(item, ProductLaunchItem)
-        is_product_item = isinstance(item, ProductItem)
-        if is_product_item:
-            product_categories = item_adapter.get("product_categories")
-            if not product_categories:
-                item_adapter["product_categories"] = None
 
-            product_topics = item_adapter.get("product_topics")
-            if not product_topics:
-                item_adapter["product_topics"] = None
+def load_item_id_store(crawler=None):
+    """Load item id store configured by ``ITEM_DEDUPE_STORE`` setting."""
+    store_class = crawler.settings.get("ITEM_DEDUPE_STORE") or MemoryItemIdStore
+    store_class = load_object(store_class)
+    return store_class.from_crawler(crawler)
 
-        if is_product_launch_item:
-            launch_topics = item_adapter.get("launch_topics")
-            if not launch_topics:
-                item_adapter["launch_topics"] = None
 
-        return item
+class NormalizeItemPipeline:
+    """Normalize item pipeline."""
+
+    def process_item(self, item, spider):
+        """Restructure and reformat item."""
+        return normalize_item(item=item)
 
 
 class ValidItemFilterPipeline:
@@ -53,36 +99,81 @@ class ValidItemFilterPipeline:
 
     def process_item(self, item, spider):
         """Verify and drop item which does not have required fields."""
-        item_adapter = ItemAdapter(item)
-        product_url = item_adapter.get("product_url")
-        if product_url:
-            return item
-        else:
-            raise DropItem(f"""Invalid item found: {item!r}""")
+        return validate_item(item=item)
 
 
 class DuplicateItemFilterPipeline:
-    """Duplicate item filter pipeline."""
+    """Duplicate item filter pipeline.
 
-    def __init__(self):
-        self.ids_seen = set()
+    Seen item ids are kept in a store configured by ``ITEM_DEDUPE_STORE``
+    setting. Default to an in-memory set of item ids.
+    """
 
-    def process_item(self, item, spider):
-        """Check and drop duplicates item."""
-        item_adapter = ItemAdapter(item)
+    def __init__(self, ids_seen=None):
+        self.ids_seen = ids_seen if ids_seen is not None else MemoryItemIdStore()
 
-        is_product_item = isinstance(item, ProductItem)
-        item_type = type(item).__name__
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(ids_seen=load_item_id_store(crawler=crawler))
 
-        item_id = (
-            item_adapter.get("product_id")
-            if is_product_item
-            else item_adapter.get("launch_id")
-        )
-        item_id = f"""{item_type}/{item_id}"""
+    def close_spider(self, spider):
+        self.ids_seen.close()
+
+    def dedupe_item(self, item=None):
+        """Check and drop duplicates item."""
+        item_id = get_item_id(item=item)
 
-        if item_id and item_id in self.ids_seen:
+        if item_id and not self.ids_seen.add(item_id):
             raise DropItem(f"Duplicate item found: {item!r}")
         else:
-            self.ids_seen.add(item_id)
             return item
+
+    def process_item(self, item, spider):
+        """Check and drop duplicates item."""
+        return self.dedupe_item(item=item)
+
+
+class FusedItemPipeline(DuplicateItemFilterPipeline):
+    """Normalize, validate and drop duplicate item in a single pipeline.
+
+    Stages run in order of ``FUSED_ITEM_PIPELINE_STAGES`` setting, and time
+    spent on each stage is collected in stats as ``pipeline/<stage>/time``.
+    """
+
+    def __init__(self, stages=None, stats=None, ids_seen=None):
+        super(FusedItemPipeline, self).__init__(ids_seen=ids_seen)
+        handlers = {
+            "normalize": normalize_item,
+            "validate": validate_item,
+            "dedupe": self.dedupe_item,
+        }
+        stages = stages or list(handlers)
+        self.stages = [(stage, handlers[stage]) for stage in stages]
+        self.stats = stats
+        self.stage_times = dict.fromkeys(stages, 0.0)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        stages = crawler.settings.getlist("FUSED_ITEM_PIPELINE_STAGES")
+        return cls(
+            stages=stages,
+            stats=crawler.stats,
+            ids_seen=load_item_id_store(crawler=crawler),
+        )
+
+    def close_spider(self, spider):
+        super(FusedItemPipeline, self).close_spider(spider)
+        if self.stats is not None:
+            for stage, stage_time in self.stage_times.items():
+                self.stats.set_value(f"""pipeline/{stage}/time""", stage_time)
+
+    def process_item(self, item, spider):
+        """Normalize, validate and check and drop duplicates item."""
+        stage_times = self.stage_times
+        for stage, handler in self.stages:
+            started_at = time.perf_counter()
+            try:
+                item = handler(item)
+            finally:
+                stage_times[stage] += time.perf_counter() - started_at
+        return item
@@ -0,0 +1,545 @@
+"""Crawl profiling, using timing and size histograms of hot paths.
+
+Record histograms of:
+    * download latency, downloaded and decoded bytes of responses
+    * spider callbacks time and items per page
+    * spider hot paths time i.e ``parse_script_data`` and item loading
+    * script data (i.e JSON payload) size of pages
+    * item pipelines and feed export time
+
+Histograms are collected in stats, logged and written to a JSON or
+Prometheus text file periodically. Optionally, cProfile or pyinstrument
+snapshots of the reactor thread are taken on an interval or on ``SIGUSR2``.
+
+Enable profiling using ``PROFILING_ENABLED`` setting. When disabled,
+nothing is instrumented.
+"""
+
+import json
+import logging
+import math
+import signal
+import sys
+import time
+from collections.abc import Iterator
+from functools import wraps
+from pathlib import Path
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.extensions.feedexport import FeedExporter
+from scrapy.http import Request
+from twisted.internet import defer, task
+
+__all__ = ["Histogram", "Profiling", "ProfilingSpiderMiddleware"]
+
+logger = logging.getLogger(__name__)
+
+# units of histograms, and their scale of recorded integer values
+HISTOGRAM_UNITS = {"seconds": 1000000, "bytes": 1, "items": 1}
+
+
+class Histogram:
+    """Log-linear histogram of non-negative values, HDR-style.
+
+    Values are scaled to integers and counted within buckets of their
+    ``precision`` most significant bits, so percentiles are within ~1% of
+    recorded values (with 8 bits), in constant memory per order of magnitude.
+
+    Parameters
+    ----------
+    unit (str):
+        Valid unit of values i.e ``seconds`` (recorded as microseconds),
+        ``bytes`` or ``items``.
+
+    precision (int):
+        Valid number of significant bits of buckets.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.profiling import Histogram
+    >>> histogram = Histogram(unit="seconds")
+    >>> for value in range(1, 101):
+    ...     histogram.record(value / 1000)
+    >>> histogram.count, histogram.max
+    (100, 0.1)
+    >>> round(histogram.percentile(50), 4), round(histogram.percentile(99), 4)
+    (0.05, 0.0991)
+    """
+
+    def __init__(self, unit="seconds", precision=8):
+        self.unit = unit
+        self.scale = HISTOGRAM_UNITS.get(unit, 1)
+        self.precision = precision
+        self.counts = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value=0.0):
+        """Record a value."""
+        scaled = max(0, int(value * self.scale))
+        shift = max(0, scaled.bit_length() - self.precision)
+        key = (shift << 32) | (scaled >> shift)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.count = self.count + 1
+        self.sum = self.sum + value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def _value(self, key=0):
+        """Get middle value of a bucket."""
+        shift, mantissa = key >> 32, key & 0xFFFFFFFF
+        return ((mantissa << shift) + ((1 << shift) >> 1)) / self.scale
+
+    def percentile(self, q=50):
+        """Compute nearest-rank ``q`` percentile of recorded values."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for key in sorted(self.counts):
+            seen = seen + self.counts[key]
+            if seen >= rank:
+                return min(self.max, max(self.min, self._value(key)))
+        return self.max
+
+    def to_dict(self):
+        """Summarize histogram as count, sum, min, max and percentiles."""
+        return {
+            "unit": self.unit,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+def format_value(value=0.0, unit="seconds"):
+    """Format a value of a unit for logs.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.profiling import format_value
+    >>> format_value(0.0123), format_value(2048, "bytes"), format_value(3, "items")
+    ('12.3ms', '2.0KiB', '3')
+    """
+    if unit == "seconds":
+        return f"""{value * 1000:.3g}ms"""
+    if unit == "bytes":
+        return f"""{value / 1024:.1f}KiB"""
+    return f"""{value:g}"""
+
+
+class Profiling:
+    """Record timing and size histograms of a crawl hot paths.
+
+    Spider hot paths (i.e ``PROFILING_HOT_PATHS``) are spider methods, or
+    functions of spider module (i.e ``load_product_item``), timed by
+    wrapping them once spider is opened. Item pipelines and feed export
+    are timed by wrapping their ``process_item`` and ``item_scraped``.
+    Time of item pipelines returning deferreds include time waiting for
+    them.
+
+    Histograms are collected in stats as ``profiling/<name>/<p50|p99|...>``.
+
+    Parameters
+    ----------
+    crawler (Crawler):
+        Valid scrapy crawler.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool("PROFILING_ENABLED"):
+            raise NotConfigured
+
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.interval = settings.getfloat("PROFILING_INTERVAL", 60.0)
+        self.output = settings.get("PROFILING_OUTPUT")
+        self.hot_paths = [
+            name.strip()
+            for name in settings.getlist("PROFILING_HOT_PATHS")
+            if name.strip()
+        ]
+        self.profiler = settings.get("PROFILING_PROFILER") or None
+        self.profiles_dir = Path(settings.get("PROFILING_DIR") or "profiles")
+        self.snapshot_interval = settings.getfloat("PROFILING_SNAPSHOT_INTERVAL", 0.0)
+        self.snapshot_duration = settings.getfloat("PROFILING_SNAPSHOT_DURATION", 10.0)
+        if self.profiler not in (None, "cprofile", "pyinstrument"):
+            raise NotConfigured(f"""Unknown profiler: {self.profiler}""")
+
+        self.histograms = {}
+        self.spider = None
+        self.patches = []
+        self.receivers = []
+        self.tasks = []
+        self.snapshot = None
+        self.previous_handler = None
+
+        crawler.signals.connect(self.spider_opened, signals.spider_opened)
+        crawler.signals.connect(self.spider_closed, signals.spider_closed)
+        crawler.signals.connect(self.bytes_received, signals.bytes_received)
+        crawler.signals.connect(self.response_downloaded, signals.response_downloaded)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def histogram(self, name=None, unit="seconds"):
+        """Get a histogram by its name, created on first use."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(unit=unit)
+        return histogram
+
+    def bytes_received(self, data, request, spider):
+        meta = request.meta
+        meta["profiling_bytes"] = meta.get("profiling_bytes", 0) + len(data)
+
+    def response_downloaded(self, response, request, spider):
+        latency = request.meta.get("download_latency")
+        if latency is not None:
+            self.histogram("download/latency").record(latency)
+        downloaded = request.meta.pop("profiling_bytes", len(response.body))
+        self.histogram("download/bytes", unit="bytes").record(downloaded)
+
+    def _timed(self, function=None, name=None, size=None):
+        """Wrap a function, to record its time and optionally result size."""
+        histogram = self.histogram(name)
+        size_histogram = self.histogram(size, unit="bytes") if size else None
+
+        def timed_iterator(iterator, elapsed):
+            while True:
+                started_at = time.perf_counter()
+                try:
+                    value = next(iterator)
+                except StopIteration:
+                    histogram.record(elapsed + time.perf_counter() - started_at)
+                    return
+                elapsed = elapsed + time.perf_counter() - started_at
+                yield value
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            started_at = time.perf_counter()
+            result = function(*args, **kwargs)
+            elapsed = time.perf_counter() - started_at
+            if size_histogram is not None and result:
+                size_histogram.record(
+                    result[1] - result[0] if isinstance(result, tuple) else len(result)
+                )
+            if isinstance(result, Iterator):
+                return timed_iterator(result, elapsed)
+            histogram.record(elapsed)
+            return result
+
+        return wrapper
+
+    def _patch(self, target=None, name=None, histogram_name=None, size=None):
+        """Replace an attribute of a target with its timed wrapper."""
+        function = getattr(target, name, None)
+        if not callable(function):
+            return
+        wrapper = self._timed(function, name=histogram_name, size=size)
+        had_attribute = name in vars(target)
+        self.patches.append((target, name, function, had_attribute))
+        setattr(target, name, wrapper)
+
+    def _instrument_spider(self, spider=None):
+        """Time spider hot paths, and record page script data sizes."""
+        module = sys.modules.get(type(spider).__module__)
+        for name in self.hot_paths:
+            if name in {"scan_script_data", "_locate_script_data"}:
+                continue
+            target = spider if hasattr(spider, name) else module
+            self._patch(target, name, histogram_name=f"""hot_path/{name}""")
+
+        # record raw (i.e scanned) or located (i.e lazy) script data sizes
+        self._patch(
+            spider,
+            "scan_script_data",
+            histogram_name="hot_path/scan_script_data",
+            size="payload/script_data",
+        )
+        self._patch(
+            spider,
+            "_locate_script_data",
+            histogram_name="hot_path/locate_script_data",
+            size="payload/script_data",
+        )
+
+    def _instrument_pipelines(self):
+        """Time process_item of each item pipeline."""
+        itemproc = self.crawler.engine.scraper.itemproc
+        pipelines = [
+            pipeline
+            for pipeline in itemproc.middlewares
+            if hasattr(pipeline, "process_item")
+        ]
+        methods = itemproc.methods["process_item"]
+        for index, (pipeline, method) in enumerate(zip(pipelines, list(methods))):
+            histogram = self.histogram(f"""pipeline/{type(pipeline).__name__}""")
+            methods[index] = self._timed_pipeline(method, histogram)
+
+    def _timed_pipeline(self, method=None, histogram=None):
+        @wraps(method)
+        def wrapper(item, spider):
+            started_at = time.perf_counter()
+            result = method(item, spider)
+            if isinstance(result, defer.Deferred):
+
+                def record(value):
+                    histogram.record(time.perf_counter() - started_at)
+                    return value
+
+                return result.addBoth(record)
+            histogram.record(time.perf_counter() - started_at)
+            return result
+
+        return wrapper
+
+    def _instrument_feeds(self):
+        """Time feed export of items, by timing feed exporter receivers."""
+        for extension in self.crawler.extensions.middlewares:
+            if not isinstance(extension, FeedExporter):
+                continue
+            receiver = self._timed_feed(
+                extension.item_scraped, self.histogram("feed/export")
+            )
+            self.crawler.signals.disconnect(
+                extension.item_scraped, signals.item_scraped
+            )
+            self.crawler.signals.connect(receiver, signals.item_scraped)
+            self.receivers.append((extension.item_scraped, receiver))
+
+    def _timed_feed(self, item_scraped=None, histogram=None):
+        # receivers arguments are matched by name, so keep them explicit
+        def timed_item_scraped(item, spider):
+            started_at = time.perf_counter()
+            result = item_scraped(item, spider)
+            histogram.record(time.perf_counter() - started_at)
+            return result
+
+        return timed_item_scraped
+
+    def spider_opened(self, spider):
+        self.spider = spider
+        self._instrument_spider(spider)
+        self._instrument_pipelines()
+        self._instrument_feeds()
+
+        if self.interval > 0:
+            self._start_task(self.log, self.interval)
+        if self.profiler and self.snapshot_interval > 0:
+            self._start_task(self.start_snapshot, self.snapshot_interval)
+        if self.profiler and hasattr(signal, "SIGUSR2"):
+            self.previous_handler = signal.signal(signal.SIGUSR2, self._on_signal)
+
+    def _start_task(self, function=None, interval=60.0):
+        loop = task.LoopingCall(function)
+        loop.start(interval, now=False)
+        self.tasks.append(loop)
+
+    def spider_closed(self, spider):
+        for loop in self.tasks:
+            if loop.running:
+                loop.stop()
+        if self.snapshot is not None:
+            self.stop_snapshot()
+        if self.previous_handler is not None:
+            signal.signal(signal.SIGUSR2, self.previous_handler)
+
+        # restore instrumented functions
+        for target, name, function, had_attribute in reversed(self.patches):
+            if had_attribute:
+                setattr(target, name, function)
+            else:
+                delattr(target, name)
+        for item_scraped, receiver in self.receivers:
+            self.crawler.signals.disconnect(receiver, signals.item_scraped)
+            self.crawler.signals.connect(item_scraped, signals.item_scraped)
+
+        self.log()
+
+    def collect(self):
+        """Collect histograms summaries in stats, and return them."""
+        summaries = {}
+        for name, histogram in sorted(self.histograms.items()):
+            if not histogram.count:
+                continue
+            summary = summaries[name] = histogram.to_dict()
+            for key in ("count", "sum", "p50", "p90", "p99", "max"):
+                self.stats.set_value(
+                    f"""profiling/{name}/{key}""", summary[key], spider=self.spider
+                )
+        return summaries
+
+    def log(self):
+        """Log slowest hot paths, collect stats and write output file."""
+        summaries = self.collect()
+        timings = sorted(
+            (
+                (name, summary)
+                for name, summary in summaries.items()
+                if summary["unit"] == "seconds"
+            ),
+            key=lambda pair: pair[1]["sum"],
+            reverse=True,
+        )
+        message = ", ".join(
+            f"""{name} {format_value(summary["sum"])} """
+            f"""(n={summary["count"]}, p50={format_value(summary["p50"])}, """
+            f"""p99={format_value(summary["p99"])})"""
+            for name, summary in timings[:8]
+        )
+        logger.info("Profiling: %s", message, extra={"spider": self.spider})
+        if self.output:
+            self.write(summaries)
+
+    def write(self, summaries=None):
+        """Write histograms summaries to a JSON or Prometheus text file."""
+        path = Path(self.output)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix in {".prom", ".txt"}:
+            content = format_prometheus(summaries, spider=self.spider.name)
+        else:
+            content = json.dumps(summaries, indent=2)
+        temp_path = path.with_name(f"""{path.name}.tmp""")
+        temp_path.write_text(content)
+        temp_path.replace(path)
+
+    def _on_signal(self, signum, frame):
+        from twisted.internet import reactor
+
+        reactor.callFromThread(self.start_snapshot)
+
+    def start_snapshot(self):
+        """Start a profiler snapshot of the reactor thread, for a duration."""
+        from twisted.internet import reactor
+
+        if self.snapshot is not None:
+            return
+        if self.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+
+            profiler = Profiler()
+            profiler.start()
+        else:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+        call = reactor.callLater(self.snapshot_duration, self.stop_snapshot)
+        self.snapshot = (profiler, call)
+        logger.info("Started %s snapshot", self.profiler, extra={"spider": self.spider})
+
+    def stop_snapshot(self):
+        """Stop profiler snapshot, and write it to profiles directory."""
+        profiler, call = self.snapshot
+        self.snapshot = None
+        if call.active():
+            call.cancel()
+
+        self.profiles_dir.mkdir(parents=True, exist_ok=True)
+        name = f"""{self.spider.name}-{time.strftime("%Y%m%dT%H%M%S")}"""
+        if self.profiler == "pyinstrument":
+            profiler.stop()
+            path = self.profiles_dir / f"""{name}.txt"""
+            path.write_text(profiler.output_text(unicode=True))
+        else:
+            profiler.disable()
+            path = self.profiles_dir / f"""{name}.pstats"""
+            profiler.dump_stats(str(path))
+        self.stats.inc_value("profiling/snapshots", spider=self.spider)
+        logger.info("Saved %s snapshot to %s", self.profiler, path)
+
+
+def format_prometheus(summaries=None, spider=None):
+    """Format histograms summaries as Prometheus text exposition.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.profiling import Histogram, format_prometheus
+    >>> histogram = Histogram(unit="items")
+    >>> histogram.record(2)
+    >>> text = format_prometheus({"callback/items": histogram.to_dict()}, "s")
+    >>> print(text.splitlines()[2])
+    scrapy_profiling_items{spider="s",name="callback/items",quantile="0.5"} 2
+    """
+    lines = []
+    for unit in HISTOGRAM_UNITS:
+        metric = f"""scrapy_profiling_{unit}"""
+        names = [
+            name
+            for name, summary in (summaries or {}).items()
+            if summary["unit"] == unit
+        ]
+        if not names:
+            continue
+        lines.append(f"""# HELP {metric} Crawl profiling histograms in {unit}.""")
+        lines.append(f"""# TYPE {metric} summary""")
+        for name in names:
+            summary = summaries[name]
+            labels = f"""spider="{spider}",name="{name}\""""
+            for quantile, key in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99")):
+                lines.append(
+                    f"""{metric}{{{labels},quantile="{quantile}"}} {summary[key]:g}"""
+                )
+            lines.append(f"""{metric}_sum{{{labels}}} {summary["sum"]:g}""")
+            lines.append(f"""{metric}_count{{{labels}}} {summary["count"]}""")
+    return "\n".join(lines) + "\n"
+
+
+class ProfilingSpiderMiddleware:
+    """Record spider callbacks time, decoded bytes and items per page.
+
+    Enable it last (i.e closest to spiders), so other spider middlewares
+    are not timed. It is enabled along ``Profiling`` extension only.
+    """
+
+    def __init__(self, profiling=None):
+        self.profiling = profiling
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        for extension in crawler.extensions.middlewares:
+            if isinstance(extension, Profiling):
+                return cls(profiling=extension)
+        raise NotConfigured
+
+    def process_spider_input(self, response, spider):
+        profiling = self.profiling
+        profiling.histogram("download/decoded_bytes", unit="bytes").record(
+            len(response.body)
+        )
+
+    def process_spider_output(self, response, result, spider):
+        callback = response.request.callback if response.request else None
+        name = getattr(callback, "__name__", None) or "parse"
+        histogram = self.profiling.histogram(f"""callback/{name}""")
+        items_histogram = self.profiling.histogram(
+            f"""callback/{name}/items""", unit="items"
+        )
+
+        elapsed = 0.0
+        items = 0
+        result = iter(result)
+        while True:
+            started_at = time.perf_counter()
+            try:
+                value = next(result)
+            except StopIteration:
+                break
+            finally:
+                elapsed = elapsed + time.perf_counter() - started_at
+            items = items if isinstance(value, Request) else items + 1
+            yield value
+        histogram.record(elapsed)
+        items_histogram.record(items)
@@ -0,0 +1,154 @@
+"""Re-parse cached pages into items, using a pool of processes.
+
+Cached pages (see ``producthunt_scraper.httpcache``) are sent to worker
+processes in chunks, where spider callbacks parse them into items. Items
+are yielded in order of pages, so results do not depend on number of
+workers.
+"""
+
+import multiprocessing
+from itertools import islice
+
+from scrapy import Request
+from scrapy.crawler import Crawler
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.settings import Settings
+from scrapy.spiderloader import SpiderLoader
+from w3lib.http import headers_raw_to_dict
+
+from producthunt_scraper.httpcache import decode_body
+
+__all__ = ["ReparseSpiderMixin", "chunked", "parse_pages", "reparse_pages"]
+
+# spider used to parse pages, within a worker process
+_spider = None
+
+
+class ReparseSpiderMixin:
+    """Yield re-parsed items from a spider, instead of crawling pages.
+
+    Items are yielded from a callback of a single ``data:`` request, so
+    they go through item pipelines and feeds as crawled items do.
+    """
+
+    reparse_items = ()
+    reparse_date = None
+
+    def __init__(self, *args, **kwargs):
+        super(ReparseSpiderMixin, self).__init__(*args, **kwargs)
+        if self.reparse_date is not None:
+            self.last_scraped_date = self.reparse_date
+
+    def start_requests(self):
+        yield Request(
+            url="data:,",
+            callback=self.parse_reparse_items,
+            dont_filter=True,
+            meta={"dont_cache": True},
+        )
+
+    def parse_reparse_items(self, response=None, **kwargs):
+        """Yield re-parsed items."""
+        yield from self.reparse_items
+
+
+def chunked(iterable=None, size=16):
+    """Split an iterable into lists of ``size`` values.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.reparse import chunked
+    >>> list(chunked(range(5), size=2))
+    [[0, 1], [2, 3], [4]]
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def create_spider(name=None, settings=None):
+    """Create a spider by its name, to parse pages outside of a crawl."""
+    settings = settings if isinstance(settings, Settings) else Settings(settings)
+    spider_class = SpiderLoader.from_settings(settings).load(name)
+    return spider_class.from_crawler(Crawler(spider_class, settings))
+
+
+def init_worker(name=None, settings=None):
+    """Create spider of a worker process."""
+    global _spider
+    _spider = create_spider(name=name, settings=settings)
+
+
+def parse_page(spider=None, page=None, request_url=None, meta=None, **kwargs):
+    """Parse a cached page into items, using spider parse callback.
+
+    Cached bodies are decoded first, as they are cached before scrapy http
+    compression decode them.
+    """
+    url, status, headers, body = page
+    headers = Headers(headers_raw_to_dict(headers))
+    body = decode_body(body, headers)
+    respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+    request = Request(request_url or url, meta=meta)
+    response = respcls(
+        url=url, status=status, headers=headers, body=body, request=request
+    )
+    return [
+        value
+        for value in spider.parse(response=response, **kwargs) or ()
+        if not isinstance(value, Request)
+    ]
+
+
+def parse_pages(pages=None):
+    """Parse a chunk of cached pages into items, within a worker process."""
+    items = []
+    for page in pages:
+        items.extend(parse_page(spider=_spider, page=page))
+    return items
+
+
+def reparse_pages(pages=None, name=None, settings=None, workers=1, chunk_size=16):
+    """Parse cached pages into items, in order of pages.
+
+    Parameters
+    ----------
+    pages (iterable):
+        Valid ``(url, status, headers, body)`` of cached pages.
+
+    name (str):
+        Valid name of spider to parse pages with.
+
+    settings (Settings|dict):
+        Valid settings to create spider with.
+
+    workers (int):
+        Valid number of worker processes. Pages are parsed in current
+        process with a single worker.
+
+    chunk_size (int):
+        Valid number of pages sent to a worker process at once.
+
+    Returns
+    -------
+    items (iterator):
+        Valid iterator of parsed items.
+    """
+    spider = create_spider(name=name, settings=settings)
+    pages = (page for page in pages if spider.is_item_url(page[0]))
+
+    if workers <= 1:
+        for page in pages:
+            yield from parse_page(spider=spider, page=page)
+        return
+
+    settings = settings.copy_to_dict() if isinstance(settings, Settings) else settings
+    with multiprocessing.Pool(
+        processes=workers, initializer=init_worker, initargs=(name, settings)
+    ) as pool:
+        for items in pool.imap(parse_pages, chunked(pages, size=chunk_size)):
+            yield from items
@@ -0,0 +1,266 @@
+"""Priority-aware and memory-bounded scheduler of requests, for deep crawls.
+
+Requests of item pages (i.e leaf product pages, see ``is_item_url`` of
+spiders) are scheduled before requests of discovery pages (i.e topics
+pages), so items flow early and pending requests do not pile up. Within
+each kind, requests are scheduled by priority, then in order of arrival.
+
+Up to ``PRIORITY_SCHEDULER_MEMORY_SIZE`` pending requests are kept in memory,
+and further requests are spilled to a temporary sqlite queue on disk, as
+pickled request dicts. Requests which can't be serialized (i.e their
+callback isn't a spider method) are kept in memory. Discovery requests in
+flight are capped by ``PRIORITY_SCHEDULER_MAX_DISCOVERY``, so discovery
+does not compete with item pages for download slots.
+
+Enable it using ``SCHEDULER`` setting i.e
+``producthunt_scraper.scheduler.PriorityScheduler``.
+"""
+
+import heapq
+import os
+import pickle
+import sqlite3
+import tempfile
+
+from scrapy.core.scheduler import BaseScheduler
+from scrapy.utils.misc import create_instance, load_object
+from scrapy.utils.request import request_from_dict
+
+__all__ = ["DiskQueue", "PriorityScheduler"]
+
+# kinds of requests, in order of scheduling
+LEAF, DISCOVERY = 0, 1
+REQUEST_KINDS = {LEAF: "leaf", DISCOVERY: "discovery"}
+
+
+class DiskQueue:
+    """Queue of serialized requests within a temporary sqlite file.
+
+    Requests are popped by kind, then by rank (i.e negated priority) and
+    sequence number. The file is removed once the queue is closed.
+
+    Parameters
+    ----------
+    directory (str):
+        Valid directory of queue file. Default to system temporary directory.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.scheduler import DiskQueue
+    >>> queue = DiskQueue()
+    >>> queue.push(1, 0, 1, b"a"), queue.push(1, -1, 2, b"b")
+    (None, None)
+    >>> len(queue), queue.peek(1), queue.pop(1), queue.pop(1), queue.pop(1)
+    (2, (-1, 2), b'b', b'a', None)
+    >>> queue.close()
+    """
+
+    def __init__(self, directory=None):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(
+            prefix="scheduler-", suffix=".sqlite3", dir=directory
+        )
+        os.close(fd)
+        self.connection = sqlite3.connect(self.path, isolation_level=None)
+        # queue is temporary, so it does not need to survive a crash
+        self.connection.execute("PRAGMA journal_mode=OFF")
+        self.connection.execute("PRAGMA synchronous=OFF")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS requests ("
+            "kind INTEGER NOT NULL, rank INTEGER NOT NULL, seq INTEGER NOT NULL, "
+            "data BLOB NOT NULL, PRIMARY KEY (kind, rank, seq)) WITHOUT ROWID"
+        )
+        self.sizes = {}
+
+    def push(self, kind=0, rank=0, seq=0, data=None):
+        """Push a serialized request of a kind."""
+        self.connection.execute(
+            "INSERT INTO requests (kind, rank, seq, data) VALUES (?, ?, ?, ?)",
+            (kind, rank, seq, data),
+        )
+        self.sizes[kind] = self.sizes.get(kind, 0) + 1
+
+    def peek(self, kind=0):
+        """Get rank and sequence number of next request of a kind, if any."""
+        if not self.sizes.get(kind):
+            return None
+        return self.connection.execute(
+            "SELECT rank, seq FROM requests WHERE kind = ? ORDER BY rank, seq LIMIT 1",
+            (kind,),
+        ).fetchone()
+
+    def pop(self, kind=0):
+        """Pop next serialized request of a kind, if any."""
+        key = self.peek(kind)
+        if key is None:
+            return None
+        (data,) = self.connection.execute(
+            "SELECT data FROM requests WHERE kind = ? AND rank = ? AND seq = ?",
+            (kind, *key),
+        ).fetchone()
+        self.connection.execute(
+            "DELETE FROM requests WHERE kind = ? AND rank = ? AND seq = ?",
+            (kind, *key),
+        )
+        self.sizes[kind] -= 1
+        return data
+
+    def __len__(self):
+        return sum(self.sizes.values())
+
+    def close(self):
+        self.connection.close()
+        os.remove(self.path)
+
+
+class PriorityScheduler(BaseScheduler):
+    """Schedule item pages first, within a memory-bounded queue.
+
+    Parameters
+    ----------
+    crawler (Crawler):
+        Valid scrapy crawler.
+
+    dupefilter (BaseDupeFilter):
+        Valid duplicates filter of requests.
+
+    memory_size (int):
+        Valid maximum number of pending requests kept in memory.
+
+    max_discovery (int):
+        Valid maximum number of discovery requests in flight, ``0`` for no
+        limit.
+
+    disk_dir (str):
+        Valid directory of disk queue files.
+    """
+
+    def __init__(
+        self,
+        crawler=None,
+        dupefilter=None,
+        memory_size=1000,
+        max_discovery=0,
+        disk_dir=None,
+    ):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.dupefilter = dupefilter
+        self.memory_size = max(0, memory_size)
+        self.max_discovery = max(0, max_discovery)
+        self.disk_dir = disk_dir
+        self.spider = None
+        self.memory = {LEAF: [], DISCOVERY: []}
+        self.disk = None
+        self.seq = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        dupefilter_class = load_object(settings["DUPEFILTER_CLASS"])
+        return cls(
+            crawler=crawler,
+            dupefilter=create_instance(dupefilter_class, settings, crawler),
+            memory_size=settings.getint("PRIORITY_SCHEDULER_MEMORY_SIZE", 1000),
+            max_discovery=settings.getint("PRIORITY_SCHEDULER_MAX_DISCOVERY", 0),
+            disk_dir=settings.get("PRIORITY_SCHEDULER_DISK_DIR"),
+        )
+
+    def open(self, spider):
+        self.spider = spider
+        return self.dupefilter.open()
+
+    def close(self, reason):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+        return self.dupefilter.close(reason)
+
+    def __len__(self):
+        memory = sum(len(queue) for queue in self.memory.values())
+        return memory + (len(self.disk) if self.disk is not None else 0)
+
+    def has_pending_requests(self):
+        return len(self) > 0
+
+    def get_kind(self, request=None):
+        """Get kind of a request, leaf if it is of an item page."""
+        is_item_url = getattr(self.spider, "is_item_url", None)
+        if is_item_url is not None and is_item_url(request.url):
+            return LEAF
+        return DISCOVERY
+
+    def enqueue_request(self, request):
+        if not request.dont_filter and self.dupefilter.request_seen(request):
+            self.dupefilter.log(request, self.spider)
+            return False
+
+        kind = self.get_kind(request)
+        self.seq = self.seq + 1
+        memory = sum(len(queue) for queue in self.memory.values())
+        data = None
+        if memory >= self.memory_size:
+            # serialize request to spill it to disk, past memory size
+            # i.e requests whose callback or meta can't be serialized are kept
+            # in memory, as scrapy scheduler does
+            try:
+                data = pickle.dumps(request.to_dict(spider=self.spider), protocol=4)
+            except (ValueError, AttributeError, TypeError, pickle.PicklingError):
+                self.stats.inc_value("scheduler/unserializable", spider=self.spider)
+
+        if data is None:
+            heapq.heappush(self.memory[kind], (-request.priority, self.seq, request))
+            self.stats.inc_value("scheduler/enqueued/memory", spider=self.spider)
+        else:
+            if self.disk is None:
+                self.disk = DiskQueue(directory=self.disk_dir)
+            self.disk.push(kind, -request.priority, self.seq, data)
+            self.stats.inc_value("scheduler/enqueued/disk", spider=self.spider)
+
+        self.stats.inc_value("scheduler/enqueued", spider=self.spider)
+        self.stats.inc_value(
+            f"""scheduler/enqueued/{REQUEST_KINDS[kind]}""", spider=self.spider
+        )
+        self.stats.max_value("scheduler/queue/peak", len(self), spider=self.spider)
+        return True
+
+    def _pop(self, kind=0):
+        """Pop next request of a kind, from memory or disk."""
+        queue = self.memory[kind]
+        disk_key = self.disk.peek(kind) if self.disk is not None else None
+        if queue and (disk_key is None or queue[0][:2] <= tuple(disk_key)):
+            return heapq.heappop(queue)[2]
+        if disk_key is not None:
+            data = self.disk.pop(kind)
+            return request_from_dict(pickle.loads(data), spider=self.spider)
+        return None
+
+    def _is_discovery_capped(self):
+        """Check if discovery requests in flight reached their maximum."""
+        if not self.max_discovery:
+            return False
+        active = self.crawler.engine.downloader.active
+        discovery = sum(1 for request in active if self.get_kind(request) != LEAF)
+        return discovery >= self.max_discovery
+
+    def _has_pending(self, kind=0):
+        """Check if requests of a kind are pending, in memory or disk."""
+        in_disk = self.disk is not None and self.disk.sizes.get(kind)
+        return bool(self.memory[kind] or in_disk)
+
+    def next_request(self):
+        for kind in (LEAF, DISCOVERY):
+            if not self._has_pending(kind):
+                continue
+            if kind == DISCOVERY and self._is_discovery_capped():
+                self.stats.inc_value("scheduler/discovery/capped", spider=self.spider)
+                return None
+            request = self._pop(kind)
+            if request is not None:
+                self.stats.inc_value("scheduler/dequeued", spider=self.spider)
+                self.stats.inc_value(
+                    f"""scheduler/dequeued/{REQUEST_KINDS[kind]}""", spider=self.spider
+                )
+                return request
+        return None
@@ -15,6 +15,7 @@ Scrapy developers, if you add a setting here remember to:
 * add project defined/custom settings last
 
 """
+
 from importlib import import_module
 from pathlib import Path
 
@@ -75,11 +76,31 @@ DEFAULT_REQUEST_HEADERS = {
 # See https://docs.scrapy.org/en/latest/topics/settings.html#depth-limit
 DEPTH_LIMIT = env("DEPTH_LIMIT", 0, int)
 
+# Module where to look for custom commands i.e scrapy reparse
+# See https://docs.scrapy.org/en/latest/topics/settings.html#commands-module
+COMMANDS_MODULE = "producthunt_scraper.commands"
+
+# Whether to enable DNS in-memory cache, and its size
+# See https://docs.scrapy.org/en/latest/topics/settings.html#dnscache-enabled
+DNSCACHE_ENABLED = env("DNSCACHE_ENABLED", True, bool)
+DNSCACHE_SIZE = env("DNSCACHE_SIZE", 10000, int)
+
 # Configure a delay for requests for the same website (default: 0)
 # See https://docs.scrapy.org/en/latest/topics/settings.html#download-delay
 # See also autothrottle settings and docs
 DOWNLOAD_DELAY = env("DOWNLOAD_DELAY", 0, float)
 
+# Configure download handlers per url scheme
+# See https://docs.scrapy.org/en/latest/topics/settings.html#download-handlers
+# Https handler download over HTTP/1.1, unless HTTP2_ENABLED (-s or env), then
+# multiplex requests over a pool of HTTP2_POOL_SIZE connections per host
+# (requires h2 i.e pip install -e .[http2])
+HTTP2_ENABLED = env("HTTP2_ENABLED", False, bool)
+HTTP2_POOL_SIZE = env("HTTP2_POOL_SIZE", 2, int)
+DOWNLOAD_HANDLERS = {
+    "https": "producthunt_scraper.handlers.PooledH2DownloadHandler",
+}
+
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 DOWNLOADER_MIDDLEWARES = {
@@ -87,32 +108,100 @@ DOWNLOADER_MIDDLEWARES = {
     "scrapy.downloadermiddlewares.retry.RetryMiddleware": None,
     "producthunt_scraper.middlewares.RandomUserAgentMiddleware": 500,
     "producthunt_scraper.middlewares.RetryRandomUserAgentMiddleware": 550,
+    "producthunt_scraper.middlewares.IncrementalMiddleware": 580,
+    "producthunt_scraper.middlewares.GraphQLPersistedQueryMiddleware": 590,
 }
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
 EXTENSIONS = {
     "scrapy.extensions.telnet.TelnetConsole": None,
+    "producthunt_scraper.throttle.AdaptiveConcurrency": 0,
+    "producthunt_scraper.parsepool.ParsePool": 0,
+    "producthunt_scraper.profiling.Profiling": 0,
 }
 
 # Feed exports configurations
 # See https://docs.scrapy.org/en/latest/topics/feed-exports.html
+# Formats are:
+#   * jsonlines (default)
+#   * jsonlines-threaded (encoded, compressed and written by a background thread)
+#   * jsonlines-delta (fields changed since last export of an item, see DELTA_*)
+#   * parquet (requires pyarrow i.e pip install -e .[parquet])
+# Compressions, of jsonlines-threaded format, are:
+#   * gzip
+#   * zstd (requires zstandard i.e pip install -e .[zstd])
+FEED_EXPORT_FORMAT = env("FEED_EXPORT_FORMAT", "jsonlines", str)
+FEED_EXPORT_COMPRESSION = env("FEED_EXPORT_COMPRESSION", None, str)
+FEED_EXPORT_QUEUE_SIZE = env("FEED_EXPORT_QUEUE_SIZE", 10000, int)
+FEED_EXPORT_EXTENSIONS = {
+    "jsonlines": "jsonl",
+    "jsonlines-threaded": "jsonl",
+    "jsonlines-delta": "delta.jsonl",
+    "parquet": "parquet",
+    "gzip": "gz",
+    "zstd": "zst",
+}
+FEED_EXPORT_EXTENSION = FEED_EXPORT_EXTENSIONS.get(
+    FEED_EXPORT_FORMAT, FEED_EXPORT_FORMAT
+)
+if FEED_EXPORT_FORMAT == "jsonlines-threaded" and FEED_EXPORT_COMPRESSION:
+    FEED_EXPORT_EXTENSION += "." + FEED_EXPORT_EXTENSIONS.get(
+        FEED_EXPORT_COMPRESSION, FEED_EXPORT_COMPRESSION
+    )
+# Default feed is written in FEED_EXPORT_FORMAT, with extension derived from
+# FEED_EXPORT_FORMAT and FEED_EXPORT_COMPRESSION. Feeds with an uri_template are
+# resolved again from crawler settings, once spider is created (i.e
+# -s FEED_EXPORT_FORMAT=parquet is honoured, see FeedsMixin.set_feeds)
+FEED_URI_TEMPLATE = "%(data_dir)s/%(name)s/date=%(last_scraped_date)s/%(part_name)s-%(batch_id)d.%(extension)s"
 FEEDS = {
-    "%(data_dir)s/%(name)s/date=%(last_scraped_date)s/part-%(batch_id)d.jsonl": {
-        "format": "jsonlines",
+    FEED_URI_TEMPLATE.replace("%(extension)s", FEED_EXPORT_EXTENSION): {
+        "format": FEED_EXPORT_FORMAT,
         "overwrite": True,
+        "uri_template": FEED_URI_TEMPLATE,
     }
 }
+FEED_EXPORTERS = {
+    "jsonlines-delta": "producthunt_scraper.exporters.DeltaJsonLinesItemExporter",
+    "jsonlines-threaded": "producthunt_scraper.exporters.ThreadedJsonLinesItemExporter",
+    "parquet": "producthunt_scraper.exporters.ParquetItemExporter",
+}
+# Close local feed files once their threaded jsonlines writer finish, within a
+# thread (i.e finishing a batch does not block the reactor)
+FEED_STORAGES = {
+    "": "producthunt_scraper.exporters.ThreadedFileFeedStorage",
+    "file": "producthunt_scraper.exporters.ThreadedFileFeedStorage",
+}
+FEED_EXPORT_PARQUET_COMPRESSION = env("FEED_EXPORT_PARQUET_COMPRESSION", "zstd", str)
+FEED_EXPORT_PARQUET_ROW_GROUP_SIZE = env(
+    "FEED_EXPORT_PARQUET_ROW_GROUP_SIZE", 10000, int
+)
 FEED_TEMPDIR = env("FEED_TEMPDIR", None)
 FEED_STORE_EMPTY = env("FEED_STORE_EMPTY", False, bool)
 FEED_EXPORT_ENCODING = env("FEED_EXPORT_ENCODING", "utf-8", str)
 FEED_EXPORT_BATCH_ITEM_COUNT = env("FEED_EXPORT_BATCH_ITEM_COUNT", 100, int)
+# Name feed part files per worker i.e part-<worker_id>-<batch_id> (see WORKER_ID)
+FEED_URI_PARAMS = "producthunt_scraper.frontier.feed_uri_params"
 
 # Enable and configure HTTP caching (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
 HTTPCACHE_ENABLED = env("HTTPCACHE_ENABLED", False, bool)
 HTTPCACHE_DIR = env("HTTPCACHE_DIR", "httpcache", str)
 HTTPCACHE_EXPIRATION_SECS = env("HTTPCACHE_EXPIRATION_SECS", 0, int)
+HTTPCACHE_STORAGE = env(
+    "HTTPCACHE_STORAGE", "scrapy.extensions.httpcache.FilesystemCacheStorage", str
+)
+# Configure sqlite cache storage (i.e producthunt_scraper.httpcache.SqliteCacheStorage)
+# with per url path expiration, pages stored as __NEXT_DATA__ only and LRU eviction
+# Compress using zstd if installed (i.e pip install -e .[zstd]) or zlib by default
+HTTPCACHE_SQLITE_COMPRESSION = env("HTTPCACHE_SQLITE_COMPRESSION", "", str)
+HTTPCACHE_SQLITE_EXPIRATION = env(
+    "HTTPCACHE_SQLITE_EXPIRATION", '{"/topics": 3600, "/products/": 604800}', str
+)
+HTTPCACHE_SQLITE_SCRIPT_DATA_PATHS = env(
+    "HTTPCACHE_SQLITE_SCRIPT_DATA_PATHS", "", str
+)  # i.e /products/,/posts/
+HTTPCACHE_SQLITE_MAX_BYTES = env("HTTPCACHE_SQLITE_MAX_BYTES", 0, int)  # 0 unlimited
 
 # Whether or not to enable the HttpProxyMiddleware.
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpproxy-enabled
@@ -120,10 +209,14 @@ HTTPPROXY_ENABLED = env("HTTPPROXY_ENABLED", True, bool)
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
+# Fused pipeline run normalize, validate and dedupe stages in a single call,
+# configure its stages using FUSED_ITEM_PIPELINE_STAGES.
+# To enable stages alone, use:
+#   "producthunt_scraper.pipelines.NormalizeItemPipeline": 200,
+#   "producthunt_scraper.pipelines.ValidItemFilterPipeline": 300,
+#   "producthunt_scraper.pipelines.DuplicateItemFilterPipeline": 400,
 ITEM_PIPELINES = {
-    "producthunt_scraper.pipelines.NormalizeItemPipeline": 200,
-    "producthunt_scraper.pipelines.ValidItemFilterPipeline": 300,
-    "producthunt_scraper.pipelines.DuplicateItemFilterPipeline": 400,
+    "producthunt_scraper.pipelines.FusedItemPipeline": 200,
 }
 
 # Enable and configure logging
@@ -141,6 +234,15 @@ REDIRECT_ENABLED = env("REDIRECT_ENABLED", True, bool)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#retry-enabled
 RETRY_ENABLED = env("RETRY_ENABLED", True, bool)
 RETRY_TIMES = env("RETRY_TIMES", 2, int)  # initial response + 2 retries = 3 requests
+# Delay retries with jittered exponential backoff, or at least by Retry-After
+RETRY_BACKOFF_BASE = env("RETRY_BACKOFF_BASE", 0.5, float)  # 0 to retry at once
+RETRY_BACKOFF_MAX = env("RETRY_BACKOFF_MAX", 60.0, float)
+
+# Configure scheduler, or use shared frontier to crawl with many workers
+# (i.e producthunt_scraper.frontier.FrontierScheduler), or schedule item pages first
+# within a memory-bounded queue (i.e producthunt_scraper.scheduler.PriorityScheduler)
+# See https://docs.scrapy.org/en/latest/topics/scheduler.html
+SCHEDULER = env("SCHEDULER", "scrapy.core.scheduler.Scheduler", str)
 
 # Obey robots.txt rules
 # https://docs.scrapy.org/en/latest/topics/settings.html#robotstxt-obey
@@ -148,9 +250,9 @@ ROBOTSTXT_OBEY = env("ROBOTSTXT_OBEY", False, bool)
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-# SPIDER_MIDDLEWARES = {
-#    "producthunt_scraper.middlewares.ProducthuntScraperSpiderMiddleware": 543,
-# }
+SPIDER_MIDDLEWARES = {
+    "producthunt_scraper.profiling.ProfilingSpiderMiddleware": 1000,
+}
 
 # A list of modules where Scrapy will look for spiders.
 # See https://docs.scrapy.org/en/latest/topics/settings.html#spider-modules
@@ -163,6 +265,14 @@ USER_AGENT = env(
     f"""Scrapy/{import_module("scrapy").__version__} (+https://scrapy.org)""",
     str,
 )
+# Configure pool of random user agents shared by user agent middlewares, or
+# disable it to use USER_AGENT without loading user agents dataset (i.e offline)
+USER_AGENT_POOL_ENABLED = env("USER_AGENT_POOL_ENABLED", True, bool)
+USER_AGENT_POOL_BROWSERS = env(
+    "USER_AGENT_POOL_BROWSERS", "chrome,edge,firefox,safari", str
+)
+USER_AGENT_POOL_SIZE = env("USER_AGENT_POOL_SIZE", 1024, int)
+USER_AGENT_POOL_PINNED = env("USER_AGENT_POOL_PINNED", False, bool)  # per host
 
 # Set settings whose default value is deprecated to a future-proof value
 REQUEST_FINGERPRINTER_IMPLEMENTATION = "2.7"
@@ -172,13 +282,144 @@ TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 BASE_DIR = Path(__file__).resolve().parent.parent
 BASE_DATA_DIR = BASE_DIR / "data"
 
+# Enable and configure adaptive concurrency (disabled by default), to adjust
+# download slots concurrency and delay from 429/503 responses, Retry-After
+# headers and latency percentiles (i.e disable AutoThrottle when enabled)
+ADAPTIVE_CONCURRENCY_ENABLED = env("ADAPTIVE_CONCURRENCY_ENABLED", False, bool)
+ADAPTIVE_CONCURRENCY_MIN = env("ADAPTIVE_CONCURRENCY_MIN", 1, int)
+ADAPTIVE_CONCURRENCY_MAX = env(
+    "ADAPTIVE_CONCURRENCY_MAX", 0, int
+)  # 0 to use CONCURRENT_REQUESTS
+ADAPTIVE_CONCURRENCY_TARGET_LATENCY = env(
+    "ADAPTIVE_CONCURRENCY_TARGET_LATENCY", 2.0, float
+)  # seconds, 0 to ignore latency
+ADAPTIVE_CONCURRENCY_LATENCY_PERCENTILE = env(
+    "ADAPTIVE_CONCURRENCY_LATENCY_PERCENTILE", 90, float
+)
+ADAPTIVE_CONCURRENCY_DECREASE_FACTOR = env(
+    "ADAPTIVE_CONCURRENCY_DECREASE_FACTOR", 0.5, float
+)
+ADAPTIVE_CONCURRENCY_COOLDOWN = env("ADAPTIVE_CONCURRENCY_COOLDOWN", 1.0, float)
+ADAPTIVE_CONCURRENCY_BACKOFF_DELAY = env(
+    "ADAPTIVE_CONCURRENCY_BACKOFF_DELAY", 0.25, float
+)
+ADAPTIVE_CONCURRENCY_MAX_DELAY = env("ADAPTIVE_CONCURRENCY_MAX_DELAY", 60.0, float)
+ADAPTIVE_CONCURRENCY_BACKOFF_HTTP_CODES = [429, 503]
+
+# Configure backfill of featured product launches over a range of days (see
+# backfill_start and backfill_end spider arguments), with finished days checkpointed
+BACKFILL_CONCURRENT_DAYS = env("BACKFILL_CONCURRENT_DAYS", 4, int)
+BACKFILL_CHECKPOINT_PATH = env(
+    "BACKFILL_CHECKPOINT_PATH", str(BASE_DATA_DIR / "backfill.sqlite3"), str
+)
+
+# Configure compaction of day partitions (see `scrapy compact`), into a single
+# file per day and a time-series store of items numeric fields per spider
+# i.e data/metrics/<spider>/metrics/part-<date>.parquet (requires pyarrow)
+COMPACTION_STORE_DIR = env("COMPACTION_STORE_DIR", str(BASE_DATA_DIR / "metrics"), str)
+COMPACTION_ROW_GROUP_SIZE = env("COMPACTION_ROW_GROUP_SIZE", 10000, int)
+
+# Configure delta snapshots (i.e FEED_EXPORT_FORMAT=jsonlines-delta), writing
+# full records of new items and changed fields only of items seen before, and
+# a full record of an item at least every DELTA_KEYFRAME_DAYS
+DELTA_INDEX_PATH = env("DELTA_INDEX_PATH", str(BASE_DATA_DIR / "delta.sqlite3"), str)
+DELTA_KEYFRAME_DAYS = env("DELTA_KEYFRAME_DAYS", 7, int)
+
+# Configure shared frontier of requests, used by FrontierScheduler to crawl
+# partitions of a spider with many workers (i.e WORKER_ID of WORKER_COUNT)
+# Frontiers are:
+#   * producthunt_scraper.frontier.SqliteFrontier (workers of a machine)
+#   * producthunt_scraper.frontier.RedisFrontier (workers across machines)
+# Interrupted crawls are resumed by their next run, and crawls done are cleared
+FRONTIER_BACKEND = env(
+    "FRONTIER_BACKEND", "producthunt_scraper.frontier.SqliteFrontier", str
+)
+FRONTIER_CRAWL_ID = env("FRONTIER_CRAWL_ID", None, str)  # default <spider>/<date>
+FRONTIER_IDLE_POLL = env("FRONTIER_IDLE_POLL", 0.5, float)
+FRONTIER_REDIS_URL = env("FRONTIER_REDIS_URL", "redis://localhost:6379/0", str)
+FRONTIER_SQLITE_PATH = env(
+    "FRONTIER_SQLITE_PATH", str(BASE_DATA_DIR / "frontier.sqlite3"), str
+)
+# Workers not seen within timeout are taken for stopped (workers are seen every
+# third of it, even while waiting on slow downloads)
+FRONTIER_WORKER_TIMEOUT = env("FRONTIER_WORKER_TIMEOUT", 60.0, float)
+
+FUSED_ITEM_PIPELINE_STAGES = env(
+    "FUSED_ITEM_PIPELINE_STAGES", "normalize,validate,dedupe", str
+)
+
+# Configure store of seen item ids used to drop duplicate items
+# Stores are:
+#   * producthunt_scraper.dedupe.MemoryItemIdStore (exact, in-memory)
+#   * producthunt_scraper.dedupe.BloomItemIdStore (approximate, in-memory)
+#   * producthunt_scraper.dedupe.SqliteItemIdStore (exact, on-disk)
+ITEM_DEDUPE_STORE = env(
+    "ITEM_DEDUPE_STORE", "producthunt_scraper.dedupe.MemoryItemIdStore", str
+)
+ITEM_DEDUPE_BLOOM_CAPACITY = env("ITEM_DEDUPE_BLOOM_CAPACITY", 1000000, int)
+ITEM_DEDUPE_BLOOM_ERROR_RATE = env("ITEM_DEDUPE_BLOOM_ERROR_RATE", 0.001, float)
+ITEM_DEDUPE_SQLITE_PATH = env(
+    "ITEM_DEDUPE_SQLITE_PATH", str(BASE_DATA_DIR / "item_ids.sqlite3"), str
+)
+ITEM_DEDUPE_TTL = env("ITEM_DEDUPE_TTL", "{}", str)  # i.e {"ProductItem": 86400}
+
+# Enable and configure incremental mode (disabled by default), to send
+# conditional requests and emit items only for products changed since last run
+INCREMENTAL_ENABLED = env("INCREMENTAL_ENABLED", False, bool)
+INCREMENTAL_STATE_PATH = env(
+    "INCREMENTAL_STATE_PATH", str(BASE_DATA_DIR / "incremental.sqlite3"), str
+)
+
+# Enable and configure parse pool (disabled by default), to parse item pages
+# (i.e product and post pages) within a pool of processes or threads, off the
+# reactor thread (i.e processes for CPU-bound JSON decoding and item loading)
+PARSE_POOL_ENABLED = env("PARSE_POOL_ENABLED", False, bool)
+PARSE_POOL_KIND = env("PARSE_POOL_KIND", "process", str)  # process or thread
+PARSE_POOL_SIZE = env("PARSE_POOL_SIZE", 0, int)  # 0 to use number of cpus
+
+# Configure PriorityScheduler, keeping up to PRIORITY_SCHEDULER_MEMORY_SIZE pending
+# requests in memory (spilling others to disk) and capping discovery requests in flight
+PRIORITY_SCHEDULER_MEMORY_SIZE = env("PRIORITY_SCHEDULER_MEMORY_SIZE", 1000, int)
+PRIORITY_SCHEDULER_MAX_DISCOVERY = env("PRIORITY_SCHEDULER_MAX_DISCOVERY", 2, int)
+PRIORITY_SCHEDULER_DISK_DIR = env("PRIORITY_SCHEDULER_DISK_DIR", None, str)  # tmp dir
+
+# Enable and configure crawl profiling (disabled by default), to record timing
+# and size histograms of hot paths into stats, logs and a JSON or Prometheus
+# text (i.e .prom) file, with cProfile or pyinstrument snapshots on SIGUSR2
+PROFILING_ENABLED = env("PROFILING_ENABLED", False, bool)
+PROFILING_INTERVAL = env("PROFILING_INTERVAL", 60.0, float)  # 0 to log on close
+PROFILING_OUTPUT = env("PROFILING_OUTPUT", None, str)  # i.e profiling.json
+PROFILING_HOT_PATHS = env(
+    "PROFILING_HOT_PATHS",
+    "parse_script_data,find_script_data,parse_ref_index,parse_ref_keys,"
+    "parse_ref_values,load_product_item,load_product_launch_item",
+    str,
+)
+PROFILING_PROFILER = env("PROFILING_PROFILER", None, str)  # cprofile or pyinstrument
+PROFILING_DIR = env("PROFILING_DIR", str(BASE_DATA_DIR / "profiles"), str)
+PROFILING_SNAPSHOT_INTERVAL = env("PROFILING_SNAPSHOT_INTERVAL", 0.0, float)
+PROFILING_SNAPSHOT_DURATION = env("PROFILING_SNAPSHOT_DURATION", 10.0, float)
+
 PRODUCTHUNT_ALLOWED_DOMAINS = ["producthunt.com"]
-PRODUCTHUNT_BASE_URL = "https://www.producthunt.com"
+PRODUCTHUNT_LAZY_SCRIPT_DATA = env("PRODUCTHUNT_LAZY_SCRIPT_DATA", False, bool)
+PRODUCTHUNT_BASE_URL = env("PRODUCTHUNT_BASE_URL", "https://www.producthunt.com", str)
 PRODUCTHUNT_POSTS_BASE_URL = f"""{PRODUCTHUNT_BASE_URL}/posts"""
 PRODUCTHUNT_TOPICS_BASE_URL = f"""{PRODUCTHUNT_BASE_URL}/topics"""
 PRODUCTHUNT_PRODUCTS_BASE_URL = f"""{PRODUCTHUNT_BASE_URL}/products"""
+PRODUCTHUNT_LEADERBOARD_BASE_URL = f"""{PRODUCTHUNT_BASE_URL}/leaderboard/daily"""
 PRODUCTHUNT_PRODUCT_SORT_FILTERS = [
     "best_rated",
     "most_followed",
     "most_recent",
 ]
+# Fetch html pages, or query graphql endpoint (i.e compact JSON) in batches of ids
+PRODUCTHUNT_FETCH_MODE = env("PRODUCTHUNT_FETCH_MODE", "html", str)  # html or graphql
+PRODUCTHUNT_GRAPHQL_BATCH_SIZE = env("PRODUCTHUNT_GRAPHQL_BATCH_SIZE", 20, int)
+PRODUCTHUNT_GRAPHQL_PAGE_SIZE = env("PRODUCTHUNT_GRAPHQL_PAGE_SIZE", 20, int)
+PRODUCTHUNT_GRAPHQL_MAX_PAGES = env(
+    "PRODUCTHUNT_GRAPHQL_MAX_PAGES", 5, int
+)  # 0 no limit
+
+# Configure worker (i.e node) of a crawl with many workers, see FRONTIER_*
+WORKER_ID = env("WORKER_ID", 0, int)  # within [0, WORKER_COUNT)
+WORKER_COUNT = env("WORKER_COUNT", 1, int)
@@ -7,28 +7,53 @@ This spider, do:
     2. Scrape information for each featured product launch url
     3. Save batches of featured product launches per day.
 
+In graphql fetch mode, featured posts are queried from graphql endpoint,
+then posts in batches of ids.
+
+In backfill mode, daily leaderboard pages of a range of days are scraped
+instead of home page, and launches of each day are saved into their day
+partition.
+
 Usage:
 
 To scrape `featured product launches`, run:
 >>> scrapy crawl featured-product-launches
+
+To scrape `featured product launches` in graphql fetch mode, run:
+>>> PRODUCTHUNT_FETCH_MODE=graphql scrapy crawl featured-product-launches
+
+To backfill `featured product launches` of January 2024, run:
+>>> scrapy crawl featured-product-launches \
+...     -a backfill_start=2024-01-01 -a backfill_end=2024-01-31
 """
 
 from datetime import datetime
 
 import scrapy
 
-from producthunt_scraper.itemloaders import ProductLaunchItemLoader
-from producthunt_scraper.items import ProductLaunchItem
+from producthunt_scraper.itemloaders import load_product_launch_item
 from producthunt_scraper.settings import (
     BASE_DATA_DIR,
     PRODUCTHUNT_ALLOWED_DOMAINS,
     PRODUCTHUNT_BASE_URL,
+    PRODUCTHUNT_LAZY_SCRIPT_DATA,
+    PRODUCTHUNT_LEADERBOARD_BASE_URL,
     PRODUCTHUNT_POSTS_BASE_URL,
 )
-from producthunt_scraper.spiders.mixins import PageScriptDataMixin
+from producthunt_scraper.spiders.mixins import (
+    BackfillMixin,
+    BaseUrlMixin,
+    FeedsMixin,
+    GraphQLMixin,
+    PageScriptDataMixin,
+    ParsePoolMixin,
+)
 
 # selectors
 FEATURED_LAUNCH_URL_SELECTOR = "div[data-test=homepage-section-0] div[data-test*=post-item] a[href*=posts]::attr(href)"
+LEADERBOARD_LAUNCH_URL_SELECTOR = (
+    "main div[data-test*=post-item] a[href*=posts]::attr(href)"
+)
 
 # mappings
 FEATURED_LAUNCH_DATA_MAPPINGS = {
@@ -51,11 +76,22 @@ FEATURED_LAUNCH_DATA_MAPPINGS = {
 __all__ = ["FeaturedProductLaunchesSpider"]
 
 
-class FeaturedProductLaunchesSpider(scrapy.Spider, PageScriptDataMixin):
+class FeaturedProductLaunchesSpider(
+    scrapy.Spider,
+    PageScriptDataMixin,
+    BaseUrlMixin,
+    FeedsMixin,
+    ParsePoolMixin,
+    GraphQLMixin,
+    BackfillMixin,
+):
     """Scrape top featured product launches."""
 
     name = "featured-product-launches"
     allowed_domains = PRODUCTHUNT_ALLOWED_DOMAINS
+    base_url = PRODUCTHUNT_BASE_URL
+    posts_base_url = PRODUCTHUNT_POSTS_BASE_URL
+    leaderboard_base_url = PRODUCTHUNT_LEADERBOARD_BASE_URL
     data_dir = BASE_DATA_DIR
     last_scraped_date = datetime.utcnow().date()
 
@@ -63,23 +99,81 @@ class FeaturedProductLaunchesSpider(scrapy.Spider, PageScriptDataMixin):
         super(FeaturedProductLaunchesSpider, self).__init__(*args, **kwargs)
         self.last_scraped_date = datetime.utcnow().date()
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(FeaturedProductLaunchesSpider, cls).from_crawler(
+            crawler, *args, **kwargs
+        )
+        spider.lazy_script_data = crawler.settings.getbool(
+            "PRODUCTHUNT_LAZY_SCRIPT_DATA", PRODUCTHUNT_LAZY_SCRIPT_DATA
+        )
+        spider.set_base_url(
+            crawler.settings.get("PRODUCTHUNT_BASE_URL", PRODUCTHUNT_BASE_URL)
+        )
+        spider.set_feeds(crawler)
+        spider.set_fetch_mode(crawler.settings)
+        spider.set_backfill(crawler)
+        if spider.is_backfill_mode() and spider.is_graphql_mode():
+            raise ValueError("Backfill is supported in html fetch mode only")
+        return spider
+
     def start_requests(self):
         """Generate first requests to crawl for this spider."""
-        start_urls = [PRODUCTHUNT_BASE_URL]
+        # request leaderboard pages of first days, in backfill mode
+        if self.is_backfill_mode():
+            yield from self.backfill_start_requests()
+            return
+
+        # query featured posts, in graphql fetch mode
+        if self.is_graphql_mode():
+            variables = {"first": self.graphql_page_size}
+            yield self.graphql_request("FeaturedPosts", variables, callback=self.parse)
+            return
+
+        start_urls = [self.base_url]
         for start_url in start_urls:
             yield scrapy.Request(url=start_url, callback=self.parse, meta={})
 
+    def is_item_url(self, url=None):
+        """Check if an url is of a page parsed into items i.e product launch page."""
+        operation, _ = self.parse_graphql_operation(url=url)
+        return str(url).startswith(self.posts_base_url) or operation == "Posts"
+
     def parse(self, response=None, **kwargs):
         """Process responses and return scraped data and/or more URLs to follow."""
+        # parse item page within parse pool, if enabled
+        if self.parse_pool is not None and self.is_item_url(response.url):
+            result = self.parse_pool.parse(spider=self, response=response, **kwargs)
+        else:
+            result = self.parse_response(response=response, **kwargs)
+
+        # finish request of its backfill day, once parsed
+        return self.backfill_result(response=response, result=result)
+
+    def parse_response(self, response=None, **kwargs):
+        """Parse response and yield scraped data and/or more URLs to follow."""
+        # parse graphql responses, in graphql fetch mode
+        operation, _ = self.parse_graphql_operation(url=response.url)
+        if operation is not None:
+            yield from self.parse_graphql_response(
+                response=response, operation=operation, **kwargs
+            )
+            return
+
         # check url type
         response_url = str(response.url)
-        is_base_url = response_url == PRODUCTHUNT_BASE_URL
-        is_post_url = response_url.startswith(PRODUCTHUNT_POSTS_BASE_URL)
+        is_base_url = response_url.rstrip("/") == self.base_url
+        is_post_url = response_url.startswith(self.posts_base_url)
+        is_leaderboard_url = response_url.startswith(self.leaderboard_base_url)
 
         # ignore unknown urls
-        if not is_base_url and not is_post_url:
+        if not is_base_url and not is_post_url and not is_leaderboard_url:
             return
 
+        # parse leaderboard page and follow each product launch url of its day
+        if is_leaderboard_url:
+            yield from self.parse_leaderboard_page(response=response, **kwargs)
+
         # parse home page and follow each featured product launch url
         if is_base_url:
             yield from self.parse_featured_product_launches_page(
@@ -94,6 +188,31 @@ class FeaturedProductLaunchesSpider(scrapy.Spider, PageScriptDataMixin):
                 **kwargs,
             )
 
+    def parse_graphql_response(self, response=None, operation=None, **kwargs):
+        """Parse graphql response and yield scraped data and/or more requests."""
+        # parse page of featured posts, then query posts in batches of ids
+        if operation == "FeaturedPosts":
+            data = self.parse_graphql_data(response=response)
+            posts = data.get("featuredPosts") or {}
+            edges = posts.get("edges") or []
+            post_ids = [(edge.get("node") or {}).get("id") for edge in edges]
+            yield from self.batch_graphql_ids(
+                "Posts",
+                [post_id for post_id in post_ids if post_id],
+                callback=self.parse,
+            )
+            request = self.follow_graphql_page(
+                response=response, connection=posts, callback=self.parse
+            )
+            if request is not None:
+                yield request
+
+        # parse batch of posts and yield product launch items
+        if operation == "Posts":
+            yield from self.parse_featured_product_launch_page(
+                response=response, **kwargs
+            )
+
     def parse_featured_product_launches_page(self, response=None, **kwargs):
         """Parse producthunt home page and follow featured product launch urls."""
         # parse featured product launch urls
@@ -104,19 +223,34 @@ class FeaturedProductLaunchesSpider(scrapy.Spider, PageScriptDataMixin):
         for url in urls:
             yield response.follow(url, self.parse)
 
+    def parse_leaderboard_page(self, response=None, **kwargs):
+        """Parse daily leaderboard page and follow product launch urls of its day."""
+        # parse product launch urls of leaderboard day
+        urls = response.css(LEADERBOARD_LAUNCH_URL_SELECTOR)
+        urls = sorted(set(urls.getall()))
+
+        # follow each product launch page, as a request of leaderboard day
+        day = response.meta.get("backfill_date")
+        for url in urls:
+            url = response.urljoin(url)
+            if day is None:
+                yield response.follow(url, self.parse)
+            else:
+                yield self.backfill_request(day=day, url=url, callback=self.parse)
+
     def parse_featured_product_launch_page(self, response=None, **kwargs):
-        """Parse featured product launch page and yield a launch item."""
+        """Parse featured product launch page (or batch of posts) into items."""
         # parse product launch raw data
         raw_data = self.parse_script_data(response=response, **kwargs)
+        ref_index = self.parse_ref_index(source=raw_data)
 
         # collect, transform and format product launch data
         # from raw product launch data
-        for raw_data_key, raw_data_value in raw_data.items():
-            if (
-                "Post" in raw_data_key
-                and "product" in raw_data_value
-                and "structuredData" in raw_data_value
-            ):
+        raw_data_items = self.find_script_data(
+            key="Post", source=raw_data, index=ref_index
+        )
+        for _, raw_data_value in raw_data_items:
+            if "product" in raw_data_value and "structuredData" in raw_data_value:
                 # collect basic data
                 data = {
                     data_key: raw_data_value.get(raw_key, None)
@@ -124,23 +258,29 @@ class FeaturedProductLaunchesSpider(scrapy.Spider, PageScriptDataMixin):
                 }
 
                 # collect and link product details
-                product_key = self.parse_ref_key(key="product", source=raw_data_value)
-                product = self.parse_ref_values(product_key, source=raw_data)
+                product_key = self.parse_ref_key(
+                    key="product", source=raw_data_value, index=ref_index
+                )
+                product = self.parse_ref_values(
+                    product_key, source=raw_data, index=ref_index
+                )
                 product = next(iter(product), {})
                 data["product_id"] = product.get("id", None)
                 data["product_name"] = product.get("name", None)
                 data["product_url"] = product.get("url", None)
 
                 # collect and link topics
-                topic_keys = self.parse_ref_keys(key="topics", source=raw_data_value)
-                topics = self.parse_ref_values(*topic_keys, source=raw_data)
+                topic_keys = self.parse_ref_keys(
+                    key="topics", source=raw_data_value, index=ref_index
+                )
+                topics = self.parse_ref_values(
+                    *topic_keys, source=raw_data, index=ref_index
+                )
                 topics = {topic.get("name") for topic in topics}
                 topics = {topic for topic in topics if topic}
                 data["launch_topics"] = list(topics)
 
                 # load and yield an product launch item
-                item_loader = ProductLaunchItemLoader(item=ProductLaunchItem())
-                item_loader.add_value(None, data)
-                item = item_loader.load_item()
+                item = load_product_launch_item(data)
 
                 yield item
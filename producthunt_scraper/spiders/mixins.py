@@ -1,11 +1,53 @@
 """Spiders mixins."""
 
-import json
+import time
+from collections import deque
+from collections.abc import Mapping
+from datetime import date
+from urllib.parse import urlsplit
+
+import scrapy
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+
+from producthunt_scraper import jsonlib
+from producthunt_scraper.apollo import (
+    ApolloRefIndex,
+    LazyApolloState,
+    locate_script_data,
+    parse_refs,
+)
+from producthunt_scraper.backfill import (
+    BackfillCheckpoint,
+    get_backfill_feeds,
+    get_launch_date,
+    iter_dates,
+)
+from producthunt_scraper.exporters import get_feeds
+from producthunt_scraper.graphql import (
+    build_graphql_url,
+    is_graphql_response,
+    load_graphql_data,
+    normalize_graphql,
+    parse_graphql_url,
+)
+from producthunt_scraper.incremental import hash_content
+from producthunt_scraper.urls import canonicalize_url
 
 DEFAULT_PAGE_SCRIPT_DATA_SELECTOR = "script#__NEXT_DATA__::text"
+UTF8_ENCODINGS = {"utf-8", "utf8"}
 
 
-__all__ = ["PageScriptDataMixin"]
+__all__ = [
+    "BackfillMixin",
+    "BaseUrlMixin",
+    "FeedsMixin",
+    "GraphQLMixin",
+    "IncrementalMixin",
+    "PageScriptDataMixin",
+    "ParsePoolMixin",
+    "UniqueRequestMixin",
+]
 
 
 class PageScriptDataMixin:
@@ -13,12 +55,19 @@ class PageScriptDataMixin:
 
     This include:
         * parse page script data
+        * find entities from page script data
         * parse references from page script data
+        * index references of page script data
     """
 
-    def parse_script_data(self, response=None, selector=None, **kwargs):
+    lazy_script_data = False
+
+    def parse_script_data(self, response=None, selector=None, lazy=None, **kwargs):
         """Parse page script data.
 
+        The ``__NEXT_DATA__`` script is first scanned from raw response body,
+        and only when the scan fails, the page is parsed using css selector.
+
         Parameters
         ----------
         response (object):
@@ -27,25 +76,160 @@ class PageScriptDataMixin:
         selector (str):
             Valid page script data css selector.
 
+        lazy (bool):
+            Whether to decode apollo state entities on first access.
+            Default to ``lazy_script_data``.
+
         Returns
         -------
-        data (dict):
-            Valid page script data as ``dict``.
+        data (dict|LazyApolloState):
+            Valid page script data as ``dict`` or lazy ``Mapping``.
         """
-        # ensure script data selector
+        # normalize data of graphql (i.e json) responses, as page script data
+        if is_graphql_response(response=response):
+            data, _ = load_graphql_data(response=response)
+            return normalize_graphql(data=data)
+
+        # ensure script data selector and laziness
         selector = selector or DEFAULT_PAGE_SCRIPT_DATA_SELECTOR
+        lazy = self.lazy_script_data if lazy is None else lazy
+
+        # lazy decode page script data in place, if default selector is used
+        is_default_selector = selector == DEFAULT_PAGE_SCRIPT_DATA_SELECTOR
+        if is_default_selector and lazy and self._is_utf8_response(response):
+            body = getattr(response, "body", None) or b""
+            offsets = self._locate_script_data(body=body)
+            if offsets is not None:
+                data = LazyApolloState.from_script_data(body, *offsets)
+                if data is not None:
+                    return data
+
+        # scan page script data, if default selector is used
+        data = None
+        if is_default_selector:
+            data = self.scan_script_data(response=response)
+
+        # decode scanned page script data
+        if data is not None:
+            try:
+                data = jsonlib.loads(data)
+            except ValueError:
+                data = None
+            data = data if isinstance(data, dict) else None
 
         # parse page script data
-        data = response.css(selector)
-        data = data.get() or "{}"
+        if data is None:
+            data = response.css(selector)
+            data = data.get() or "{}"
+            data = jsonlib.loads(data)
 
-        # cast and select data
-        data = json.loads(data)
+        # select data
         data = data.get("props", {}).get("apolloState", {})
 
         return data
 
-    def parse_ref_keys(self, key=None, source=None, ref_type="__ref", strict=False):
+    def scan_script_data(self, response=None, marker=None):
+        """Scan raw page script data from response body.
+
+        Parameters
+        ----------
+        response (object):
+            Valid scrapy response.
+
+        marker (bytes):
+            Valid page script data tag marker. Default to ``id="__NEXT_DATA__"``.
+
+        Returns
+        -------
+        data (bytes|str|None):
+            Valid utf-8 encoded page script data, decoded ``str`` for other
+            response encodings or ``None`` if scan fails.
+        """
+        # locate script data
+        body = getattr(response, "body", None) or b""
+        offsets = self._locate_script_data(body=body, marker=marker)
+        if offsets is None:
+            return None
+
+        # ensure script data encoding
+        data_start, data_end = offsets
+        data = body[data_start:data_end]
+        if not self._is_utf8_response(response=response):
+            data = data.decode(response.encoding)
+
+        return data
+
+    def _locate_script_data(self, body=None, marker=None):
+        """Locate start and end offsets of page script data in a body."""
+        return locate_script_data(body=body, marker=marker)
+
+    def _is_utf8_response(self, response=None):
+        """Check if response body is utf-8 encoded."""
+        encoding = getattr(response, "encoding", None) or "utf-8"
+        return encoding.lower() in UTF8_ENCODINGS
+
+    def find_script_data(self, key=None, source=None, index=None):
+        """Find entities whose keys contain a given key from a source.
+
+        Parameters
+        ----------
+        key (str):
+            Valid part of entities keys e.g ``Product``.
+
+        source (dict|LazyApolloState):
+            Valid page script data as source.
+
+        index (ApolloRefIndex):
+            Valid references index to find entities from, by their typename
+            (i.e ``key``) instead of their keys.
+
+        Returns
+        -------
+        data (iterator):
+            Valid iterator of ``(key, entity)`` pairs.
+        """
+        if not key or not source:
+            return iter(())
+
+        # find entities of typename from index
+        if index is not None and index.source is source:
+            return index.find(key)
+
+        # decode only matched entities of lazy page script data
+        if isinstance(source, LazyApolloState):
+            return source.find(key)
+
+        return (
+            (entity_key, entity)
+            for entity_key, entity in source.items()
+            if key in entity_key
+        )
+
+    def parse_ref_index(self, source=None, ref_type="__ref"):
+        """Build references index of a page script data.
+
+        Parameters
+        ----------
+        source (dict|LazyApolloState):
+            Valid page script data as source.
+
+        type (str):
+            Valid type of related data. Default to ``__ref``.
+
+        Returns
+        -------
+        index (ApolloRefIndex|None):
+            Valid references index to pass to ``parse_ref_*`` helpers, or
+            ``None`` for lazy page script data, whose entities are decoded
+            on first access instead of all at once.
+        """
+        if isinstance(source, LazyApolloState):
+            return None
+        return ApolloRefIndex(source=source, ref_type=ref_type)
+
+    def parse_ref_keys(
+        self, key=None, source=None, ref_type="__ref", strict=False, index=None
+    ):
         """Parse associated/related reference keys from a source.
 
         Parameters
@@ -59,52 +243,37 @@ class PageScriptDataMixin:
         type (str):
             Valid type of related data. Default to ``__ref``.
 
+        strict (bool):
+            Whether related data key should match exactly. Default to ``False``.
+
+        index (ApolloRefIndex):
+            Valid references index to parse references from.
+
         Returns
         -------
         data (set):
             Valid set of keys to referenced data.
         """
-        if not key or not source and not isinstance(source, dict):
+        if not key or (not source and not isinstance(source, dict)):
             return set()
 
+        # parse related/referenced data from index, if source is indexed
+        if index is not None and index.ref_type == ref_type:
+            refs = index.ref_keys(key=key, source=source, strict=strict)
+            if refs is not None:
+                return set(refs)
+
         # parse related/referenced data i.e topics, categories etc.
         for ref_key, ref_values in source.items():
+            if not isinstance(ref_values, (dict, list)):
+                continue
             has_key = key == ref_key if strict else key in ref_key
-            ref_values = ref_values or {}
             if has_key:
-                # parse a dict with list of refs i.e ``{"edges": [{"node": {"__ref": "Product21"}}]}``
-                if isinstance(ref_values, dict) and "edges" in ref_values:
-                    ref_values = ref_values.get("edges") or []
-
-                # parse a list of refs i.e ``[{"node": {"__ref": "Product21"}}]``
-                # parse a list of refs i.e ``[{"__ref": "Product21"}]``
-                if isinstance(ref_values, list):
-                    ref_values = [
-                        ref_value.get("node") or {}
-                        if "node" in ref_value
-                        else ref_value
-                        for ref_value in ref_values
-                        if ref_value
-                    ]
-
-                # parse a dict ref e.g ``{"__ref": "Product21"}``
-                if isinstance(ref_values, dict) and ref_type in ref_values:
-                    ref_values = [ref_values]
-
-                # collect refs from a list of refs i.e ``[{"__ref": "Product21"}]``
-                ref_values = [ref_value for ref_value in ref_values if ref_value]
-                ref_values = [
-                    (ref_value.get(ref_type) or "").strip()
-                    for ref_value in ref_values
-                    if ref_value
-                ]
-                ref_values = {ref_value for ref_value in ref_values if ref_value}
-
-                # return and exit
-                return ref_values
-                break
-
-    def parse_ref_key(self, key=None, source=None, ref_type="__ref"):
+                return set(parse_refs(value=ref_values, ref_type=ref_type))
+
+        return set()
+
+    def parse_ref_key(self, key=None, source=None, ref_type="__ref", index=None):
         """Parse associated/related reference key from a source.
 
         Parameters
@@ -118,6 +287,9 @@ class PageScriptDataMixin:
         type (str):
             Valid type of related data. Default to ``__ref``.
 
+        index (ApolloRefIndex):
+            Valid references index to parse references from.
+
         Returns
         -------
         data (str|None):
@@ -128,31 +300,684 @@ class PageScriptDataMixin:
             source=source,
             ref_type=ref_type,
             strict=True,
+            index=index,
         )
         ref_key = next(iter(ref_keys), None)
 
         return ref_key
 
-    def parse_ref_values(self, *keys, source=None):
+    def parse_ref_values(self, *keys, source=None, index=None):
         """Parse associated/related reference values from a source.
 
         Parameters
         ----------
-        source (dict):
+        source (dict|LazyApolloState):
             Valid portion of page script data as source.
 
         keys (*str):
             Valid keys of related data.
 
+        index (ApolloRefIndex):
+            Valid references index to resolve references from.
+
         Returns
         -------
         value (list):
             Valid list of ``dict`` of related data.
         """
-        if not keys or not source or not isinstance(source, dict):
+        if not keys or not source or not isinstance(source, Mapping):
             return []
 
+        # resolve related/referenced data from index
+        if index is not None and index.source is source:
+            return index.ref_values(*keys)
+
         ref_values = [source.get(key) for key in keys if key]
         ref_values = [value for value in ref_values if value]
 
         return ref_values
+
+
+class IncrementalMixin:
+    """Provide helpers to scrape only pages content changed since last run.
+
+    Incremental store is set by ``IncrementalMiddleware`` when
+    ``INCREMENTAL_ENABLED`` setting is ``True``.
+    """
+
+    incremental_store = None
+
+    def check_changed_content(self, response=None, content=None, content_id=None):
+        """Check if page content changed since last run, and record its state.
+
+        Content state is keyed by its id, so a page may hold many contents.
+        Previous hashes of contents of the page are set by the middleware on
+        ``incremental_state`` meta key, and contents last scraped from other
+        pages are looked up from the store.
+
+        Parameters
+        ----------
+        response (object):
+            Valid scrapy response, requested with ``incremental`` meta key.
+
+        content (dict):
+            Valid page content, with its resolved references e.g parsed
+            product data, including its topics and categories names.
+
+        content_id (str):
+            Valid id of page content e.g ``product_id``.
+
+        Returns
+        -------
+        changed (bool):
+            Whether page content is new or changed. Always ``True`` when
+            incremental mode is disabled.
+        """
+        store = self.incremental_store
+        if store is None or not response.meta.get("incremental"):
+            return True
+
+        # compare page content with last run
+        state = response.meta.get("incremental_state") or {}
+        previous_hash = (state.get("contents") or {}).get(content_id)
+        if previous_hash is None and hasattr(store, "get_content"):
+            previous_hash = store.get_content(content_id)
+        content_hash = hash_content(content)
+        changed = content_hash != previous_hash
+
+        # record page state, with validators collected on download
+        url = response.request.url if response.request else response.url
+        validators = response.meta.get("incremental_validators") or {}
+        store.set(url, **validators)
+        store.set_content(content_id, url=url, content_hash=content_hash)
+
+        # collect stats
+        stats = self.crawler.stats
+        if changed:
+            stats.inc_value("incremental/changed", spider=self)
+        if changed and previous_hash is None:
+            stats.inc_value("incremental/changed/new", spider=self)
+        if not changed:
+            stats.inc_value("incremental/skipped", spider=self)
+            stats.inc_value("incremental/skipped/unchanged", spider=self)
+
+        return changed
+
+
+class ParsePoolMixin:
+    """Provide a pool to parse item pages within, off the reactor thread.
+
+    Parse pool is set by ``ParsePool`` extension when ``PARSE_POOL_ENABLED``
+    setting is ``True``.
+    """
+
+    parse_pool = None
+
+
+class UniqueRequestMixin:
+    """Provide helpers to follow each canonical url once per crawl.
+
+    Urls are canonicalized before being followed, so variants of a same page
+    (i.e found under many topics and sort filters) are dropped before they
+    are scheduled. Dropped requests are counted in stats as
+    ``unique_requests/filtered``.
+    """
+
+    seen_urls = None
+
+    def follow_unique(self, response=None, url=None, callback=None, **kwargs):
+        """Follow a url, unless its canonical url was already followed.
+
+        Parameters
+        ----------
+        response (object):
+            Valid scrapy response, where the url is found.
+
+        url (str):
+            Valid absolute or relative url.
+
+        callback (callable):
+            Valid callback of request.
+
+        kwargs (dict):
+            Valid extra request arguments.
+
+        Returns
+        -------
+        request (Request|None):
+            Valid scrapy request or ``None`` if url was already followed.
+        """
+        if self.seen_urls is None:
+            self.seen_urls = set()
+
+        # drop url already followed, by its canonical form
+        url = canonicalize_url(response.urljoin(url))
+        stats = self.crawler.stats
+        if url in self.seen_urls:
+            stats.inc_value("unique_requests/filtered", spider=self)
+            return None
+
+        self.seen_urls.add(url)
+        stats.inc_value("unique_requests/followed", spider=self)
+        return response.follow(url, callback, **kwargs)
+
+
+class BaseUrlMixin:
+    """Provide site urls derived from a base url.
+
+    Set base url from ``PRODUCTHUNT_BASE_URL`` setting, so spiders may crawl
+    a stand-in of producthunt.com i.e a local replay server.
+    """
+
+    def set_base_url(self, base_url=None):
+        """Set site urls and allowed domains from a base url.
+
+        Parameters
+        ----------
+        base_url (str):
+            Valid site base url e.g ``https://www.producthunt.com``.
+        """
+        base_url = base_url.rstrip("/")
+        self.base_url = base_url
+        self.posts_base_url = f"""{base_url}/posts"""
+        self.topics_base_url = f"""{base_url}/topics"""
+        self.products_base_url = f"""{base_url}/products"""
+        self.leaderboard_base_url = f"""{base_url}/leaderboard/daily"""
+        self.graphql_url = f"""{base_url}/frontend/graphql"""
+
+        # allow base url host, unless already allowed
+        host = urlsplit(base_url).hostname
+        allowed_domains = list(getattr(self, "allowed_domains", None) or [])
+        is_allowed = any(
+            host == domain or host.endswith(f""".{domain}""")
+            for domain in allowed_domains
+        )
+        if host and not is_allowed:
+            allowed_domains.append(host)
+        self.allowed_domains = allowed_domains
+
+
+class FeedsMixin:
+    """Provide feeds whose format and extension are set from crawler settings.
+
+    Default feed is resolved from environment once settings are loaded, so
+    it's valid for any spider or command. Feed export settings (i.e
+    ``FEED_EXPORT_FORMAT``) may also be set from command line or spider
+    settings, as feeds are resolved again before settings are frozen (i.e
+    within ``from_crawler``).
+    """
+
+    def set_feeds(self, crawler=None):
+        """Set format and extension of feeds, from crawler settings.
+
+        Parameters
+        ----------
+        crawler (Crawler):
+            Valid crawler of spider.
+        """
+        settings = crawler.settings
+        settings.set(
+            "FEEDS",
+            get_feeds(settings),
+            priority=settings.getpriority("FEEDS") or "project",
+        )
+
+
+class GraphQLMixin:
+    """Provide helpers to fetch entities as compact JSON graphql responses.
+
+    In ``graphql`` fetch mode (see ``PRODUCTHUNT_FETCH_MODE`` setting),
+    spiders request lists of entities ids with cursor pagination, then
+    entities in batches of ids, instead of downloading their pages. Ids
+    waiting for a full batch are requested once the spider is idle.
+    """
+
+    fetch_mode = "html"
+    graphql_url = None
+    graphql_batch_size = 20
+    graphql_page_size = 20
+    graphql_max_pages = 5
+    graphql_pending_ids = None
+    graphql_seen_ids = None
+
+    def set_fetch_mode(self, settings=None):
+        """Set fetch mode, and its graphql options, from settings.
+
+        Parameters
+        ----------
+        settings (Settings):
+            Valid crawler settings.
+        """
+        self.fetch_mode = settings.get("PRODUCTHUNT_FETCH_MODE") or "html"
+        if self.fetch_mode not in ("html", "graphql"):
+            raise ValueError(f"""Unknown fetch mode: {self.fetch_mode}""")
+        self.graphql_batch_size = settings.getint("PRODUCTHUNT_GRAPHQL_BATCH_SIZE", 20)
+        self.graphql_page_size = settings.getint("PRODUCTHUNT_GRAPHQL_PAGE_SIZE", 20)
+        self.graphql_max_pages = settings.getint("PRODUCTHUNT_GRAPHQL_MAX_PAGES", 5)
+        if self.is_graphql_mode():
+            self.crawler.signals.connect(
+                self.flush_graphql_batches, signal=signals.spider_idle
+            )
+
+    def is_graphql_mode(self):
+        """Check if entities are fetched as graphql responses."""
+        return self.fetch_mode == "graphql"
+
+    def graphql_request(self, operation=None, variables=None, callback=None, **kwargs):
+        """Create a graphql request of an operation.
+
+        Parameters
+        ----------
+        operation (str):
+            Valid operation name i.e ``Products``.
+
+        variables (dict):
+            Valid operation variables.
+
+        callback (callable):
+            Valid callback of request.
+
+        Returns
+        -------
+        request (Request):
+            Valid scrapy request.
+        """
+        url = build_graphql_url(
+            graphql_url=self.graphql_url, operation=operation, variables=variables
+        )
+        headers = {"Accept": "application/json"}
+        return scrapy.Request(url=url, callback=callback, headers=headers, **kwargs)
+
+    def parse_graphql_operation(self, url=None):
+        """Parse operation name and variables of a graphql url, if any."""
+        return parse_graphql_url(url=url, graphql_url=self.graphql_url)
+
+    def parse_graphql_data(self, response=None):
+        """Decode data of a graphql response, counting its errors in stats."""
+        data, errors = load_graphql_data(response=response)
+        for error in errors:
+            self.crawler.stats.inc_value("graphql/errors", spider=self)
+            self.logger.warning(
+                f"""GraphQL error of {response.url}: {error.get("message")}"""
+            )
+        return data
+
+    def follow_graphql_page(self, response=None, connection=None, callback=None):
+        """Request next page of a graphql connection, if any.
+
+        Parameters
+        ----------
+        response (object):
+            Valid scrapy response of a connection page.
+
+        connection (dict):
+            Valid connection i.e ``{"edges": [...], "pageInfo": {...}}``.
+
+        callback (callable):
+            Valid callback of request.
+
+        Returns
+        -------
+        request (Request|None):
+            Valid request of next page, or ``None`` if it is the last page.
+        """
+        page_info = (connection or {}).get("pageInfo") or {}
+        page = response.meta.get("graphql_page", 1)
+        is_last_page = self.graphql_max_pages and page >= self.graphql_max_pages
+        if not page_info.get("hasNextPage") or is_last_page:
+            return None
+
+        operation, variables = self.parse_graphql_operation(url=response.url)
+        variables = {**variables, "after": page_info.get("endCursor")}
+        meta = {"graphql_page": page + 1}
+        return self.graphql_request(operation, variables, callback=callback, meta=meta)
+
+    def batch_graphql_ids(self, operation=None, ids=None, callback=None):
+        """Queue entities ids, and request full batches of them.
+
+        Ids already queued are dropped, and counted in stats as
+        ``graphql/ids/filtered``.
+
+        Parameters
+        ----------
+        operation (str):
+            Valid operation name, which fetch entities by ``ids`` i.e ``Products``.
+
+        ids (iterable):
+            Valid entities ids.
+
+        callback (callable):
+            Valid callback of requests.
+
+        Returns
+        -------
+        requests (iterator):
+            Valid requests of full batches of ids.
+        """
+        if self.graphql_pending_ids is None:
+            self.graphql_pending_ids, self.graphql_seen_ids = {}, set()
+
+        pending = self.graphql_pending_ids.setdefault(operation, ([], callback))[0]
+        for entity_id in ids or ():
+            if (operation, entity_id) in self.graphql_seen_ids:
+                self.crawler.stats.inc_value("graphql/ids/filtered", spider=self)
+                continue
+            self.graphql_seen_ids.add((operation, entity_id))
+            pending.append(entity_id)
+            if len(pending) >= self.graphql_batch_size:
+                yield self.graphql_request(
+                    operation, {"ids": list(pending)}, callback=callback
+                )
+                pending.clear()
+
+    def flush_graphql_batches(self):
+        """Request partial batches of ids, once the spider is idle."""
+        requests = []
+        for operation, (pending, callback) in (self.graphql_pending_ids or {}).items():
+            if pending:
+                requests.append(
+                    self.graphql_request(
+                        operation, {"ids": list(pending)}, callback=callback
+                    )
+                )
+                pending.clear()
+
+        for request in requests:
+            self.crawler.engine.crawl(request)
+        if requests:
+            raise DontCloseSpider
+
+
+class BackfillMixin:
+    """Provide helpers to backfill daily leaderboards over a range of days.
+
+    Backfill is enabled by ``backfill_start`` (and ``backfill_end``) spider
+    arguments. Days are crawled a bounded window at a time (see
+    ``BACKFILL_CONCURRENT_DAYS`` setting). A day is finished once all of its
+    requests are parsed or failed, then next pending day is scheduled. A
+    finished day is checkpointed once its items are stored, i.e once its day
+    feeds are closed, or once all feeds are closed (on spider close). Days
+    left unfinished (i.e their requests were dropped), or whose feeds failed
+    to be stored, are not checkpointed.
+    """
+
+    backfill_start = None
+    backfill_end = None
+    backfill_concurrent_days = 4
+    backfill_checkpoint = None
+    backfill_pending_days = None
+    backfill_outstanding = None
+    backfill_requests = None
+    backfill_finished_days = None
+    backfill_exported_items = None
+    backfill_stored_items = None
+    backfill_feeds = None
+    backfill_day_feeds = None
+    backfill_failed_days = None
+    backfill_feed_failures = 0
+    backfill_skipped_days = 0
+    backfill_started_at = None
+
+    def set_backfill(self, crawler=None):
+        """Set backfill days, feeds and checkpoint, if backfill is enabled.
+
+        Feeds depending on crawl date are split into a feed per day, before
+        settings are frozen (i.e within ``from_crawler``).
+
+        Parameters
+        ----------
+        crawler (Crawler):
+            Valid crawler of spider.
+        """
+        if not self.is_backfill_mode():
+            return
+
+        settings = crawler.settings
+        days = list(iter_dates(self.backfill_start, self.backfill_end))
+        feeds = get_backfill_feeds(settings.getdict("FEEDS"), days)
+        settings.set(
+            "FEEDS", feeds, priority=settings.getpriority("FEEDS") or "project"
+        )
+        self.backfill_concurrent_days = max(
+            1, settings.getint("BACKFILL_CONCURRENT_DAYS", 4)
+        )
+
+        # skip days finished by previous runs
+        self.backfill_checkpoint = BackfillCheckpoint.from_crawler(crawler)
+        finished = self.backfill_checkpoint.get_finished(self.name)
+        self.backfill_pending_days = deque(day for day in days if day not in finished)
+        self.backfill_outstanding, self.backfill_requests = {}, {}
+        self.backfill_skipped_days = len(days) - len(self.backfill_pending_days)
+
+        # track items exported and stored per day, to checkpoint stored days
+        # i.e stored items of a day are counted once per feed of that day
+        self.backfill_finished_days = {}
+        self.backfill_exported_items, self.backfill_stored_items = {}, {}
+        self.backfill_feeds = feeds
+        self.backfill_day_feeds = {}
+        for options in feeds.values():
+            day = options.get("backfill_date")
+            self.backfill_day_feeds[day] = self.backfill_day_feeds.get(day, 0) + 1
+        self.backfill_failed_days, self.backfill_feed_failures = set(), 0
+
+        crawler.signals.connect(self.release_backfill_days, signal=signals.spider_idle)
+        crawler.signals.connect(self.close_backfill, signal=signals.spider_closed)
+        crawler.signals.connect(self.export_backfill_item, signal=signals.item_scraped)
+        crawler.signals.connect(
+            self.store_backfill_feed, signal=signals.feed_slot_closed
+        )
+        crawler.signals.connect(
+            self.close_backfill_feeds, signal=signals.feed_exporter_closed
+        )
+
+    def is_backfill_mode(self):
+        """Check if spider backfills a range of days."""
+        return self.backfill_start is not None or self.backfill_end is not None
+
+    def get_leaderboard_url(self, day=None):
+        """Get url of daily leaderboard page of a day."""
+        return f"""{self.leaderboard_base_url}/{day.year}/{day.month}/{day.day}"""
+
+    def backfill_start_requests(self):
+        """Generate leaderboard requests of first window of pending days."""
+        self.backfill_started_at = time.monotonic()
+        stats = self.crawler.stats
+        stats.set_value("backfill/days/skipped", self.backfill_skipped_days)
+        yield from self.schedule_backfill_days()
+
+    def schedule_backfill_days(self):
+        """Generate leaderboard requests of pending days, within window."""
+        while (
+            self.backfill_pending_days
+            and len(self.backfill_outstanding) < self.backfill_concurrent_days
+        ):
+            day = self.backfill_pending_days.popleft()
+            self.backfill_outstanding[day] = 0
+            self.backfill_requests[day] = 0
+            yield self.backfill_request(
+                day=day, url=self.get_leaderboard_url(day), callback=self.parse
+            )
+
+    def backfill_request(self, day=None, url=None, callback=None, **kwargs):
+        """Create a request of a day, counted as outstanding until parsed.
+
+        Requests are not filtered as duplicates, so each of them is parsed
+        or failed, which finish their day.
+        """
+        self.backfill_outstanding[day] += 1
+        self.backfill_requests[day] += 1
+        self.crawler.stats.inc_value("backfill/requests", spider=self)
+        meta = {**kwargs.pop("meta", {}), "backfill_date": day}
+        return scrapy.Request(
+            url=url,
+            callback=callback,
+            errback=self.backfill_errback,
+            meta=meta,
+            dont_filter=True,
+            **kwargs,
+        )
+
+    def backfill_result(self, response=None, result=None):
+        """Finish request of a day, once its callback result is consumed.
+
+        Parameters
+        ----------
+        response (object):
+            Valid scrapy response of a backfill request.
+
+        result (iterable|Deferred):
+            Valid callback result, as generator or deferred (i.e parse pool).
+
+        Returns
+        -------
+        result (iterable|Deferred):
+            Valid callback result.
+        """
+        day = response.meta.get("backfill_date")
+        if day is None or self.backfill_outstanding is None:
+            return result
+
+        def iterate(items=None):
+            try:
+                yield from items or ()
+            finally:
+                self.finish_backfill_request(day)
+
+        # finish request once its parsed items are consumed, i.e exported
+        if hasattr(result, "addCallbacks"):
+
+            def failed(failure=None):
+                self.finish_backfill_request(day)
+                return failure
+
+            return result.addCallbacks(iterate, failed)
+
+        return iterate(result)
+
+    def backfill_errback(self, failure=None):
+        """Finish failed request of a day."""
+        day = failure.request.meta.get("backfill_date")
+        self.logger.warning(f"""Backfill request failed: {failure.request.url}""")
+        self.crawler.stats.inc_value("backfill/requests/failed", spider=self)
+        self.finish_backfill_request(day)
+
+    def finish_backfill_request(self, day=None):
+        """Finish request of a day, then checkpoint day once all are finished."""
+        if day not in self.backfill_outstanding:
+            return
+        self.backfill_outstanding[day] -= 1
+        if self.backfill_outstanding[day] > 0:
+            return
+
+        # finish day, checkpointed once stored, and schedule next pending days
+        del self.backfill_outstanding[day]
+        requests = self.backfill_requests.pop(day, 0)
+        self.backfill_finished_days[day] = requests
+        self.crawler.stats.inc_value("backfill/days/finished", spider=self)
+        self.crawler.stats.inc_value("backfill/days/requests", requests, spider=self)
+        self.logger.info(f"""Backfill day {day} finished, with {requests} requests""")
+        self.checkpoint_backfill_day(day)
+        for request in self.schedule_backfill_days():
+            self.crawler.engine.crawl(request)
+
+    def export_backfill_item(self, item=None):
+        """Count item exported into feeds of its launch day."""
+        day = get_launch_date(item)
+        self.backfill_exported_items[day] = self.backfill_exported_items.get(day, 0) + 1
+
+    def store_backfill_feed(self, slot=None):
+        """Count items of a stored feed of a day, then checkpoint its day.
+
+        Store errors are detected from ``feedexport/failed_count`` stats, as
+        feed slots are closed even if they failed to be stored.
+        """
+        stats = self.crawler.stats.get_stats()
+        failures = sum(
+            value
+            for key, value in stats.items()
+            if key.startswith("feedexport/failed_count/")
+        )
+        failed = failures > self.backfill_feed_failures
+        self.backfill_feed_failures = failures
+
+        # fail day of feed, or all days if feed isn't split per day
+        day = slot.feed_options.get("backfill_date")
+        if failed:
+            self.logger.warning(f"""Backfill feed failed to be stored: {slot.uri}""")
+            self.backfill_failed_days.add(day)
+            return
+        if day is not None:
+            stored = self.backfill_stored_items.get(day, 0) + slot.itemcount
+            self.backfill_stored_items[day] = stored
+            self.checkpoint_backfill_day(date.fromisoformat(day))
+
+    def checkpoint_backfill_day(self, day=None, closed=False):
+        """Checkpoint a finished day, once all of its items are stored.
+
+        Items of feeds which aren't split per day are stored on close only,
+        so days are checkpointed once feeds are closed, if any.
+
+        Parameters
+        ----------
+        day (date):
+            Valid backfill day.
+
+        closed (bool):
+            Whether feeds are closed, i.e no more items will be stored.
+        """
+        if day not in self.backfill_finished_days:
+            return
+        if self.backfill_failed_days & {None, day.isoformat()}:
+            return
+
+        exported = self.backfill_exported_items.get(day.isoformat(), 0)
+        stored = self.backfill_stored_items.get(day.isoformat(), 0)
+        feeds = self.backfill_day_feeds.get(day.isoformat(), 0)
+        if stored < exported * feeds:
+            if closed:
+                self.logger.warning(f"""Backfill day {day} left unstored""")
+            return
+        if self.backfill_feeds and not closed:
+            if None in self.backfill_day_feeds or not exported:
+                return
+
+        requests = self.backfill_finished_days.pop(day)
+        self.backfill_checkpoint.finish(self.name, day, requests=requests)
+        self.crawler.stats.inc_value("backfill/days/checkpointed", spider=self)
+        self.logger.info(f"""Backfill day {day} checkpointed, once stored""")
+
+    def release_backfill_days(self):
+        """Release unfinished days, and schedule pending days, once idle."""
+        for day in list(self.backfill_outstanding):
+            self.logger.warning(f"""Backfill day {day} left unfinished""")
+            self.crawler.stats.inc_value("backfill/days/unfinished", spider=self)
+            del self.backfill_outstanding[day]
+            self.backfill_requests.pop(day, None)
+
+        requests = list(self.schedule_backfill_days())
+        for request in requests:
+            self.crawler.engine.crawl(request)
+        if requests:
+            raise DontCloseSpider
+
+    def close_backfill_feeds(self):
+        """Checkpoint finished days once feeds are closed, and close checkpoint."""
+        for day in list(self.backfill_finished_days):
+            self.checkpoint_backfill_day(day, closed=True)
+        self.backfill_checkpoint.close()
+
+    def close_backfill(self):
+        """Report backfill rates, and close checkpoint, unless feeds are enabled.
+
+        Feeds are stored after spider is closed, so finished days are then
+        checkpointed once feeds are closed (see ``close_backfill_feeds``).
+        """
+        stats = self.crawler.stats
+        days = stats.get_value("backfill/days/finished", 0)
+        requests = stats.get_value("backfill/days/requests", 0)
+        elapsed = time.monotonic() - (self.backfill_started_at or time.monotonic())
+        if days and elapsed:
+            stats.set_value("backfill/days_per_hour", days * 3600 / elapsed)
+            stats.set_value("backfill/requests_per_day", requests / days)
+        if not self.backfill_feeds:
+            self.backfill_checkpoint.close()
@@ -7,10 +7,16 @@ This spider, do:
     2. Scrape top products, for each trending topic page based on trending order.
     3. Save batches of trending products per day.
 
+In graphql fetch mode, trending topics and pages of topics products are
+queried from graphql endpoint, then products in batches of ids.
+
 Usage:
 
 To scrape `trending products`, run:
 >>> scrapy crawl trending-products
+
+To scrape `trending products` in graphql fetch mode, run:
+>>> PRODUCTHUNT_FETCH_MODE=graphql scrapy crawl trending-products
 """
 
 from datetime import datetime
@@ -18,16 +24,25 @@ from urllib.parse import urlencode
 
 import scrapy
 
-from producthunt_scraper.itemloaders import ProductItemLoader
-from producthunt_scraper.items import ProductItem
+from producthunt_scraper.itemloaders import load_product_item
 from producthunt_scraper.settings import (
     BASE_DATA_DIR,
     PRODUCTHUNT_ALLOWED_DOMAINS,
+    PRODUCTHUNT_BASE_URL,
+    PRODUCTHUNT_LAZY_SCRIPT_DATA,
     PRODUCTHUNT_PRODUCT_SORT_FILTERS,
     PRODUCTHUNT_PRODUCTS_BASE_URL,
     PRODUCTHUNT_TOPICS_BASE_URL,
 )
-from producthunt_scraper.spiders.mixins import PageScriptDataMixin
+from producthunt_scraper.spiders.mixins import (
+    BaseUrlMixin,
+    FeedsMixin,
+    GraphQLMixin,
+    IncrementalMixin,
+    PageScriptDataMixin,
+    ParsePoolMixin,
+    UniqueRequestMixin,
+)
 
 # selectors
 TRENDING_TOPIC_URL_SELECTOR = "div[data-test=trending-topics-card] a::attr(href)"
@@ -59,11 +74,23 @@ PRODUCT_DATA_MAPPINGS = {
 __all__ = ["TrendingProductsSpider"]
 
 
-class TrendingProductsSpider(scrapy.Spider, PageScriptDataMixin):
+class TrendingProductsSpider(
+    scrapy.Spider,
+    PageScriptDataMixin,
+    IncrementalMixin,
+    UniqueRequestMixin,
+    BaseUrlMixin,
+    FeedsMixin,
+    ParsePoolMixin,
+    GraphQLMixin,
+):
     """Scrape top trending products from trending topics."""
 
     name = "trending-products"
     allowed_domains = PRODUCTHUNT_ALLOWED_DOMAINS
+    base_url = PRODUCTHUNT_BASE_URL
+    topics_base_url = PRODUCTHUNT_TOPICS_BASE_URL
+    products_base_url = PRODUCTHUNT_PRODUCTS_BASE_URL
     data_dir = BASE_DATA_DIR
     last_scraped_date = datetime.utcnow().date()
 
@@ -71,39 +98,128 @@ class TrendingProductsSpider(scrapy.Spider, PageScriptDataMixin):
         super(TrendingProductsSpider, self).__init__(*args, **kwargs)
         self.last_scraped_date = datetime.utcnow().date()
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(TrendingProductsSpider, cls).from_crawler(
+            crawler, *args, **kwargs
+        )
+        spider.lazy_script_data = crawler.settings.getbool(
+            "PRODUCTHUNT_LAZY_SCRIPT_DATA", PRODUCTHUNT_LAZY_SCRIPT_DATA
+        )
+        spider.set_base_url(
+            crawler.settings.get("PRODUCTHUNT_BASE_URL", PRODUCTHUNT_BASE_URL)
+        )
+        spider.set_feeds(crawler)
+        spider.set_fetch_mode(crawler.settings)
+        return spider
+
     def start_requests(self):
         """Generate first requests to crawl for this spider."""
-        start_urls = [PRODUCTHUNT_TOPICS_BASE_URL]
+        # query trending topics, in graphql fetch mode
+        if self.is_graphql_mode():
+            variables = {"first": self.graphql_page_size}
+            yield self.graphql_request("TrendingTopics", variables, callback=self.parse)
+            return
+
+        start_urls = [self.topics_base_url]
         for start_url in start_urls:
             yield scrapy.Request(url=start_url, callback=self.parse, meta={})
 
+    def is_item_url(self, url=None):
+        """Check if an url is of a page parsed into items i.e product page."""
+        operation, _ = self.parse_graphql_operation(url=url)
+        return str(url).startswith(self.products_base_url) or operation == "Products"
+
     def parse(self, response=None, **kwargs):
         """Process response and return scraped data and/or more URLs to follow."""
+        # parse item page within parse pool, if enabled
+        if self.parse_pool is not None and self.is_item_url(response.url):
+            return self.parse_pool.parse(spider=self, response=response, **kwargs)
+        return self.parse_response(response=response, **kwargs)
+
+    def parse_response(self, response=None, **kwargs):
+        """Parse response and yield scraped data and/or more URLs to follow."""
+        # parse graphql responses, in graphql fetch mode
+        operation, _ = self.parse_graphql_operation(url=response.url)
+        if operation is not None:
+            yield from self.parse_graphql_response(
+                response=response, operation=operation, **kwargs
+            )
+            return
+
         # check url type
         response_url = str(response.url)
-        is_topic_url = response_url.startswith(PRODUCTHUNT_TOPICS_BASE_URL)
-        is_product_url = response_url.startswith(PRODUCTHUNT_PRODUCTS_BASE_URL)
+        is_topic_url = response_url.startswith(self.topics_base_url)
+        is_product_url = response_url.startswith(self.products_base_url)
 
         # ignore unknown urls
         if not is_topic_url and not is_product_url:
             return
 
         # parse main topics page and yield trending topics pages urls
-        if response_url == PRODUCTHUNT_TOPICS_BASE_URL:
+        if response_url == self.topics_base_url:
             trending_topic_urls = self.parse_topics_page(response=response, **kwargs)
             for trending_topic_url in trending_topic_urls:
-                yield response.follow(trending_topic_url, self.parse)
+                request = self.follow_unique(
+                    response=response, url=trending_topic_url, callback=self.parse
+                )
+                if request is not None:
+                    yield request
 
         # parse topic page and yield trending products urls
-        if is_topic_url and response_url != PRODUCTHUNT_TOPICS_BASE_URL:
+        if is_topic_url and response_url != self.topics_base_url:
             product_urls = self.parse_topic_page(response=response, **kwargs)
             for product_url in product_urls:
-                yield response.follow(product_url, self.parse)
+                meta = {"incremental": True}
+                request = self.follow_unique(
+                    response=response, url=product_url, callback=self.parse, meta=meta
+                )
+                if request is not None:
+                    yield request
 
         # parse product page and yield product dictionary/item
         if is_product_url:
             yield from self.parse_product_page(response=response, **kwargs)
 
+    def parse_graphql_response(self, response=None, operation=None, **kwargs):
+        """Parse graphql response and yield scraped data and/or more requests."""
+        # parse trending topics and query products of each sort filter
+        if operation == "TrendingTopics":
+            data = self.parse_graphql_data(response=response)
+            edges = (data.get("trendingTopics") or {}).get("edges") or []
+            slugs = {(edge.get("node") or {}).get("slug") for edge in edges}
+            for slug in sorted(slug for slug in slugs if slug):
+                for sort_filter in PRODUCTHUNT_PRODUCT_SORT_FILTERS:
+                    variables = {
+                        "slug": slug,
+                        "order": sort_filter,
+                        "first": self.graphql_page_size,
+                    }
+                    yield self.graphql_request(
+                        "TopicProducts", variables, callback=self.parse
+                    )
+
+        # parse page of topic products, then query products in batches of ids
+        if operation == "TopicProducts":
+            data = self.parse_graphql_data(response=response)
+            products = ((data.get("topic") or {}).get("products")) or {}
+            edges = products.get("edges") or []
+            product_ids = [(edge.get("node") or {}).get("id") for edge in edges]
+            yield from self.batch_graphql_ids(
+                "Products",
+                [product_id for product_id in product_ids if product_id],
+                callback=self.parse,
+            )
+            request = self.follow_graphql_page(
+                response=response, connection=products, callback=self.parse
+            )
+            if request is not None:
+                yield request
+
+        # parse batch of products and yield product items
+        if operation == "Products":
+            yield from self.parse_product_page(response=response, **kwargs)
+
     def parse_topics_page(self, response=None, **kwargs):
         """Parse main topics page and yield trending topics pages urls."""
         # parse trending topic urls from topics page
@@ -129,10 +245,14 @@ class TrendingProductsSpider(scrapy.Spider, PageScriptDataMixin):
             yield product_url
 
     def parse_product_page(self, response=None, **kwargs):
-        """Parse product page and yield a product item."""
+        """Parse product page (or batch of products) and yield product items."""
         raw_product = self.parse_script_data(response=response, **kwargs)
-        for key, value in raw_product.items():
-            if "Product" in key and "structuredData" in value:
+        ref_index = self.parse_ref_index(source=raw_product)
+        products = self.find_script_data(
+            key="Product", source=raw_product, index=ref_index
+        )
+        for _, value in products:
+            if "structuredData" in value:
                 # parse basic product data
                 basic_data = self._parse_product_basic_data(raw_base_product=value)
 
@@ -140,15 +260,29 @@ class TrendingProductsSpider(scrapy.Spider, PageScriptDataMixin):
                 extra_data = self._parse_product_extra_data(
                     raw_base_product=value,
                     raw_product=raw_product,
+                    ref_index=ref_index,
                 )
 
                 # yield product data
                 product = {**basic_data, **extra_data}
 
+                # skip product not changed since last run, in incremental mode
+                # i.e compare product data, including names of its references
+                content = {
+                    **product,
+                    "product_categories": sorted(product["product_categories"]),
+                    "product_topics": sorted(product["product_topics"]),
+                }
+                changed = self.check_changed_content(
+                    response=response,
+                    content=content,
+                    content_id=product.get("product_id"),
+                )
+                if not changed:
+                    continue
+
                 # load and yield an product item
-                item_loader = ProductItemLoader(item=ProductItem())
-                item_loader.add_value(None, product)
-                item = item_loader.load_item()
+                item = load_product_item(product)
                 yield item
 
     def _parse_product_basic_data(self, raw_base_product=None):
@@ -162,20 +296,28 @@ class TrendingProductsSpider(scrapy.Spider, PageScriptDataMixin):
 
         return product_basic_data
 
-    def _parse_product_extra_data(self, raw_base_product=None, raw_product=None):
+    def _parse_product_extra_data(
+        self, raw_base_product=None, raw_product=None, ref_index=None
+    ):
         """Parse product extra details from product script data."""
         raw_base_product = raw_base_product or {}
         raw_product = raw_product or {}
 
         # parse product topics
-        topic_keys = self.parse_ref_keys(key="topics", source=raw_base_product)
-        topics = self.parse_ref_values(*topic_keys, source=raw_product)
+        topic_keys = self.parse_ref_keys(
+            key="topics", source=raw_base_product, index=ref_index
+        )
+        topics = self.parse_ref_values(*topic_keys, source=raw_product, index=ref_index)
         topics = {topic.get("name") for topic in topics}
         topics = list({topic for topic in topics if topic})
 
         # parse product categories
-        category_keys = self.parse_ref_keys(key="categories", source=raw_base_product)
-        categories = self.parse_ref_values(*category_keys, source=raw_product)
+        category_keys = self.parse_ref_keys(
+            key="categories", source=raw_base_product, index=ref_index
+        )
+        categories = self.parse_ref_values(
+            *category_keys, source=raw_product, index=ref_index
+        )
         categories = {category.get("name") for category in categories}
         categories = list({category for category in categories if category})
 
@@ -0,0 +1,221 @@
+"""Adaptive concurrency of download slots.
+
+Adjust concurrency and delay of each download slot (i.e per host) in
+additive increase, multiplicative decrease (AIMD) style, from response
+codes, ``Retry-After`` headers and download latency percentiles.
+
+Don't forget to add the extension to the EXTENSIONS setting
+See: https://docs.scrapy.org/en/latest/topics/extensions.html
+"""
+
+import email.utils
+import logging
+import math
+import time
+from collections import deque
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+__all__ = ["AdaptiveConcurrency", "get_retry_after"]
+
+logger = logging.getLogger(__name__)
+
+
+def get_retry_after(response=None, now=None):
+    """Get seconds to wait before retrying, from ``Retry-After`` header.
+
+    Examples
+    --------
+    >>> from scrapy.http import Response
+    >>> from producthunt_scraper.throttle import get_retry_after
+    >>> get_retry_after(Response("https://a.b", headers={"Retry-After": "5"}))
+    5.0
+    >>> get_retry_after(Response("https://a.b")) is None
+    True
+    """
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+
+    value = value.decode("latin-1").strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - (now if now is not None else time.time()))
+
+
+class SlotState:
+    """Adaptive concurrency state of a download slot.
+
+    Parameters
+    ----------
+    window (int):
+        Valid number of recent download latencies to keep.
+    """
+
+    def __init__(self, window=100):
+        self.latencies = deque(maxlen=window)
+        self.successes = 0
+        self.decreased_at = -math.inf
+
+    def latency_percentile(self, q=90):
+        """Compute nearest-rank ``q`` percentile of recent latencies."""
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return 0.0
+        rank = max(0, min(len(latencies) - 1, math.ceil(q / 100 * len(latencies)) - 1))
+        return latencies[rank]
+
+
+class AdaptiveConcurrency:
+    """Adjust download slots concurrency and delay from server feedback.
+
+    A slot concurrency is increased by one after each round of successful
+    responses (i.e as many as its concurrency) whose latency percentile is
+    within target, and decreased by one when it exceeds target. On rate
+    limited or overloaded responses (i.e ``429``), at most once per
+    cooldown, slot concurrency is multiplied by a decrease factor. Once at
+    minimum concurrency, slot delay is doubled instead, to at least their
+    ``Retry-After``, and halved back first on successful rounds. As slot
+    delay spaces all requests of a slot, it is only raised as a last resort.
+
+    Current limits of slots are collected in stats as
+    ``adaptive_concurrency/<slot>/concurrency`` and
+    ``adaptive_concurrency/<slot>/delay``.
+
+    Parameters
+    ----------
+    crawler (Crawler):
+        Valid scrapy crawler.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool("ADAPTIVE_CONCURRENCY_ENABLED"):
+            raise NotConfigured
+        if settings.getbool("AUTOTHROTTLE_ENABLED"):
+            logger.warning("AutoThrottle and adaptive concurrency both adjust delays")
+
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.min_concurrency = max(1, settings.getint("ADAPTIVE_CONCURRENCY_MIN", 1))
+        self.max_concurrency = max(
+            self.min_concurrency,
+            settings.getint("ADAPTIVE_CONCURRENCY_MAX", 0)
+            or settings.getint("CONCURRENT_REQUESTS"),
+        )
+        self.target_latency = settings.getfloat(
+            "ADAPTIVE_CONCURRENCY_TARGET_LATENCY", 0.0
+        )
+        self.latency_percentile = settings.getfloat(
+            "ADAPTIVE_CONCURRENCY_LATENCY_PERCENTILE", 90
+        )
+        self.decrease_factor = settings.getfloat(
+            "ADAPTIVE_CONCURRENCY_DECREASE_FACTOR", 0.5
+        )
+        self.cooldown = settings.getfloat("ADAPTIVE_CONCURRENCY_COOLDOWN", 1.0)
+        self.min_delay = settings.getfloat("DOWNLOAD_DELAY")
+        self.backoff_delay = settings.getfloat(
+            "ADAPTIVE_CONCURRENCY_BACKOFF_DELAY", 0.25
+        )
+        self.max_delay = settings.getfloat("ADAPTIVE_CONCURRENCY_MAX_DELAY", 60.0)
+        self.backoff_http_codes = {
+            int(code)
+            for code in settings.getlist(
+                "ADAPTIVE_CONCURRENCY_BACKOFF_HTTP_CODES", [429, 503]
+            )
+        }
+        self.window = settings.getint("ADAPTIVE_CONCURRENCY_WINDOW", 100)
+        self.slots = {}
+
+        crawler.signals.connect(self.response_downloaded, signals.response_downloaded)
+        crawler.signals.connect(self.spider_closed, signals.spider_closed)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def _get_slot(self, request=None):
+        """Get download slot of a request, and its adaptive state."""
+        key = request.meta.get("download_slot")
+        slot = self.crawler.engine.downloader.slots.get(key)
+        if slot is None:
+            return key, None, None
+        if key not in self.slots:
+            slot.delay = max(slot.delay, self.min_delay)
+            self.slots[key] = SlotState(window=self.window)
+        return key, slot, self.slots[key]
+
+    def response_downloaded(self, response, request, spider):
+        if request.meta.get("adaptive_concurrency_dont_adjust"):
+            return
+        key, slot, state = self._get_slot(request=request)
+        if slot is None:
+            return
+
+        if response.status in self.backoff_http_codes:
+            self._decrease(key, slot, state, retry_after=get_retry_after(response))
+            return
+
+        state.latencies.append(request.meta.get("download_latency", 0.0))
+        state.successes = state.successes + 1
+        if state.successes < slot.concurrency:
+            return
+        state.successes = 0
+
+        latency = state.latency_percentile(self.latency_percentile)
+        if self.target_latency and latency > self.target_latency:
+            self._set_limits(key, slot, slot.concurrency - 1, slot.delay)
+            self.stats.inc_value("adaptive_concurrency/decrease/latency")
+        elif slot.delay > self.min_delay:
+            # halve delay first, down to download delay once negligible
+            delay = slot.delay / 2 if slot.delay > 0.02 else 0.0
+            self._set_limits(key, slot, slot.concurrency, delay)
+            self.stats.inc_value("adaptive_concurrency/increase")
+        elif slot.concurrency < self.max_concurrency:
+            self._set_limits(key, slot, slot.concurrency + 1, slot.delay)
+            self.stats.inc_value("adaptive_concurrency/increase")
+
+    def _decrease(self, key=None, slot=None, state=None, retry_after=None):
+        """Decrease slot concurrency, or raise its delay once at minimum."""
+        now = time.monotonic()
+        if now - state.decreased_at < self.cooldown:
+            return
+
+        state.decreased_at = now
+        state.successes = 0
+        if slot.concurrency > self.min_concurrency:
+            concurrency = math.floor(slot.concurrency * self.decrease_factor)
+            self._set_limits(key, slot, concurrency, slot.delay)
+        else:
+            delay = max(slot.delay * 2, self.backoff_delay, retry_after or 0.0)
+            self._set_limits(key, slot, slot.concurrency, delay)
+        self.stats.inc_value("adaptive_concurrency/decrease/backoff")
+
+    def _set_limits(self, key=None, slot=None, concurrency=None, delay=None):
+        """Set slot concurrency and delay within bounds, and collect them."""
+        slot.concurrency = max(
+            self.min_concurrency, min(self.max_concurrency, concurrency)
+        )
+        slot.delay = max(self.min_delay, min(self.max_delay, delay))
+        self.stats.set_value(
+            f"""adaptive_concurrency/{key}/concurrency""", slot.concurrency
+        )
+        self.stats.set_value(f"""adaptive_concurrency/{key}/delay""", slot.delay)
+        self.stats.max_value(
+            f"""adaptive_concurrency/{key}/max_concurrency""", slot.concurrency
+        )
+        self.stats.min_value(
+            f"""adaptive_concurrency/{key}/min_concurrency""", slot.concurrency
+        )
+
+    def spider_closed(self, spider):
+        for key, state in self.slots.items():
+            self.stats.set_value(
+                f"""adaptive_concurrency/{key}/latency_p{self.latency_percentile:g}""",
+                state.latency_percentile(self.latency_percentile),
+            )
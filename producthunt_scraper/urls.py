@@ -0,0 +1,49 @@
+"""Urls helpers.
+
+Provide canonical form of producthunt urls, so variants of a same page (i.e
+with query strings, fragments or trailing slashes) are requested once.
+"""
+
+from urllib.parse import urlsplit, urlunsplit
+
+from w3lib.url import canonicalize_url as w3lib_canonicalize_url
+
+# paths prefixes of pages whose query strings do not change their content
+CANONICAL_PATH_PREFIXES = ("/products/", "/posts/")
+
+__all__ = ["canonicalize_url"]
+
+
+def canonicalize_url(url=None, path_prefixes=CANONICAL_PATH_PREFIXES):
+    """Canonicalize a url.
+
+    Scheme and host are lower cased, fragments and trailing slashes are
+    removed and query arguments are sorted. Query strings of pages matched by
+    ``path_prefixes`` (i.e product pages) are removed.
+
+    Parameters
+    ----------
+    url (str):
+        Valid absolute url.
+
+    path_prefixes (tuple):
+        Valid paths prefixes of pages whose query strings are removed.
+
+    Returns
+    -------
+    url (str):
+        Valid canonical url.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.urls import canonicalize_url
+    >>> canonicalize_url("https://www.ProductHunt.com/products/notion/?ref=topic#a")
+    'https://www.producthunt.com/products/notion'
+    >>> canonicalize_url("https://www.producthunt.com/topics/ai/?order=most_recent&a=1")
+    'https://www.producthunt.com/topics/ai?a=1&order=most_recent'
+    """
+    scheme, netloc, path, query, _ = urlsplit(w3lib_canonicalize_url(url))
+    path = path.rstrip("/") or "/"
+    if path.startswith(path_prefixes):
+        query = ""
+    return urlunsplit((scheme, netloc, path, query, ""))
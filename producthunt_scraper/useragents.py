@@ -0,0 +1,148 @@
+"""Shared pool of random ``User-Agent`` headers.
+
+Browsers dataset (from ``fake_useragent``) is loaded once per process, and
+a fixed-size vector of user agents, weighted by their usage percentage, is
+preloaded so each request get a user agent with an O(1) index.
+
+Configure a pool using ``USER_AGENT_POOL_*`` settings.
+"""
+
+import logging
+import random
+from functools import lru_cache
+from importlib import import_module
+
+__all__ = ["UserAgentPool", "get_user_agent_pool", "load_user_agents"]
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BROWSERS = ("chrome", "edge", "firefox", "safari")
+
+
+@lru_cache(maxsize=None)
+def load_user_agents(browsers=DEFAULT_BROWSERS):
+    """Load user agents and their usage percentage of browsers, once.
+
+    Return an empty tuple when browsers dataset can not be loaded.
+    """
+    try:
+        from fake_useragent.utils import load
+
+        data = load()
+    except Exception as exc:
+        logger.warning("Unable to load user agents dataset: %s", exc)
+        return ()
+
+    return tuple(
+        (entry["useragent"], float(entry.get("percent") or 0.0))
+        for entry in data
+        if entry.get("browser") in browsers and entry.get("useragent")
+    )
+
+
+class UserAgentPool:
+    """Fixed-size vector of weighted random user agents.
+
+    Parameters
+    ----------
+    user_agents (list):
+        Valid ``(user_agent, weight)`` pairs to sample the vector from.
+
+    size (int):
+        Valid number of user agents in the vector.
+
+    fallback (str):
+        Valid user agent used when there are no user agents.
+
+    pinned (bool):
+        Whether to pin a user agent per download slot (i.e host), so
+        requests of a slot share a user agent as a browser session would.
+
+    seed (int):
+        Valid random seed, so pools are reproducible.
+
+    Examples
+    --------
+    >>> from producthunt_scraper.useragents import UserAgentPool
+    >>> pool = UserAgentPool(user_agents=[("a", 1.0), ("b", 1.0)], size=4, seed=1)
+    >>> len(pool), pool.get() in {"a", "b"}
+    (4, True)
+    >>> pool = UserAgentPool(user_agents=[("a", 1.0), ("b", 1.0)], pinned=True)
+    >>> pool.get(slot="host") == pool.get(slot="host")
+    True
+    >>> UserAgentPool(user_agents=[], fallback="Scrapy").get()
+    'Scrapy'
+    """
+
+    def __init__(
+        self, user_agents=None, size=1024, fallback=None, pinned=False, seed=None
+    ):
+        self.fallback = fallback or (
+            f"""Scrapy/{import_module("scrapy").__version__} (+https://scrapy.org)"""
+        )
+        self.pinned = pinned
+        self.random = random.Random(seed)
+
+        user_agents = list(user_agents or [])
+        if user_agents:
+            values = [user_agent for user_agent, _ in user_agents]
+            weights = [weight for _, weight in user_agents]
+            weights = weights if any(weights) else None
+            self.user_agents = self.random.choices(
+                values, weights=weights, k=max(1, size)
+            )
+        else:
+            self.user_agents = [self.fallback]
+        self.index = 0
+        self.slots = {}
+
+    def __len__(self):
+        return len(self.user_agents)
+
+    def next(self):
+        """Get next user agent of the vector."""
+        index = self.index
+        self.index = (index + 1) % len(self.user_agents)
+        return self.user_agents[index]
+
+    def get(self, slot=None):
+        """Get a user agent, pinned per slot if enabled."""
+        if not self.pinned or slot is None:
+            return self.next()
+        user_agent = self.slots.get(slot)
+        if user_agent is None:
+            user_agent = self.slots[slot] = self.next()
+        return user_agent
+
+    def rotate(self, slot=None):
+        """Get a new user agent, and pin it per slot if enabled."""
+        user_agent = self.next()
+        if self.pinned and slot is not None:
+            self.slots[slot] = user_agent
+        return user_agent
+
+
+@lru_cache(maxsize=None)
+def _get_user_agent_pool(
+    enabled=True, browsers=None, size=1024, fallback=None, pinned=False
+):
+    user_agents = load_user_agents(browsers=browsers) if enabled else ()
+    return UserAgentPool(
+        user_agents=user_agents, size=size, fallback=fallback, pinned=pinned
+    )
+
+
+def get_user_agent_pool(settings=None):
+    """Get user agent pool configured by settings, shared within a process.
+
+    User agents dataset is not loaded when ``USER_AGENT_POOL_ENABLED`` is
+    false (i.e offline), and ``USER_AGENT`` setting is used instead.
+    """
+    browsers = settings.getlist("USER_AGENT_POOL_BROWSERS") or DEFAULT_BROWSERS
+    return _get_user_agent_pool(
+        enabled=settings.getbool("USER_AGENT_POOL_ENABLED", True),
+        browsers=tuple(browsers),
+        size=settings.getint("USER_AGENT_POOL_SIZE", 1024),
+        fallback=settings.get("USER_AGENT"),
+        pinned=settings.getbool("USER_AGENT_POOL_PINNED", False),
+    )
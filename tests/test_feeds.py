@@ -0,0 +1,30 @@
+"""Feeds are valid for any spider, and resolved again from crawler settings."""
+
+from producthunt_scraper.spiders.trending_products import TrendingProductsSpider
+from scrapy.crawler import Crawler
+from scrapy.extensions.feedexport import FeedExporter
+from scrapy.spiders import Spider
+from scrapy.utils.project import get_project_settings
+
+
+def test_feeds_of_plain_crawler():
+    crawler = Crawler(Spider, get_project_settings())
+    exporter = FeedExporter.from_crawler(crawler)
+
+    # ensure default feed is resolved without project spiders (i.e scrapy fetch)
+    [(uri, options)] = exporter.feeds.items()
+    assert uri.endswith("/%(part_name)s-%(batch_id)d.jsonl")
+    assert options["format"] == "jsonlines"
+
+
+def test_feeds_of_command_line_settings():
+    settings = get_project_settings()
+    settings.set("FEED_EXPORT_FORMAT", "jsonlines-threaded", priority="cmdline")
+    settings.set("FEED_EXPORT_COMPRESSION", "gzip", priority="cmdline")
+    crawler = Crawler(TrendingProductsSpider, settings)
+    TrendingProductsSpider.from_crawler(crawler)
+
+    # ensure default feed is resolved again from command line settings
+    [(uri, options)] = crawler.settings.getdict("FEEDS").items()
+    assert uri.endswith("/%(part_name)s-%(batch_id)d.jsonl.gz")
+    assert options == {"format": "jsonlines-threaded", "overwrite": True}
@@ -0,0 +1,183 @@
+"""Workers sharing a frontier crawl each page once, into their own feed files."""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from benchmarks.bench_crawl import start_replay
+from benchmarks.utils import get_project_crawler
+from producthunt_scraper.frontier import FrontierScheduler, SqliteFrontier
+from scrapy.spiders import Spider
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    """Start a replay server of a few trending products."""
+    replay, base_url = start_replay(products=20, topics=2)
+    yield base_url
+    replay.terminate()
+    replay.wait()
+
+
+def crawl_workers(base_url=None, data_dir=None, workers=1, worker_settings=None):
+    """Crawl trending products with workers sharing a sqlite frontier, at once.
+
+    Settings of a worker (i.e ``{1: {"DOWNLOAD_DELAY": 1}}``) override
+    settings shared by all workers.
+    """
+    feed_uri = f"""{data_dir}/%(name)s/%(part_name)s-%(batch_id)d.jsonl"""
+    settings = {
+        "PRODUCTHUNT_BASE_URL": base_url,
+        "SCHEDULER": "producthunt_scraper.frontier.FrontierScheduler",
+        "FRONTIER_BACKEND": "producthunt_scraper.frontier.SqliteFrontier",
+        "FRONTIER_SQLITE_PATH": str(Path(data_dir, "frontier.sqlite3")),
+        "FRONTIER_IDLE_POLL": 0.1,
+        "FEEDS": json.dumps({feed_uri: {"format": "jsonlines", "overwrite": True}}),
+        "FEED_EXPORT_BATCH_ITEM_COUNT": 0,
+        "WORKER_COUNT": workers,
+        "LOG_LEVEL": "WARNING",
+    }
+    processes = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "scrapy",
+                "crawl",
+                "trending-products",
+                *(
+                    f"""-s{key}={value}"""
+                    for key, value in {
+                        **settings,
+                        **(worker_settings or {}).get(worker_id, {}),
+                        "WORKER_ID": worker_id,
+                    }.items()
+                ),
+            ],
+            cwd=ROOT_DIR,
+            env={**os.environ, "PYTHONPATH": str(ROOT_DIR)},
+        )
+        for worker_id in range(workers)
+    ]
+    assert [process.wait(timeout=300) for process in processes] == [0] * workers
+
+
+def read_items(path=None):
+    """Read items of jsonlines feed files."""
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_workers_crawl_without_duplicates(base_url, tmp_path):
+    crawl_workers(base_url, data_dir=tmp_path, workers=2)
+
+    # ensure each worker writes its own part files
+    paths = sorted(Path(tmp_path, "trending-products").glob("*.jsonl"))
+    assert [path.name for path in paths] == ["part-0-1.jsonl", "part-1-1.jsonl"]
+
+    # ensure each product is scraped once, across workers
+    urls = [item["product_url"] for path in paths for item in read_items(path)]
+    assert urls
+    assert len(urls) == len(set(urls))
+
+
+def test_wait_for_slow_worker(tmp_path):
+    replay, base_url = start_replay(products=20, topics=4, products_per_topic=5)
+    try:
+        crawl_workers(base_url, data_dir=tmp_path)
+        paths = Path(tmp_path, "trending-products").glob("*.jsonl")
+        urls = {item["product_url"] for path in paths for item in read_items(path)}
+
+        # ensure a worker downloading slower than worker timeout is waited for
+        data_dir = tmp_path / "slow"
+        crawl_workers(
+            base_url,
+            data_dir=data_dir,
+            workers=2,
+            worker_settings={
+                0: {"FRONTIER_WORKER_TIMEOUT": 0.5},
+                1: {
+                    "FRONTIER_WORKER_TIMEOUT": 0.5,
+                    "DOWNLOAD_DELAY": 1.0,
+                    "RANDOMIZE_DOWNLOAD_DELAY": False,
+                },
+            },
+        )
+    finally:
+        replay.terminate()
+        replay.wait()
+
+    paths = Path(data_dir, "trending-products").glob("*.jsonl")
+    assert urls
+    assert {item["product_url"] for path in paths for item in read_items(path)} == urls
+
+
+def test_keep_pending_requests_of_stalled_worker(tmp_path):
+    path = Path(tmp_path, "frontier.sqlite3")
+    schedulers = []
+    for worker_id in range(2):
+        settings = {
+            "FRONTIER_SQLITE_PATH": str(path),
+            "FRONTIER_CRAWL_ID": "crawl",
+            "FRONTIER_WORKER_TIMEOUT": 0.3,
+            "WORKER_COUNT": 2,
+            "WORKER_ID": worker_id,
+        }
+        crawler = get_project_crawler(Spider, settings=settings)
+        scheduler = FrontierScheduler.from_crawler(crawler)
+        scheduler.open(Spider.from_crawler(crawler, name="spider"))
+        schedulers.append(scheduler)
+
+    # stall worker 1 longer than timeout, with a pending request
+    schedulers[1].frontier.push(1, b"a", fingerprint="a")
+    time.sleep(0.5)
+    schedulers[0].spider_idle(schedulers[0].spider)
+    for scheduler in schedulers:
+        scheduler.close("finished")
+
+    # ensure crawl is not marked done, so its pending request is resumed
+    frontier = SqliteFrontier(path=path)
+    frontier.open("crawl")
+    assert frontier.size(1) == 1
+    frontier.close()
+
+
+def test_crawl_again_once_done(base_url, tmp_path):
+    crawl_workers(base_url, data_dir=tmp_path)
+    path = Path(tmp_path, "trending-products", "part-1.jsonl")
+    first_urls = {item["product_url"] for item in read_items(path)}
+    path.unlink()
+
+    # ensure a second run of a same day crawls pages again
+    crawl_workers(base_url, data_dir=tmp_path)
+    assert first_urls
+    assert {item["product_url"] for item in read_items(path)} == first_urls
+
+
+def test_resume_interrupted_crawl(tmp_path):
+    path = Path(tmp_path, "frontier.sqlite3")
+    frontier = SqliteFrontier(path=path)
+    frontier.open("crawl")
+    frontier.push(0, b"a", fingerprint="a")
+    frontier.push(0, b"b", fingerprint="b")
+    assert frontier.pop(0) == b"a"
+    frontier.close()
+
+    # ensure seen and pending requests of an interrupted crawl are kept
+    frontier = SqliteFrontier(path=path)
+    frontier.open("crawl")
+    assert frontier.push(0, b"a", fingerprint="a") is False
+    assert frontier.pop(0) == b"b"
+
+    # ensure a crawl done is cleared
+    frontier.finish()
+    frontier.open("crawl")
+    assert frontier.size(0) == 0
+    assert frontier.get_workers() == {}
+    assert frontier.push(0, b"a", fingerprint="a") is True
+    frontier.close()
@@ -0,0 +1,48 @@
+"""Sqlite cache storage decodes bodies, before keeping their script data."""
+
+import gzip
+
+import pytest
+from benchmarks.fixtures import make_product_page
+from benchmarks.utils import get_project_crawler
+from producthunt_scraper.httpcache import SqliteCacheStorage
+from scrapy import Request
+from scrapy.http import HtmlResponse
+from scrapy.spiders import Spider
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+ENCODINGS = {"gzip": gzip.compress}
+if zstandard is not None:
+    ENCODINGS["zstd"] = zstandard.ZstdCompressor().compress
+
+
+@pytest.mark.parametrize("encoding", list(ENCODINGS))
+def test_store_encoded_page(encoding, tmp_path):
+    settings = {
+        "HTTPCACHE_DIR": str(tmp_path),
+        "HTTPCACHE_SQLITE_SCRIPT_DATA_PATHS": "/products/",
+    }
+    crawler = get_project_crawler(Spider, settings=settings)
+    spider = Spider.from_crawler(crawler, name="trending-products")
+    storage = SqliteCacheStorage(crawler.settings)
+    storage.open_spider(spider)
+
+    url = "https://www.producthunt.com/products/product-1"
+    body = make_product_page(index=1, entities=20)
+    response = HtmlResponse(
+        url=url,
+        headers={"Content-Encoding": encoding, "Content-Type": "text/html"},
+        body=ENCODINGS[encoding](body),
+    )
+    storage.store_response(spider, Request(url), response)
+    cached = storage.retrieve_response(spider, Request(url))
+    storage.close_spider(spider)
+
+    # ensure encoded body is decoded, then kept as its script data only
+    assert b"Content-Encoding" not in cached.headers
+    assert cached.body.startswith(b"<html><head></head><body><script")
+    assert crawler.stats.get_value("httpcache/bytes_raw") == len(body)
@@ -0,0 +1,102 @@
+"""Compiled item loaders produce same items as item loaders."""
+
+import io
+from dataclasses import fields
+
+import pytest
+from producthunt_scraper.itemloaders import (
+    ProductItemLoader,
+    ProductLaunchItemLoader,
+    load_product_item,
+    load_product_launch_item,
+)
+from scrapy.exporters import JsonLinesItemExporter
+
+STRUCTURED_DATA = {
+    "@context": "http://schema.org",
+    "@type": "Product",
+    "name": "Chat",
+    "aggregateRating": {"@type": "AggregateRating", "ratingValue": 4.5},
+    "offers": [{"@type": "Offer", "price": 0}],
+}
+
+PRODUCT_CASES = [
+    {},
+    {"product_id": None, "product_name": None, "product_rating": None},
+    {"product_platforms": [], "product_categories": [], "product_topics": []},
+    {"product_platforms": None, "product_categories": None, "product_topics": None},
+    {"product_topics": [" AI ", "", "Dev Tools"], "product_platforms": ["Web"]},
+    {"product_followers_count": 0, "product_total_votes_count": 12},
+    {"product_reviews_count": "7", "product_rating": "3.25"},
+    {"product_rating": 0, "product_tips_count": 1024},
+    {"product_name": "  ", "product_slug": "", "product_tagline": " Chat "},
+    {"product_description": ["first", "second"]},
+    {"product_name": "Chat", "product_description": STRUCTURED_DATA},
+    {"product_name": "Chat", "structuredData": STRUCTURED_DATA},
+    {"product_followers_count": "many"},
+]
+
+LAUNCH_CASES = [
+    {},
+    {"launch_id": None, "launch_votes_count": None, "launch_topics": None},
+    {"launch_topics": []},
+    {"launch_topics": ["Productivity ", " AI"], "launch_daily_rank": "2"},
+    {"launch_votes_count": 0, "launch_comments_count": 3, "launch_weekly_rank": 12},
+    {"launch_name": "  ", "product_id": "1", "product_url": None},
+    {"launch_featured_at": "2023-10-24T00:01:00-07:00", "launch_slug": ""},
+    {"launch_description": STRUCTURED_DATA},
+    {"launch_name": "Post", "structuredData": STRUCTURED_DATA},
+    {"launch_daily_rank": [1, "2"]},
+]
+
+
+def load_with_loader(loader_class=None, data=None):
+    """Load an item using item loader."""
+    item_loader = loader_class()
+    item_loader.add_value(None, data)
+    return item_loader.load_item()
+
+
+def export_item(item=None):
+    """Export an item as json lines bytes."""
+    output = io.BytesIO()
+    exporter = JsonLinesItemExporter(output)
+    exporter.start_exporting()
+    exporter.export_item(item)
+    exporter.finish_exporting()
+    return output.getvalue()
+
+
+def load(load_item=None, data=None):
+    """Load an item, or get the type of error raised while loading it."""
+    try:
+        return load_item(data)
+    except Exception as error:
+        return type(error)
+
+
+@pytest.mark.parametrize(
+    "loader_class, load_item, data",
+    [(ProductItemLoader, load_product_item, data) for data in PRODUCT_CASES]
+    + [
+        (ProductLaunchItemLoader, load_product_launch_item, data)
+        for data in LAUNCH_CASES
+    ],
+)
+def test_compiled_item_loader(loader_class, load_item, data):
+    expected = load(lambda data: load_with_loader(loader_class, data), data)
+    actual = load(load_item, data)
+
+    # ensure same errors are raised
+    if isinstance(expected, type):
+        assert actual is expected
+        return
+
+    # ensure same item, field by field, and same exported bytes
+    assert type(actual) is type(expected)
+    for item_field in fields(expected):
+        expected_value = getattr(expected, item_field.name)
+        actual_value = getattr(actual, item_field.name)
+        assert actual_value == expected_value, item_field.name
+        assert type(actual_value) is type(expected_value), item_field.name
+    assert export_item(actual) == export_item(expected)
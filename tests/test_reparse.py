@@ -0,0 +1,71 @@
+"""Cached pages are re-parsed into same items, whatever their encoding."""
+
+import gzip
+
+import pytest
+from benchmarks.bench_reparse import hash_items
+from benchmarks.fixtures import make_product_page
+from benchmarks.utils import get_project_crawler
+from producthunt_scraper.httpcache import iter_cached_pages
+from producthunt_scraper.reparse import reparse_pages
+from scrapy import Request
+from scrapy.http import HtmlResponse
+from scrapy.spiders import Spider
+from scrapy.utils.misc import load_object
+from scrapy.utils.project import get_project_settings
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+ENCODINGS = {"gzip": gzip.compress}
+if zstandard is not None:
+    ENCODINGS["zstd"] = zstandard.ZstdCompressor().compress
+
+
+def cache_pages(settings=None, encoding=None, size=3):
+    """Cache product pages, encoded as downloaded (i.e before decompression)."""
+    crawler = get_project_crawler(Spider, settings=settings.copy_to_dict())
+    spider = Spider.from_crawler(crawler, name="trending-products")
+    storage = load_object(settings["HTTPCACHE_STORAGE"])(settings)
+    storage.open_spider(spider)
+    base_url = settings.get("PRODUCTHUNT_BASE_URL")
+    for index in range(size):
+        url = f"""{base_url}/products/product-{index}"""
+        body = make_product_page(index=index, entities=20)
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        if encoding is not None:
+            body = ENCODINGS[encoding](body)
+            headers["Content-Encoding"] = encoding
+        response = HtmlResponse(url=url, status=200, headers=headers, body=body)
+        storage.store_response(spider, Request(url), response)
+    storage.close_spider(spider)
+
+
+def reparse_cached_pages(settings=None):
+    """Re-parse pages cached for trending products spider."""
+    pages = iter_cached_pages(settings, "trending-products")
+    return list(reparse_pages(pages=pages, name="trending-products", settings=settings))
+
+
+@pytest.mark.parametrize(
+    "storage",
+    [
+        "scrapy.extensions.httpcache.FilesystemCacheStorage",
+        "producthunt_scraper.httpcache.SqliteCacheStorage",
+    ],
+)
+@pytest.mark.parametrize("encoding", list(ENCODINGS))
+def test_reparse_encoded_pages(storage, encoding, tmp_path):
+    settings = get_project_settings()
+    settings.set("HTTPCACHE_STORAGE", storage)
+    settings.set("HTTPCACHE_DIR", str(tmp_path / "plain"))
+    cache_pages(settings)
+    items = reparse_cached_pages(settings)
+
+    # ensure encoded pages are decoded, into same items as plain pages
+    settings.set("HTTPCACHE_DIR", str(tmp_path / encoding))
+    cache_pages(settings, encoding=encoding)
+    assert items
+    assert hash_items(reparse_cached_pages(settings)) == hash_items(items)
@@ -0,0 +1,44 @@
+"""Priority scheduler keeps requests which can't be spilled to disk in memory."""
+
+import threading
+
+from benchmarks.utils import get_project_crawler
+from producthunt_scraper.scheduler import PriorityScheduler
+from scrapy import Request
+from scrapy.spiders import Spider
+
+
+class ListSpider(Spider):
+    name = "list"
+
+    def parse(self, response=None, **kwargs):
+        pass
+
+
+def test_keep_unserializable_requests_in_memory():
+    settings = {
+        "PRIORITY_SCHEDULER_MEMORY_SIZE": 1,
+        "PRIORITY_SCHEDULER_MAX_DISCOVERY": 0,
+    }
+    crawler = get_project_crawler(ListSpider, settings=settings)
+    spider = ListSpider.from_crawler(crawler)
+    scheduler = PriorityScheduler.from_crawler(crawler)
+    scheduler.open(spider)
+
+    # ensure requests past memory size are spilled, unless not serializable
+    requests = [
+        Request("https://a.b/1", callback=spider.parse),
+        Request("https://a.b/2", callback=spider.parse),
+        Request("https://a.b/3", callback=lambda response: None),
+        Request("https://a.b/4", meta={"lock": threading.Lock()}, priority=-1),
+    ]
+    assert all(scheduler.enqueue_request(request) for request in requests)
+    assert crawler.stats.get_value("scheduler/enqueued/disk") == 1
+    assert crawler.stats.get_value("scheduler/enqueued/memory") == 3
+    assert crawler.stats.get_value("scheduler/unserializable") == 2
+
+    # ensure requests are scheduled in order, from memory or disk
+    urls = [scheduler.next_request().url for _ in requests]
+    assert urls == ["https://a.b/1", "https://a.b/2", "https://a.b/3", "https://a.b/4"]
+    assert scheduler.next_request() is None
+    scheduler.close("finished")